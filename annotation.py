@@ -0,0 +1,332 @@
+"""
+===========================
+Sensorimotor profiles of documents in a corpus.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from numpy import ndarray, array, zeros, full, maximum, bincount, cbrt, concatenate, ones, intp, float64, inf, nan
+
+from .phrases import PhraseTrie
+from .sensorimotor_norms import DataColNames
+
+_token_pattern = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+DEFAULT_DOMINANT_COLS = [
+    DataColNames.dominant_perceptual,
+    DataColNames.dominant_action,
+    DataColNames.dominant_sensorimotor,
+]
+
+
+def default_tokenizer(text: str) -> List[str]:
+    """Lower-cases text and splits it into word tokens, keeping internal hyphens and apostrophes."""
+    return _token_pattern.findall(text.lower())
+
+
+def iter_documents_from_file(file_path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Yields each line of a text file as a document."""
+    with open(file_path, mode="r", encoding=encoding) as f:
+        for line in f:
+            yield line
+
+
+def iter_tokens_from_file(file_path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Yields the whitespace-separated tokens of a text file, without reading it all at once."""
+    with open(file_path, mode="r", encoding=encoding) as f:
+        for line in f:
+            yield from line.split()
+
+
+class DocumentProfile(object):
+    """Sensorimotor profile of a document."""
+
+    def __init__(self,
+                 document_id: int,
+                 n_tokens: int,
+                 n_tokens_matched: int,
+                 n_items: int,
+                 mean: ndarray,
+                 max: ndarray,
+                 minkowski3: ndarray,
+                 dominant_counts: Dict[str, Dict[str, int]],
+                 ):
+        # Position of the document in the input
+        self.document_id: int = document_id
+        self.n_tokens: int = n_tokens
+        # Tokens which were part of a matched norms item
+        self.n_tokens_matched: int = n_tokens_matched
+        # Matched norms items (a multi-word item counts once)
+        self.n_items: int = n_items
+        # Per-dimension aggregates over matched items (NaN when nothing matched)
+        self.mean: ndarray = mean
+        self.max: ndarray = max
+        # Power mean of order 3, i.e. cube root of the mean cube, per dimension
+        self.minkowski3: ndarray = minkowski3
+        # Dominant.* column -> dominant modality -> number of matched items
+        self.dominant_counts: Dict[str, Dict[str, int]] = dominant_counts
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of tokens which were part of a matched norms item."""
+        return self.n_tokens_matched / self.n_tokens if self.n_tokens > 0 else nan
+
+
+class ProfileAccumulator(object):
+    """
+    Running sums from which a `DocumentProfile` is computed.
+    Accumulators for parts of a document can be merged.
+    """
+
+    def __init__(self, n_dims: int, dominant_categories: Dict[str, List[str]]):
+        self.n_tokens: int = 0
+        self.n_tokens_matched: int = 0
+        self.n_items: int = 0
+        self.sum: ndarray = zeros(n_dims, dtype=float64)
+        self.cube_sum: ndarray = zeros(n_dims, dtype=float64)
+        self.max: ndarray = full(n_dims, -inf, dtype=float64)
+        self.dominant_categories: Dict[str, List[str]] = dominant_categories
+        self.dominant_counts: Dict[str, ndarray] = {
+            col: zeros(len(categories), dtype=intp)
+            for col, categories in dominant_categories.items()
+        }
+
+    def add(self, vectors: ndarray, dominant_codes: Dict[str, ndarray], n_tokens: int, n_tokens_matched: int):
+        """
+        Add a batch of matched items.
+        :param vectors:
+            items-x-dims vectors of matched items
+        :param dominant_codes:
+            Dominant.* column -> codes for the matched items
+        :param n_tokens:
+            Tokens in the batch, matched or not.
+        :param n_tokens_matched:
+        """
+        self.n_tokens += n_tokens
+        self.n_tokens_matched += n_tokens_matched
+        if vectors.shape[0] == 0:
+            return
+        self.n_items += vectors.shape[0]
+        self.sum += vectors.sum(axis=0)
+        self.cube_sum += (vectors ** 3).sum(axis=0)
+        self.max = maximum(self.max, vectors.max(axis=0))
+        for col, codes in dominant_codes.items():
+            # Missing values have code -1
+            self.dominant_counts[col] += bincount(codes[codes >= 0], minlength=len(self.dominant_categories[col]))
+
+    def merge(self, other: "ProfileAccumulator"):
+        """Add the sums from another accumulator into this one."""
+        self.n_tokens += other.n_tokens
+        self.n_tokens_matched += other.n_tokens_matched
+        self.n_items += other.n_items
+        self.sum += other.sum
+        self.cube_sum += other.cube_sum
+        self.max = maximum(self.max, other.max)
+        for col in self.dominant_counts:
+            self.dominant_counts[col] += other.dominant_counts[col]
+
+    def profile(self, document_id: int) -> DocumentProfile:
+        if self.n_items > 0:
+            mean = self.sum / self.n_items
+            minkowski3 = cbrt(self.cube_sum / self.n_items)
+            max_ = self.max.copy()
+        else:
+            mean = full(self.sum.shape, nan)
+            minkowski3 = full(self.sum.shape, nan)
+            max_ = full(self.sum.shape, nan)
+        return DocumentProfile(
+            document_id=document_id,
+            n_tokens=self.n_tokens,
+            n_tokens_matched=self.n_tokens_matched,
+            n_items=self.n_items,
+            mean=mean,
+            max=max_,
+            minkowski3=minkowski3,
+            dominant_counts={
+                col: {
+                    category: int(count)
+                    for category, count in zip(self.dominant_categories[col], self.dominant_counts[col])
+                }
+                for col in self.dominant_counts
+            },
+        )
+
+
+class CorpusAnnotator(object):
+    """
+    Computes sensorimotor profiles of documents, streaming through them with bounded memory.
+
+    Tokens are resolved against the norms in vectorised batches, and multi-word norms items (e.g. "ice cream") are
+    matched in preference to their component words, longest first.
+
+    Works with `SensorimotorNorms` or `shared.SharedNorms`.
+    """
+
+    def __init__(self,
+                 norms,
+                 tokenizer: Callable[[str], List[str]] = default_tokenizer,
+                 dominant_cols: List[str] = None,
+                 chunk_size: int = 100_000,
+                 ):
+        """
+        :param norms:
+        :param tokenizer:
+            Used to split documents given as strings.  Documents given as iterables of tokens are used as-is, so tokens
+            should already be normalised like the words in the norms (stripped and lower-cased).
+        :param dominant_cols:
+            `Dominant.*` columns to count.  Defaults to all three; pass an empty list when the norms haven't got the
+            stats columns.
+        :param chunk_size:
+            Number of tokens resolved at once.  Longer documents are processed in chunks of this size.
+        """
+        self.norms = norms
+        self.tokenizer: Callable[[str], List[str]] = tokenizer
+        self.chunk_size: int = chunk_size
+
+        self._vectors: ndarray = norms.matrix()
+
+        if dominant_cols is None:
+            dominant_cols = DEFAULT_DOMINANT_COLS
+        self._dominant_codes: Dict[str, ndarray] = dict()
+        self._dominant_categories: Dict[str, List[str]] = dict()
+        for col in dominant_cols:
+            self._dominant_codes[col], self._dominant_categories[col] = norms.categorical_codes(col)
+
+        # Single words are looked up in batches, so the trie only needs multi-word items
+        self._phrase_trie: PhraseTrie = PhraseTrie.from_norms(norms, multiword_only=True)
+
+    def new_accumulator(self) -> ProfileAccumulator:
+        return ProfileAccumulator(n_dims=self._vectors.shape[1], dominant_categories=self._dominant_categories)
+
+    def annotate(self, documents: Iterable[Union[str, Iterable[str]]]) -> Iterator[DocumentProfile]:
+        """
+        Yields the profile of each document in turn.
+        :param documents:
+            Each document is either a string, which is tokenized, or an iterable of tokens.
+        """
+        for document_id, document in enumerate(documents):
+            yield self.annotate_document(document, document_id=document_id)
+
+    def annotate_document(self, document: Union[str, Iterable[str]], document_id: int = 0) -> DocumentProfile:
+        """The profile of a single document."""
+        return self.accumulate(document).profile(document_id)
+
+    def accumulate(self, document: Union[str, Iterable[str]],
+                   accumulator: Optional[ProfileAccumulator] = None) -> ProfileAccumulator:
+        """
+        Add the tokens of a document to an accumulator.
+        :param document:
+        :param accumulator:
+            If None, a new accumulator is used.
+        :return:
+            The accumulator.
+        """
+        if accumulator is None:
+            accumulator = self.new_accumulator()
+        tokens = self.tokenizer(document) if isinstance(document, str) else document
+
+        buffer: List[str] = []
+        for token in tokens:
+            buffer.append(token)
+            if len(buffer) >= self.chunk_size:
+                n_consumed = self._accumulate_tokens(buffer, accumulator, final=False)
+                # Tokens near the end of the chunk might begin a multi-word item continuing into the next chunk
+                buffer = buffer[n_consumed:]
+        self._accumulate_tokens(buffer, accumulator, final=True)
+
+        return accumulator
+
+    def accumulate_lines(self, lines: Iterable[str],
+                         accumulator: Optional[ProfileAccumulator] = None) -> ProfileAccumulator:
+        """
+        Add the tokens of a sequence of lines to an accumulator, as if by calling `accumulate` on each line (so
+        multi-word items aren't matched across line breaks), but resolving the tokens of many short lines at once.
+        :param lines:
+        :param accumulator:
+            If None, a new accumulator is used.
+        :return:
+            The accumulator.
+        """
+        if accumulator is None:
+            accumulator = self.new_accumulator()
+
+        buffer: List[str] = []
+        phrase_spans: List[Tuple[int, int, int]] = []
+        for line in lines:
+            tokens = self.tokenizer(line)
+            if len(tokens) >= self.chunk_size:
+                # Long lines are chunked as usual
+                self.accumulate(tokens, accumulator)
+                continue
+            line_start = len(buffer)
+            buffer.extend(tokens)
+            phrase_spans.extend((line_start + start, line_start + stop, row)
+                                for start, stop, row in self._phrase_trie.scan(tokens))
+            if len(buffer) >= self.chunk_size:
+                self._add_tokens(buffer, phrase_spans, accumulator)
+                buffer, phrase_spans = [], []
+        self._add_tokens(buffer, phrase_spans, accumulator)
+
+        return accumulator
+
+    def _accumulate_tokens(self, tokens: List[str], accumulator: ProfileAccumulator, final: bool) -> int:
+        """
+        Resolve a chunk of tokens and add them to the accumulator.
+        :param final:
+            True if no more tokens follow this chunk.
+        :return:
+            The number of tokens consumed from the start of the chunk.  Unless `final`, tokens which might begin a
+            multi-word item continuing into the next chunk aren't consumed.
+        """
+        phrase_spans, n_consumed = self._find_phrases(tokens, final)
+        self._add_tokens(tokens[:n_consumed], phrase_spans, accumulator)
+        return n_consumed
+
+    def _add_tokens(self, tokens: List[str], phrase_spans: List[Tuple[int, int, int]],
+                    accumulator: ProfileAccumulator):
+        """
+        Add resolved tokens to the accumulator.
+        :param phrase_spans:
+            (start, stop, row) spans of the multi-word items matched among the tokens.
+        """
+        # Tokens not covered by a multi-word item are looked up individually
+        uncovered = ones(len(tokens), dtype=bool)
+        for start, stop, _row in phrase_spans:
+            uncovered[start:stop] = False
+        single_tokens = [token for token, is_uncovered in zip(tokens, uncovered) if is_uncovered]
+        single_rows = self.norms.rows_for_words(single_tokens)
+        single_rows = single_rows[single_rows >= 0]
+
+        rows = concatenate([array([row for _start, _stop, row in phrase_spans], dtype=intp), single_rows])
+        accumulator.add(
+            vectors=self._vectors[rows],
+            dominant_codes={col: codes[rows] for col, codes in self._dominant_codes.items()},
+            n_tokens=len(tokens),
+            n_tokens_matched=len(single_rows) + sum(stop - start for start, stop, _row in phrase_spans),
+        )
+
+    def _find_phrases(self, tokens: List[str], final: bool) -> Tuple[List[Tuple[int, int, int]], int]:
+        """
+        Finds multi-word items in a chunk of tokens, preferring the longest match at each position.
+        :return:
+            List of (start, stop, row) spans of matched items, and the number of tokens scanned.
+        """
+        # Unless this is the final chunk, don't start a match which could run off the end of it
+        limit = len(tokens) if final else max(len(tokens) - max(self._phrase_trie.max_length - 1, 0), 0)
+        spans = list(self._phrase_trie.scan(tokens, stop=limit))
+        # The last match may have run past the limit
+        n_scanned = max(limit, spans[-1][1]) if spans else limit
+        return spans, n_scanned
@@ -0,0 +1,119 @@
+"""
+===========================
+Sets of .npy arrays saved to a directory alongside the JSON metadata describing them, replaceable while being read.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+from logging import getLogger
+from os import path, makedirs, remove, replace
+from tempfile import mkstemp
+from typing import Callable, Dict, IO, Optional, Tuple
+from uuid import uuid4
+
+from numpy import load, save, ndarray
+
+logger = getLogger(__name__)
+
+META_FILE_NAME = "meta.json"
+
+# Key in the metadata naming the file of each array
+_ARRAY_FILES_KEY = "array_files"
+
+# Times to re-read the metadata when the arrays it names are replaced while they're being opened
+_LOAD_ATTEMPTS = 3
+
+
+def atomic_write(file_path: str, write: Callable[[IO[bytes]], None]):
+    """
+    Write a file by passing a binary file object to `write`, so that it either completely replaces any existing file at
+    `file_path` or (on failure) leaves it as it was.
+    The content goes first to a uniquely-named temporary file in the same directory, so concurrent writers never
+    clobber each other's partial files.
+    """
+    temp_fd, temp_path = mkstemp(dir=path.dirname(file_path) or None,
+                                 prefix=path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        with open(temp_fd, mode="wb") as temp_file:
+            write(temp_file)
+        replace(temp_path, file_path)
+    except BaseException:
+        remove(temp_path)
+        raise
+
+
+def save_array_set(directory: str, arrays: Dict[str, ndarray], meta: Dict):
+    """
+    Save named arrays and their metadata to `directory`, which is created if it doesn't exist.  Any set already there
+    is replaced.
+
+    Each save writes its arrays to new, uniquely-named files, and the metadata naming them goes last, atomically
+    replacing the previous metadata.  So a reader sees either the whole of the previous set or the whole of the new
+    one, never a mixture.  Files of the previous set are then removed; readers which have already opened or
+    memory-mapped them keep working.
+    """
+    makedirs(directory, exist_ok=True)
+    previous_files = _read_array_files(directory)
+
+    save_id = uuid4().hex
+    array_files: Dict[str, str] = dict()
+    for name, a in arrays.items():
+        array_files[name] = f"{name}.{save_id}.npy"
+        atomic_write(path.join(directory, array_files[name]), lambda f, a=a: save(f, a))
+
+    meta_json = json.dumps({**meta, _ARRAY_FILES_KEY: array_files})
+    atomic_write(path.join(directory, META_FILE_NAME), lambda f: f.write(meta_json.encode("utf-8")))
+
+    for file_name in set(previous_files.values()) - set(array_files.values()):
+        try:
+            remove(path.join(directory, file_name))
+        except OSError as er:
+            # E.g. on Windows, where files can't be removed while they're mapped
+            logger.warning(f"Couldn't remove replaced file {file_name} from {directory} ({er})")
+
+
+def load_array_set(directory: str, mmap_mode: Optional[str] = "r") -> Tuple[Dict, Dict[str, ndarray]]:
+    """
+    Load a set saved by `save_array_set`.
+    :param directory:
+    :param mmap_mode:
+        As for `numpy.load`.
+    :return:
+        The metadata, and the arrays by name.  Metadata not written by `save_array_set` (e.g. by an earlier version of
+        the format) comes back with no arrays, so callers can check it and complain.
+    """
+    for attempt in range(_LOAD_ATTEMPTS):
+        meta = _read_meta(directory)
+        array_files: Dict[str, str] = meta.pop(_ARRAY_FILES_KEY, dict())
+        try:
+            return meta, {name: load(path.join(directory, file_name), mmap_mode=mmap_mode)
+                          for name, file_name in array_files.items()}
+        except FileNotFoundError:
+            # Replaced since the metadata was read, so read the new metadata
+            if attempt == _LOAD_ATTEMPTS - 1:
+                raise
+            logger.debug(f"Arrays in {directory} were replaced while loading, retrying")
+
+
+def _read_meta(directory: str) -> Dict:
+    with open(path.join(directory, META_FILE_NAME), mode="r", encoding="utf-8") as meta_file:
+        return json.load(meta_file)
+
+
+def _read_array_files(directory: str) -> Dict[str, str]:
+    """The files named by the metadata already in `directory`, if any."""
+    try:
+        return _read_meta(directory).get(_ARRAY_FILES_KEY, dict())
+    except (OSError, ValueError):
+        return dict()
@@ -0,0 +1,122 @@
+"""
+===========================
+Benchmark of lookups through the norms server, against localhost.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import asyncio
+import socket
+from logging import getLogger
+from multiprocessing import Process
+from random import Random
+from time import perf_counter
+from typing import Dict, List
+
+from numpy import percentile
+
+from ..sensorimotor_norms import SensorimotorNorms
+from ..server import NormsServer, NormsClient, DEFAULT_HOST
+
+logger = getLogger(__name__)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind((DEFAULT_HOST, 0))
+        return s.getsockname()[1]
+
+
+def _run_server(port: int):
+    asyncio.run(NormsServer(SensorimotorNorms()).serve_tcp(DEFAULT_HOST, port))
+
+
+async def _connect_when_ready(port: int, max_batch: int, timeout: float = 120) -> NormsClient:
+    # The server has to load the norms before it starts listening
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            return await NormsClient.connect(DEFAULT_HOST, port, max_batch=max_batch)
+        except ConnectionError:
+            if perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def _run_clients(port: int, words: List[str], n_requests: int, concurrency: int, max_batch: int) -> Dict:
+    client = await _connect_when_ready(port, max_batch)
+    # Warm up
+    await asyncio.gather(*(client.vector(word) for word in words[:100]))
+
+    latencies: List[float] = []
+
+    async def worker(worker_words: List[str]):
+        for word in worker_words:
+            start = perf_counter()
+            await client.vector(word)
+            latencies.append(perf_counter() - start)
+
+    per_worker = n_requests // concurrency
+    start = perf_counter()
+    await asyncio.gather(*(
+        worker(words[i * per_worker:(i + 1) * per_worker])
+        for i in range(concurrency)
+    ))
+    elapsed = perf_counter() - start
+    await client.close()
+
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "max_batch": max_batch,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(percentile(latencies, 50)) * 1000,
+        "p99_ms": float(percentile(latencies, 99)) * 1000,
+    }
+
+
+def benchmark_server(n_requests: int = 50_000, concurrency: int = 100, seed: int = 0) -> List[Dict]:
+    """
+    Times per-word vector lookups through a server on localhost, with and without client-side coalescing.
+    :return:
+        Results for each configuration.
+    """
+    norms_words = list(SensorimotorNorms(lazy=True).iter_words())
+    rng = Random(seed)
+    words = [rng.choice(norms_words) for _ in range(n_requests)]
+
+    port = _free_port()
+    server_process = Process(target=_run_server, args=(port,), daemon=True)
+    server_process.start()
+    try:
+        results = []
+        for max_batch in [1, 1024]:
+            result = asyncio.run(_run_clients(port, words, n_requests, concurrency, max_batch))
+            logger.info(f"{result['requests']:,} requests, concurrency {concurrency}, max batch {max_batch}: "
+                        f"{result['requests_per_second']:,.0f} req/s, "
+                        f"p50 {result['p50_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms")
+            results.append(result)
+    finally:
+        server_process.terminate()
+        server_process.join()
+    return results
+
+
+if __name__ == '__main__':
+    from logging import basicConfig, INFO
+
+    basicConfig(level=INFO,
+                format="%(asctime)s | %(levelname)s | %(module)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+
+    benchmark_server()
@@ -0,0 +1,227 @@
+"""
+===========================
+Benchmark suite for loading, lookups, batches and translation, on synthetic norms of various sizes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from logging import getLogger
+from multiprocessing import get_context
+from os import path
+from random import Random
+from tempfile import TemporaryDirectory
+from timeit import default_timer
+from typing import Callable, Dict, List, Optional
+
+logger = getLogger(__name__)
+
+DEFAULT_SIZES = [40_000, 400_000, 4_000_000]
+_BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+# Number of single-word lookups timed in each repeat
+_N_LOOKUPS = 100_000
+
+
+def _best_time(function: Callable, repeats: int) -> float:
+    """Best wall-clock time of `repeats` calls, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = default_timer()
+        function()
+        times.append(default_timer() - start)
+    return min(times)
+
+
+def _benchmark_size(norms_path: str, work_dir: str, repeats: int) -> Dict:
+    """
+    Runs all the benchmarks against one norms file.
+    Runs in a fresh process, so nothing is already loaded or warm.
+    """
+    from ..sensorimotor_norms import SensorimotorNorms, LoadProfile, DataColNames
+
+    def make_norms(**kwargs) -> SensorimotorNorms:
+        return SensorimotorNorms(norms_path=norms_path,
+                                 cache_dir=path.join(work_dir, "cache"),
+                                 translation_table_path=path.join(work_dir, "breng_translations.json"),
+                                 **kwargs)
+
+    results: Dict = dict()
+
+    # region Construction
+
+    # Not sharing data between objects, so each one is built from scratch, except where that's what's being timed
+    construction = dict()
+    construction["ameng"] = _best_time(lambda: make_norms(use_cache=False, share_data=False), repeats)
+    construction["ameng_vectors_profile"] = _best_time(
+        lambda: make_norms(use_cache=False, share_data=False, profile=LoadProfile.vectors), repeats)
+
+    def lazy_vector_lookup():
+        # Loads only the words and the vectors
+        lazy_norms = make_norms(use_cache=False, share_data=False, lazy=True)
+        lazy_norms.sensorimotor_vector_for_word(next(iter(lazy_norms.iter_words())))
+    construction["ameng_lazy_vectors"] = _best_time(lazy_vector_lookup, repeats)
+    # Populate the cache, then time loading from it
+    make_norms(use_cache=True, share_data=False)
+    construction["ameng_cached"] = _best_time(lambda: make_norms(use_cache=True, share_data=False), repeats)
+    # While another object over the same file is alive
+    existing = make_norms(use_cache=False)
+    construction["ameng_shared"] = _best_time(lambda: make_norms(use_cache=False), repeats)
+    try:
+        # The first BrEng load selects translations and saves the table; after that the table is reused
+        start = default_timer()
+        make_norms(use_breng_translation=True, use_cache=False, share_data=False)
+        construction["breng_first"] = default_timer() - start
+        construction["breng"] = _best_time(
+            lambda: make_norms(use_breng_translation=True, use_cache=False, share_data=False), repeats)
+        # Only the words are translated, so everything else is shared with the AmEng object
+        construction["breng_shared"] = _best_time(lambda: make_norms(use_breng_translation=True, use_cache=False),
+                                                  repeats)
+    except ImportError:
+        logger.warning("BrEng translation dictionary not available, skipping BrEng construction")
+    del existing
+    results["construction_seconds"] = construction
+
+    # endregion
+
+    norms = make_norms(use_cache=True)
+    words = list(norms.iter_words())
+    rng = Random(0)
+    lookup_words = [rng.choice(words) for _ in range(_N_LOOKUPS)]
+
+    # region Single-word lookups
+
+    def vector_lookups():
+        for word in lookup_words:
+            norms.sensorimotor_vector_for_word(word)
+
+    def stat_lookups():
+        for word in lookup_words:
+            norms.stat_for_word(word, DataColNames.minkowski3_sensorimotor)
+
+    results["single_lookup_ns"] = {
+        "sensorimotor_vector_for_word": _best_time(vector_lookups, repeats) / _N_LOOKUPS * 1e9,
+        "stat_for_word": _best_time(stat_lookups, repeats) / _N_LOOKUPS * 1e9,
+    }
+
+    # endregion
+
+    # region Batches
+
+    batches = dict()
+    for batch_size in _BATCH_SIZES:
+        batch = lookup_words[:batch_size]
+        n_calls = max(1, _N_LOOKUPS // batch_size)
+
+        def batch_lookups():
+            for _ in range(n_calls):
+                norms.matrix_for_words(batch)
+
+        batches[str(batch_size)] = _best_time(batch_lookups, repeats) / n_calls * 1e6
+    results["matrix_for_words_us"] = batches
+    results["matrix_ms"] = _best_time(norms.matrix, repeats) * 1e3
+
+    # endregion
+
+    # region Translation
+
+    try:
+        from ..breng_translation.translation_logic import select_best_translations
+        # Exclude the cost of loading the dictionary, which happens on first use
+        select_best_translations(words[:1])
+        results["select_best_translations_seconds"] = _best_time(lambda: select_best_translations(words), repeats)
+    except ImportError:
+        logger.warning("BrEng translation dictionary not available, skipping translation")
+
+    # endregion
+
+    # region Memory
+
+    footprints = dict()
+    for profile in LoadProfile:
+        for compact in [False, True]:
+            footprints[f"{profile.value}{'.compact' if compact else ''}"] = make_norms(
+                profile=profile, compact=compact).memory_footprint()["total"]
+    results["memory_footprint_bytes"] = footprints
+
+    # endregion
+
+    results["n_words"] = len(words)
+    return results
+
+
+def run_suite(sizes: List[int] = None, repeats: int = 3, output_path: Optional[str] = None, seed: int = 0) -> Dict:
+    """
+    Runs the benchmarks on synthetic norms of each size.
+    :param sizes:
+        Numbers of rows.  Defaults to 40k, 400k and 4M.
+    :param repeats:
+        Each timing is the best of this many.
+    :param output_path:
+        If given, results are written here as JSON.
+    :param seed:
+        For the synthetic data.
+    :return:
+        The results.
+    """
+    import numpy
+    import pandas
+
+    from .synthetic import write_synthetic_norms
+
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "repeats": repeats,
+        "sizes": dict(),
+    }
+    for size in sizes:
+        with TemporaryDirectory() as work_dir:
+            norms_path = path.join(work_dir, "norms.csv")
+            write_synthetic_norms(norms_path, size, seed=seed)
+            logger.info(f"Benchmarking {size:,} rows")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                size_results = pool.submit(_benchmark_size, norms_path, work_dir, repeats).result()
+        logger.info(f"{size:,} rows: {json.dumps(size_results)}")
+        results["sizes"][str(size)] = size_results
+
+    if output_path is not None:
+        with open(output_path, mode="w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+        logger.info(f"Wrote results to {output_path}")
+    return results
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from logging import basicConfig, INFO
+
+    basicConfig(level=INFO,
+                format="%(asctime)s | %(levelname)s | %(module)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+
+    parser = ArgumentParser(description="Benchmark the norms on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of rows.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default="benchmark_results.json")
+    args = parser.parse_args()
+
+    run_suite(sizes=args.sizes, repeats=args.repeats, output_path=args.output)
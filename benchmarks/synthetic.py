@@ -0,0 +1,146 @@
+"""
+===========================
+Synthetic norms files with the real schema, for benchmarking at any size.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import getLogger
+from string import ascii_lowercase
+from typing import List
+
+from numpy import array, cbrt, column_stack, round as np_round
+from numpy.random import default_rng, Generator
+from pandas import DataFrame
+
+from ..sensorimotor_norms import DataColNames, SensorimotorNorms
+
+logger = getLogger(__name__)
+
+# Rows written at once, to bound memory for large files
+_CHUNK_ROWS = 250_000
+
+
+def _synthetic_words(n_words: int, rng: Generator, dictionary_fraction: float, multiword_fraction: float) -> List[str]:
+    """
+    Unique words: some from the translation dictionary (so translation has realistic work to do), some multi-word items,
+    and the rest made-up strings.
+    """
+    words = []
+    seen = set()
+
+    def add(word: str):
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+
+    if dictionary_fraction > 0:
+        try:
+            from ..breng_translation.dictionary.dialect_dictionary import ameng_to_breng
+            dictionary_words = sorted(ameng_to_breng.source_vocab)
+            for i in rng.permutation(len(dictionary_words))[:int(n_words * dictionary_fraction)]:
+                add(dictionary_words[i])
+        except ImportError:
+            logger.warning("BrEng translation dictionary not available, so synthetic words won't include any")
+
+    # Made-up words: the digits of a distinct number in base 26, at least 3 letters long
+    n_made_up = n_words - len(words)
+    first = 26 ** 2
+    made_up = []
+    for i in rng.permutation(n_made_up) + first:
+        letters = []
+        while i > 0:
+            i, digit = divmod(i, 26)
+            letters.append(ascii_lowercase[digit])
+        made_up.append("".join(letters))
+
+    # Some multi-word items, built from other words
+    n_multiword = int(n_words * multiword_fraction)
+    for word in made_up[n_multiword:]:
+        add(word)
+    for i in range(n_multiword):
+        add(made_up[i] + " " + made_up[(i + 1) % n_made_up])
+    # Collisions with dictionary words can leave us short
+    i = 0
+    while len(words) < n_words:
+        add(f"{made_up[i % n_made_up]}{i}")
+        i += 1
+    return words
+
+
+def _chunk(words: List[str], rng: Generator) -> DataFrame:
+    n = len(words)
+    n_sensory = len(SensorimotorNorms.SensoryColNames)
+    sensory_names = [col.split(".")[0] for col in SensorimotorNorms.SensoryColNames]
+    motor_names = [col.split(".")[0] for col in SensorimotorNorms.MotorColNames]
+
+    means = np_round(rng.uniform(0, 5, size=(n, len(SensorimotorNorms.VectorColNames))), 4)
+    sds = np_round(rng.uniform(0, 2.5, size=(n, len(SensorimotorNorms.SDColNames))), 4)
+
+    columns = {DataColNames.word: words}
+    for i, col in enumerate(SensorimotorNorms.VectorColNames):
+        columns[col] = means[:, i]
+    for i, col in enumerate(SensorimotorNorms.SDColNames):
+        columns[col] = sds[:, i]
+
+    for subspace, values, names in [("perceptual", means[:, :n_sensory], sensory_names),
+                                    ("action", means[:, n_sensory:], motor_names),
+                                    ("sensorimotor", means, sensory_names + motor_names)]:
+        columns[f"Max_strength.{subspace}"] = values.max(axis=1)
+        columns[f"Minkowski3.{subspace}"] = np_round(cbrt((values ** 3).sum(axis=1)), 4)
+        columns[f"Exclusivity.{subspace}"] = np_round(
+            (values.max(axis=1) - values.min(axis=1)) / values.sum(axis=1), 4)
+        columns[f"Dominant.{subspace}"] = array(names)[values.argmax(axis=1)]
+
+    for subspace, n_known, list_n, percentage_known, mean_age, list_no in [
+        ("perceptual", DataColNames.n_known_perceptual, DataColNames.n_list_perceptual,
+         DataColNames.percentage_known_perceptual, DataColNames.mean_age_perceptual, DataColNames.list_no_perceptual),
+        ("action", DataColNames.n_known_action, DataColNames.n_list_action,
+         DataColNames.percentage_known_action, DataColNames.mean_age_action, DataColNames.list_no_action),
+    ]:
+        list_ns = rng.integers(15, 25, size=n)
+        known = column_stack([rng.integers(0, list_ns + 1), list_ns]).min(axis=1)
+        columns[n_known] = known
+        columns[list_n] = list_ns
+        columns[percentage_known] = np_round(known / list_ns, 4)
+        columns[mean_age] = np_round(rng.uniform(18, 60, size=n), 2)
+        columns[list_no] = rng.integers(1, 500, size=n)
+
+    # Columns in the order they're declared, like the real file
+    col_order = [value for name, value in vars(DataColNames).items() if not name.startswith("_")]
+    return DataFrame(columns)[col_order]
+
+
+def write_synthetic_norms(file_path: str,
+                          n_rows: int,
+                          seed: int = 0,
+                          dictionary_fraction: float = 0.1,
+                          multiword_fraction: float = 0.02,
+                          ):
+    """
+    Write a norms file with the same columns as the real one, and random values.
+    :param file_path:
+    :param n_rows:
+    :param seed:
+    :param dictionary_fraction:
+        Fraction of the words to take from the BrEng translation dictionary, if it's available.
+    :param multiword_fraction:
+        Fraction of the words which are multi-word items.
+    """
+    rng = default_rng(seed)
+    words = _synthetic_words(n_rows, rng, dictionary_fraction=dictionary_fraction,
+                             multiword_fraction=multiword_fraction)
+    with open(file_path, mode="w", encoding="utf-8", newline="") as norms_file:
+        for start in range(0, n_rows, _CHUNK_ROWS):
+            _chunk(words[start:start + _CHUNK_ROWS], rng).to_csv(norms_file, index=False, header=(start == 0))
+    logger.info(f"Wrote {n_rows:,} synthetic norms rows to {file_path}")
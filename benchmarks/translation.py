@@ -0,0 +1,59 @@
+"""
+===========================
+Benchmark of BrEng translation selection over the words in the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import getLogger
+from timeit import default_timer
+
+from pandas import read_csv
+
+from ..breng_translation.translation_logic import select_best_translations
+from ..config.preferences import Preferences
+from ..sensorimotor_norms import DataColNames
+
+logger = getLogger(__name__)
+
+
+def benchmark_translation(repeats: int = 5) -> float:
+    """
+    Times `select_best_translations` over the words in the norms.
+    :return:
+        The best time in seconds.
+    """
+    words = read_csv(Preferences.sensorimotor_norms_path, usecols=[DataColNames.word], dtype=str,
+                     keep_default_na=False)[DataColNames.word].str.strip().str.lower().tolist()
+
+    # Exclude the cost of loading the dictionary, which happens on first use
+    select_best_translations(words[:1])
+
+    times = []
+    for _ in range(repeats):
+        start = default_timer()
+        select_best_translations(words)
+        times.append(default_timer() - start)
+    best = min(times)
+    logger.info(f"select_best_translations on {len(words):,} words: best of {repeats}: {best:.3f}s")
+    return best
+
+
+if __name__ == '__main__':
+    from logging import basicConfig, INFO
+
+    basicConfig(level=INFO,
+                format="%(asctime)s | %(levelname)s | %(module)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+
+    benchmark_translation()
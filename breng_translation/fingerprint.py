@@ -0,0 +1,49 @@
+"""
+===========================
+Fingerprints of the BrEng translation inputs.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from hashlib import sha256
+from os import path, walk
+
+_this_dir = path.dirname(path.realpath(__file__))
+_dictionary_dir = path.join(_this_dir, "dictionary")
+
+
+def translation_fingerprint() -> str:
+    """
+    A digest which changes whenever anything affecting the BrEng translations changes: the files of the
+    dictionary submodule (dictionary and vocabulary counts) and the translation logic itself.
+
+    Doesn't import the dictionary, so it's cheap to compute.
+    """
+    digest = sha256()
+    for file_path in [path.join(_this_dir, "translation_logic.py"), *_iter_files(_dictionary_dir)]:
+        digest.update(path.relpath(file_path, _this_dir).encode("utf-8"))
+        with open(file_path, mode="rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iter_files(root: str):
+    """All files under `root`, in a fixed order, skipping VCS and bytecode files."""
+    for dir_path, dir_names, file_names in walk(root):
+        # Walk in a fixed order, and don't descend into VCS or bytecode dirs
+        dir_names[:] = sorted(d for d in dir_names if not d.startswith(".") and d != "__pycache__")
+        for file_name in sorted(file_names):
+            if file_name.startswith(".") or file_name.endswith((".pyc", ".pyo")):
+                continue
+            yield path.join(dir_path, file_name)
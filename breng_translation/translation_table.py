@@ -0,0 +1,133 @@
+"""
+===========================
+Precomputed table of BrEng translations for the words in the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+from hashlib import sha256
+from logging import getLogger
+from os import path, makedirs
+from typing import Dict, Iterable, Optional
+
+from .fingerprint import translation_fingerprint
+from ..array_files import atomic_write
+from ..config.preferences import Preferences
+
+logger = getLogger(__name__)
+
+# Bump this whenever the layout of the table file changes
+_TABLE_FORMAT_VERSION = 1
+
+
+# The table is generated (or regenerated) by running this module, e.g.:
+#     python -m sensorimotor_norms.breng_translation.translation_table
+# It's also regenerated automatically whenever it's found to be out of date.
+
+
+def _words_fingerprint(words: Iterable[str]) -> str:
+    return sha256("\n".join(sorted(set(words))).encode("utf-8")).hexdigest()
+
+
+def load_translation_table(words: Iterable[str], file_path: str) -> Optional[Dict[str, str]]:
+    """
+    Loads a translation table, if it's current.
+    :param words:
+        The words the table should translate.
+    :param file_path:
+    :return:
+        The translations, or None if there isn't a table at `file_path` which was built for these words with the
+        current dictionary.
+    """
+    if not path.isfile(file_path):
+        return None
+    try:
+        with open(file_path, mode="r", encoding="utf-8") as table_file:
+            table = json.load(table_file)
+    except (OSError, ValueError) as er:
+        logger.warning(f"Couldn't read BrEng translation table from {file_path} ({er}), ignoring it")
+        return None
+    if (table.get("version") != _TABLE_FORMAT_VERSION
+            or table.get("translation_fingerprint") != translation_fingerprint()
+            or table.get("words_fingerprint") != _words_fingerprint(words)):
+        logger.info(f"BrEng translation table at {file_path} is out of date")
+        return None
+    return table["translations"]
+
+
+def save_translation_table(words: Iterable[str], translations: Dict[str, str], file_path: str):
+    """
+    Saves a translation table, fingerprinted against the words and the current dictionary.
+    """
+    table = {
+        "version": _TABLE_FORMAT_VERSION,
+        "translation_fingerprint": translation_fingerprint(),
+        "words_fingerprint": _words_fingerprint(words),
+        "translations": translations,
+    }
+    if path.dirname(file_path):
+        makedirs(path.dirname(file_path), exist_ok=True)
+    table_json = json.dumps(table, ensure_ascii=False)
+    atomic_write(file_path, lambda table_file: table_file.write(table_json.encode("utf-8")))
+    logger.info(f"Saved BrEng translation table to {file_path}")
+
+
+def translations_for_words(words: Iterable[str], verbose: bool = False, file_path: str = None) -> Dict[str, str]:
+    """
+    The best BrEng translation for each of the words, loaded from the precomputed table if it's current, else selected
+    afresh and saved as the new table.
+    :param words:
+    :param verbose:
+    :param file_path:
+        Defaults to `Preferences.breng_translation_table_path`.
+    :return:
+    """
+    words = list(words)
+    file_path = path.expanduser(file_path if file_path is not None else Preferences.breng_translation_table_path)
+
+    translations = load_translation_table(words, file_path)
+    if translations is not None:
+        return translations
+
+    from .translation_logic import select_best_translations
+    translations = select_best_translations(words, verbose=verbose)
+    try:
+        save_translation_table(words, translations, file_path)
+    except OSError as er:
+        logger.warning(f"Couldn't save BrEng translation table to {file_path} ({er})")
+    return translations
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from logging import basicConfig, INFO
+
+    from .translation_logic import select_best_translations
+    from ..sensorimotor_norms import SensorimotorNorms
+
+    basicConfig(level=INFO,
+                format="%(asctime)s | %(levelname)s | %(module)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+
+    parser = ArgumentParser(description="Precompute the BrEng translations of the words in the norms.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Where to save the table. Defaults to the configured breng-translation-table-location.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    norms_words = list(SensorimotorNorms(use_breng_translation=False).iter_words())
+    save_translation_table(norms_words,
+                           select_best_translations(norms_words, verbose=args.verbose),
+                           path.expanduser(args.output if args.output is not None
+                                           else Preferences.breng_translation_table_path))
@@ -0,0 +1,139 @@
+"""
+===========================
+On-disk cache of parsed sensorimotor norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pickle
+from hashlib import sha1, sha256
+from logging import getLogger
+from os import path, makedirs, stat
+from typing import Dict, Optional
+
+logger = getLogger(__name__)
+
+# Bump this whenever the layout of cached payloads changes
+_CACHE_FORMAT_VERSION = 2
+
+
+class NormsCache(object):
+    """
+    Snapshots of processed norms data, stored on disk.
+
+    Snapshots are keyed on the source file and the load options.  Each carries a fingerprint of what it was built from
+    (the source file's size, mtime and content hash; the numpy and pandas versions; and, when translating, the BrEng
+    dictionary), and a snapshot whose fingerprint doesn't match is treated as missing, so it'll be rebuilt and
+    overwritten on the next save.
+    """
+
+    def __init__(self, cache_dir: str, source_path: str, use_breng_translation: bool):
+        self.cache_dir: str = path.expanduser(cache_dir)
+        self.source_path: str = path.realpath(source_path)
+        self.use_breng_translation: bool = use_breng_translation
+
+        # Computed on demand, as hashing means reading the whole source file
+        self._fingerprint: Optional[Dict] = None
+
+    def _snapshot_path(self, name: str) -> str:
+        source_key = sha1(self.source_path.encode("utf-8")).hexdigest()[:16]
+        dialect = "breng" if self.use_breng_translation else "ameng"
+        return path.join(self.cache_dir, f"sensorimotor_norms_{source_key}_{dialect}.{name}.pkl")
+
+    def _source_stat(self) -> Dict:
+        source_stat = stat(self.source_path)
+        return {
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+        }
+
+    def fingerprint(self) -> Dict:
+        """The full fingerprint of the current source and options."""
+        if self._fingerprint is None:
+            import numpy
+            import pandas
+
+            digest = sha256()
+            with open(self.source_path, mode="rb") as source_file:
+                for chunk in iter(lambda: source_file.read(1 << 20), b""):
+                    digest.update(chunk)
+            fingerprint = {
+                "version": _CACHE_FORMAT_VERSION,
+                # Pickles aren't guaranteed to load, or to load the same, under other versions
+                "numpy": numpy.__version__,
+                "pandas": pandas.__version__,
+                **self._source_stat(),
+                "hash": digest.hexdigest(),
+                "use_breng_translation": self.use_breng_translation,
+            }
+            if self.use_breng_translation:
+                from .breng_translation.fingerprint import translation_fingerprint
+                fingerprint["translation"] = translation_fingerprint()
+            self._fingerprint = fingerprint
+        return self._fingerprint
+
+    def _is_current(self, stored: Dict) -> bool:
+        """True if a stored fingerprint matches the current source and options."""
+        if stored.get("version") != _CACHE_FORMAT_VERSION:
+            return False
+        if stored.get("use_breng_translation") != self.use_breng_translation:
+            return False
+        current = self.fingerprint()
+        # mtime may change without the content changing (e.g. a fresh checkout), so the content hash is what decides
+        return all(stored.get(key) == current.get(key) for key in ["size", "hash", "numpy", "pandas", "translation"])
+
+    def load(self, name: str) -> Optional[object]:
+        """
+        Load a named snapshot.
+        :return:
+            The snapshot, or None if there isn't a current one.
+        """
+        snapshot_path = self._snapshot_path(name)
+        if not path.isfile(snapshot_path):
+            return None
+        try:
+            with open(snapshot_path, mode="rb") as snapshot_file:
+                # The fingerprint is pickled ahead of the payload so we can check it without unpickling everything
+                stored_fingerprint = pickle.load(snapshot_file)
+                if not self._is_current(stored_fingerprint):
+                    logger.info(f"Cached {name} at {snapshot_path} is stale")
+                    return None
+                payload = pickle.load(snapshot_file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as er:
+            logger.warning(f"Couldn't read cached {name} from {snapshot_path} ({er}), ignoring it")
+            return None
+        logger.info(f"Loaded cached {name} from {snapshot_path}")
+        return payload
+
+    def save(self, name: str, payload: object):
+        """
+        Save a named snapshot, replacing any existing one.
+        Failure to write the cache is logged but otherwise ignored.
+        """
+        from .array_files import atomic_write
+
+        snapshot_path = self._snapshot_path(name)
+        fingerprint = self.fingerprint()
+
+        def write(snapshot_file):
+            pickle.dump(fingerprint, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(payload, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        try:
+            makedirs(self.cache_dir, exist_ok=True)
+            # Written atomically, so concurrently-starting processes never see a partial snapshot
+            atomic_write(snapshot_path, write)
+        except OSError as er:
+            logger.warning(f"Couldn't write cached {name} to {snapshot_path} ({er})")
+            return
+        logger.info(f"Saved cached {name} to {snapshot_path}")
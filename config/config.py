@@ -16,13 +16,14 @@ caiwingfield.net
 """
 
 from copy import deepcopy
+from logging import getLogger
 from os import path
 from typing import Dict
 
-import yaml
-
 from .singleton import UnsettableSingleton
 
+logger = getLogger(__name__)
+
 
 class Config(metaclass=UnsettableSingleton):
     """
@@ -40,18 +41,20 @@ class Config(metaclass=UnsettableSingleton):
         default_config_file_location = path.join(path.dirname(path.realpath(__file__)), 'default_config.yaml')
 
         if use_particular_overrides is not None:
-            print(f"Loading config file from {default_config_file_location} "
-                  f"with specific overrides set")
+            logger.info(f"Loading config file from {default_config_file_location} "
+                        f"with specific overrides set")
             self.overridden = True
         elif use_config_overrides_from_file is not None:
-            print(f"Loading config file from {default_config_file_location} "
-                  f"with overrides from {use_config_overrides_from_file}")
+            logger.info(f"Loading config file from {default_config_file_location} "
+                        f"with overrides from {use_config_overrides_from_file}")
             self.overridden = True
         else:
-            print(f"Loading config file from {default_config_file_location} "
-                  f"with no override.")
+            logger.info(f"Loading config file from {default_config_file_location} "
+                        f"with no override.")
             self.overridden = False
 
+        import yaml
+
         # Load files
         self._config_default: Dict
         self._config_override: Dict
@@ -15,15 +15,33 @@ caiwingfield.net
 ---------------------------
 """
 
+from typing import Dict, Tuple
+
 from .config import Config
 
 
-class Preferences:
+class _LazyPreferences(type):
+    """
+    Metaclass resolving preferences from the config when they're accessed, rather than when the class is defined, so
+    that importing doesn't load the config.
+    """
+
+    def __getattr__(cls, name):
+        try:
+            key_path = cls._key_paths[name]
+        except KeyError:
+            raise AttributeError(name)
+        return Config().value_by_key_path(*key_path)
+
+
+class Preferences(metaclass=_LazyPreferences):
     """
     Preferences for models.
     """
-    
-    # Static config
-    _config: Config = Config()
 
-    sensorimotor_norms_path = _config.value_by_key_path("sensorimotor-norms-location")
+    # Preference name -> config key path
+    _key_paths: Dict[str, Tuple[str, ...]] = {
+        "sensorimotor_norms_path":      ("sensorimotor-norms-location",),
+        "cache_dir":                    ("cache-location",),
+        "breng_translation_table_path": ("breng-translation-table-location",),
+    }
@@ -0,0 +1,89 @@
+"""
+===========================
+Features derived from the sensorimotor vectors.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from typing import Dict
+
+from numpy import ndarray, asarray, float64, cbrt, sqrt, einsum
+
+from .sensorimotor_norms import Subspace
+
+
+class DerivedFeatures(object):
+    """
+    Per-word features derived from the vectors, computed once for all words.
+
+    For each subspace: the L2 norm of each vector, the unit vectors (for cosine similarity), and the Minkowski-3 norm and
+    max strength (as in the norms' own `Minkowski3.*` and `Max_strength.*` stats, but available for every subspace and
+    without loading the stats columns).  Also the vectors rescaled to [0, 1] by the rating range.
+
+    All arrays are read-only and in the row order of the norms.
+    """
+
+    def __init__(self, arrays: Dict[str, ndarray]):
+        """
+        :param arrays:
+            As computed by `compute`.  Use that rather than calling this directly.
+        """
+        self.arrays: Dict[str, ndarray] = arrays
+        for values in self.arrays.values():
+            values.flags.writeable = False
+
+    @classmethod
+    def compute(cls, vectors: ndarray, rating_min: float, rating_max: float) -> "DerivedFeatures":
+        """
+        :param vectors:
+            words-x-dims matrix of sensorimotor vectors
+        :param rating_min:
+        :param rating_max:
+        """
+        vectors = asarray(vectors, dtype=float64)
+        arrays = {
+            "rescaled": (vectors - rating_min) / (rating_max - rating_min),
+        }
+        for subspace in Subspace:
+            sub_vectors = vectors[:, subspace.dims]
+            l2_norms = sqrt(einsum("ij,ij->i", sub_vectors, sub_vectors))
+            # Zero vectors stay zero
+            safe_norms = l2_norms.copy()
+            safe_norms[safe_norms == 0] = 1
+            arrays[f"l2_norms.{subspace.value}"] = l2_norms
+            arrays[f"unit_vectors.{subspace.value}"] = sub_vectors / safe_norms[:, None]
+            # Ratings are non-negative, so no need for absolute values
+            arrays[f"minkowski3.{subspace.value}"] = cbrt((sub_vectors ** 3).sum(axis=1))
+            arrays[f"max_strength.{subspace.value}"] = sub_vectors.max(axis=1)
+        return cls(arrays)
+
+    @property
+    def rescaled(self) -> ndarray:
+        """The vectors, rescaled from [rating_min, rating_max] to [0, 1]."""
+        return self.arrays["rescaled"]
+
+    def l2_norms(self, subspace: Subspace = Subspace.sensorimotor) -> ndarray:
+        return self.arrays[f"l2_norms.{subspace.value}"]
+
+    def unit_vectors(self, subspace: Subspace = Subspace.sensorimotor) -> ndarray:
+        """The vectors scaled to unit length.  Zero vectors are left as zero."""
+        return self.arrays[f"unit_vectors.{subspace.value}"]
+
+    def minkowski3(self, subspace: Subspace = Subspace.sensorimotor) -> ndarray:
+        return self.arrays[f"minkowski3.{subspace.value}"]
+
+    def max_strength(self, subspace: Subspace = Subspace.sensorimotor) -> ndarray:
+        return self.arrays[f"max_strength.{subspace.value}"]
+
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.arrays.values())
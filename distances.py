@@ -0,0 +1,321 @@
+"""
+===========================
+Distances between sensorimotor vectors.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Optional, Iterator, Tuple, Callable
+
+from numpy import ndarray, asarray, float64, float32, intp, sqrt, maximum, clip, zeros, abs as np_abs, cbrt, einsum, \
+    full, inf, arange, argpartition, argsort, take_along_axis, concatenate, nonzero, empty, dtype as np_dtype
+from numpy.lib.format import open_memmap
+from numpy.linalg import norm
+
+# Default upper bound on the memory used for tiles of distances in flight at once
+_DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+
+
+class DistanceType(Enum):
+    """Distances between vectors."""
+    cosine      = "cosine"
+    euclidean   = "euclidean"
+    # Matches the Minkowski3.* stats in the norms
+    minkowski3  = "minkowski3"
+    correlation = "correlation"
+
+
+class PreparedMatrix(object):
+    """
+    A matrix of row vectors, preprocessed once for a particular distance so that repeated distance computations
+    against it don't need to redo the per-row work (normalising, centring, squared norms).
+    """
+
+    def __init__(self, matrix: ndarray, distance_type: DistanceType):
+        matrix = asarray(matrix, dtype=float64)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        self.distance_type: DistanceType = distance_type
+        self.squared_norms: Optional[ndarray] = None
+
+        if distance_type is DistanceType.correlation:
+            matrix = matrix - matrix.mean(axis=1, keepdims=True)
+        if distance_type in {DistanceType.cosine, DistanceType.correlation}:
+            lengths = norm(matrix, axis=1, keepdims=True)
+            # Zero vectors stay zero, so are at distance 1 from everything
+            lengths[lengths == 0] = 1
+            matrix = matrix / lengths
+        elif distance_type is DistanceType.euclidean:
+            self.squared_norms = einsum("ij,ij->i", matrix, matrix)
+
+        self.values: ndarray = matrix
+
+    @classmethod
+    def from_unit_vectors(cls, unit_vectors: ndarray) -> "PreparedMatrix":
+        """
+        A matrix prepared for cosine distance from rows which are already unit length (or zero), e.g. from
+        `SensorimotorNorms.derived`, skipping the normalisation.
+        """
+        prepared = PreparedMatrix.__new__(PreparedMatrix)
+        prepared.distance_type = DistanceType.cosine
+        prepared.values = asarray(unit_vectors, dtype=float64)
+        prepared.squared_norms = None
+        return prepared
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def rows(self, start: int, stop: int) -> "PreparedMatrix":
+        """A view of a contiguous range of rows."""
+        view = PreparedMatrix.__new__(PreparedMatrix)
+        view.distance_type = self.distance_type
+        view.values = self.values[start:stop]
+        view.squared_norms = self.squared_norms[start:stop] if self.squared_norms is not None else None
+        return view
+
+    def take(self, rows: ndarray) -> "PreparedMatrix":
+        """A copy of selected rows, without preparing them again."""
+        taken = PreparedMatrix.__new__(PreparedMatrix)
+        taken.distance_type = self.distance_type
+        taken.values = self.values[rows]
+        taken.squared_norms = self.squared_norms[rows] if self.squared_norms is not None else None
+        return taken
+
+
+def prepared_distances(a: PreparedMatrix, b: PreparedMatrix) -> ndarray:
+    """
+    The matrix of distances between rows of `a` and rows of `b`.
+    :return:
+        len(a)-x-len(b) array of distances
+    :raises ValueError: When a and b were prepared for different distances
+    """
+    if a.distance_type is not b.distance_type:
+        raise ValueError(f"Can't compare matrices prepared for {a.distance_type.name} "
+                         f"and {b.distance_type.name} distances")
+    distance_type = a.distance_type
+
+    if distance_type in {DistanceType.cosine, DistanceType.correlation}:
+        return clip(1 - a.values @ b.values.T, 0, 2)
+
+    elif distance_type is DistanceType.euclidean:
+        squared = a.squared_norms[:, None] + b.squared_norms[None, :] - 2 * (a.values @ b.values.T)
+        return sqrt(maximum(squared, 0))
+
+    elif distance_type is DistanceType.minkowski3:
+        # Accumulate one dimension at a time to avoid a len(a)-x-len(b)-x-dims intermediate
+        total = zeros((len(a), len(b)), dtype=float64)
+        for dim in range(a.values.shape[1]):
+            total += np_abs(a.values[:, dim, None] - b.values[None, :, dim]) ** 3
+        return cbrt(total)
+
+    else:
+        raise NotImplementedError(distance_type)
+
+
+def pairwise_distances(a: ndarray, b: ndarray, distance_type: DistanceType) -> ndarray:
+    """
+    The matrix of distances between rows of `a` and rows of `b`.
+    :return:
+        len(a)-x-len(b) array of distances
+    """
+    return prepared_distances(PreparedMatrix(a, distance_type), PreparedMatrix(b, distance_type))
+
+
+# region All-pairs distances in tiles
+
+def iter_distance_tiles(a: ndarray,
+                        b: Optional[ndarray],
+                        distance_type: DistanceType,
+                        max_memory_bytes: int = _DEFAULT_MAX_MEMORY_BYTES,
+                        upper_triangle_only: bool = False,
+                        n_processes: int = 1,
+                        ) -> Iterator[Tuple[slice, slice, ndarray]]:
+    """
+    Computes distances between rows of `a` and rows of `b` in square tiles, without ever holding the whole distance
+    matrix in memory.
+    :param a:
+    :param b:
+        If None, distances are between rows of `a`.
+    :param distance_type:
+    :param max_memory_bytes:
+        Upper bound on the memory used by tiles in flight at once, including any being computed by other processes.
+    :param upper_triangle_only:
+        When `b` is None, skip tiles entirely below the diagonal.  Tiles straddling the diagonal are yielded whole.
+    :param n_processes:
+        Compute tiles in this many worker processes.
+    :return:
+        Iterator of (rows of a, rows of b, tile of distances), in a fixed order.
+    """
+    symmetric = b is None
+    prepared_a = PreparedMatrix(a, distance_type)
+    prepared_b = prepared_a if symmetric else PreparedMatrix(b, distance_type)
+
+    # Each tile needs its own memory, plus (for Minkowski) a tile-sized temporary while it's computed
+    n_in_flight = 1 if n_processes == 1 else 2 * n_processes
+    bytes_per_cell = 8 * (2 if distance_type is DistanceType.minkowski3 else 1)
+    tile_side = max(1, int(sqrt(max_memory_bytes / (n_in_flight * bytes_per_cell))))
+
+    tiles = [
+        (row_start, min(row_start + tile_side, len(prepared_a)), col_start, min(col_start + tile_side, len(prepared_b)))
+        for row_start in range(0, len(prepared_a), tile_side)
+        for col_start in range(0, len(prepared_b), tile_side)
+        if not (symmetric and upper_triangle_only and col_start + tile_side <= row_start)
+    ]
+
+    if n_processes == 1:
+        for row_start, row_stop, col_start, col_stop in tiles:
+            yield (slice(row_start, row_stop), slice(col_start, col_stop),
+                   prepared_distances(prepared_a.rows(row_start, row_stop), prepared_b.rows(col_start, col_stop)))
+        return
+
+    from .parallel import _ordered_results
+
+    with ProcessPoolExecutor(max_workers=n_processes,
+                             initializer=_init_tile_worker, initargs=(prepared_a, prepared_b)) as pool:
+        # Keep a bounded window of tiles in flight, and yield them in order
+        results = _ordered_results(pool, ((_compute_tile, *tile) for tile in tiles), n_in_flight)
+        for (row_start, row_stop, col_start, col_stop), distances in zip(tiles, results):
+            yield slice(row_start, row_stop), slice(col_start, col_stop), distances
+
+
+# Per-process state for tile workers
+_worker_a: Optional[PreparedMatrix] = None
+_worker_b: Optional[PreparedMatrix] = None
+
+
+def _init_tile_worker(prepared_a: PreparedMatrix, prepared_b: PreparedMatrix):
+    global _worker_a, _worker_b
+    _worker_a, _worker_b = prepared_a, prepared_b
+
+
+def _compute_tile(row_start: int, row_stop: int, col_start: int, col_stop: int) -> ndarray:
+    return prepared_distances(_worker_a.rows(row_start, row_stop), _worker_b.rows(col_start, col_stop))
+
+
+def distances_to_callback(a: ndarray, b: Optional[ndarray], distance_type: DistanceType,
+                          callback: Callable[[slice, slice, ndarray], None],
+                          **tile_kwargs):
+    """
+    Streams tiles of distances between rows of `a` and rows of `b` (or of `a`, if `b` is None) to a callback.
+    :param callback:
+        Called with (rows of a, rows of b, tile of distances) for each tile.
+    :param tile_kwargs:
+        Passed to `iter_distance_tiles`.
+    """
+    for rows, cols, distances in iter_distance_tiles(a, b, distance_type, **tile_kwargs):
+        callback(rows, cols, distances)
+
+
+def distances_to_file(a: ndarray, b: Optional[ndarray], distance_type: DistanceType, file_path: str,
+                      dtype=float32, condensed: bool = False,
+                      **tile_kwargs) -> ndarray:
+    """
+    Writes distances between rows of `a` and rows of `b` (or of `a`, if `b` is None) to a memory-mapped .npy file.
+    :param file_path:
+    :param dtype:
+        Data type of the stored distances.  float32 halves the size of the file.
+    :param condensed:
+        Only store the upper triangle (excluding the diagonal) of the distances between rows of `a`, flattened in the
+        same order as `scipy.spatial.distance.pdist`.  Requires `b` to be None.
+    :param tile_kwargs:
+        Passed to `iter_distance_tiles`.
+    :return:
+        The memory-mapped distances.
+    :raises ValueError: When asking for condensed distances between different matrices.
+    """
+    n_rows = asarray(a).shape[0]
+    if condensed:
+        if b is not None:
+            raise ValueError("Condensed distances are only possible between rows of a single matrix")
+        out = open_memmap(file_path, mode="w+", dtype=np_dtype(dtype), shape=(n_rows * (n_rows - 1) // 2,))
+        for rows, cols, distances in iter_distance_tiles(a, None, distance_type, upper_triangle_only=True, **tile_kwargs):
+            for i in range(rows.start, rows.stop):
+                # Entries (i, j) for j > i are contiguous in the condensed form
+                col_start = max(cols.start, i + 1)
+                if col_start >= cols.stop:
+                    continue
+                offset = n_rows * i - i * (i + 1) // 2 + (col_start - i - 1)
+                out[offset:offset + cols.stop - col_start] = distances[i - rows.start, col_start - cols.start:]
+    else:
+        n_cols = n_rows if b is None else asarray(b).shape[0]
+        out = open_memmap(file_path, mode="w+", dtype=np_dtype(dtype), shape=(n_rows, n_cols))
+        for rows, cols, distances in iter_distance_tiles(a, b, distance_type, **tile_kwargs):
+            out[rows, cols] = distances
+    out.flush()
+    return out
+
+
+def nearest_k(a: ndarray, b: Optional[ndarray], distance_type: DistanceType, k: int,
+              **tile_kwargs) -> Tuple[ndarray, ndarray]:
+    """
+    The k nearest rows of `b` to each row of `a`.
+    :param b:
+        If None, the nearest other rows of `a`.
+    :param tile_kwargs:
+        Passed to `iter_distance_tiles`.
+    :return:
+        Tuple of len(a)-x-k arrays: the indices of the nearest rows, and their distances, nearest first.
+    """
+    n_rows = asarray(a).shape[0]
+    n_cols = n_rows if b is None else asarray(b).shape[0]
+    k = min(k, n_cols - (1 if b is None else 0))
+
+    best_idxs = full((n_rows, k), -1, dtype=intp)
+    best_distances = full((n_rows, k), inf, dtype=float64)
+    for rows, cols, distances in iter_distance_tiles(a, b, distance_type, **tile_kwargs):
+        if b is None:
+            # Exclude each row from its own neighbours
+            diagonal = arange(max(rows.start, cols.start), min(rows.stop, cols.stop))
+            distances[diagonal - rows.start, diagonal - cols.start] = inf
+        # Merge this tile's candidates with the best so far
+        candidate_idxs = concatenate([best_idxs[rows], arange(cols.start, cols.stop)[None, :].repeat(rows.stop - rows.start, axis=0)], axis=1)
+        candidate_distances = concatenate([best_distances[rows], distances], axis=1)
+        keep = argpartition(candidate_distances, k - 1, axis=1)[:, :k]
+        best_idxs[rows] = take_along_axis(candidate_idxs, keep, axis=1)
+        best_distances[rows] = take_along_axis(candidate_distances, keep, axis=1)
+
+    order = argsort(best_distances, axis=1, kind="stable")
+    return take_along_axis(best_idxs, order, axis=1), take_along_axis(best_distances, order, axis=1)
+
+
+def distances_within(a: ndarray, b: Optional[ndarray], distance_type: DistanceType, threshold: float,
+                     **tile_kwargs) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    All pairs of rows of `a` and rows of `b` within a threshold distance of each other.
+    :param b:
+        If None, pairs of distinct rows of `a`, each pair given once with i < j.
+    :param threshold:
+        Pairs with distance <= threshold are returned.
+    :param tile_kwargs:
+        Passed to `iter_distance_tiles`.
+    :return:
+        Tuple of arrays: row indices in a, row indices in b, distances.
+    """
+    all_is, all_js, all_distances = [], [], []
+    for rows, cols, distances in iter_distance_tiles(a, b, distance_type, upper_triangle_only=b is None, **tile_kwargs):
+        tile_is, tile_js = nonzero(distances <= threshold)
+        tile_is += rows.start
+        tile_js += cols.start
+        if b is None:
+            upper = tile_is < tile_js
+            tile_is, tile_js = tile_is[upper], tile_js[upper]
+        all_is.append(tile_is)
+        all_js.append(tile_js)
+        all_distances.append(distances[tile_is - rows.start, tile_js - cols.start])
+    if not all_is:
+        return empty(0, dtype=intp), empty(0, dtype=intp), empty(0, dtype=float64)
+    return concatenate(all_is), concatenate(all_js), concatenate(all_distances)
+
+# endregion
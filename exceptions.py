@@ -21,3 +21,10 @@ class WordNotInNormsError(LookupError):
     An error raised when a word is not found in the norms.
     """
     pass
+
+
+class NormsServerError(RuntimeError):
+    """
+    An error reported by a norms server in response to a request.
+    """
+    pass
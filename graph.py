@@ -0,0 +1,342 @@
+"""
+===========================
+Sparse similarity graphs over the words in the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from numpy import ndarray, arange, argsort, asarray, bincount, concatenate, cumsum, diff, empty, flatnonzero, float32, \
+    int32, int64, lexsort, minimum, ones, repeat, unique, zeros
+
+from .array_files import save_array_set, load_array_set
+from .distances import DistanceType, nearest_k, distances_within
+from .exceptions import WordNotInNormsError
+from .sensorimotor_norms import SensorimotorNorms, Subspace
+
+logger = getLogger(__name__)
+
+# Bump this whenever the layout of saved graphs changes
+_GRAPH_FORMAT_VERSION = 2
+
+_INDPTR_ARRAY = "indptr"
+_INDICES_ARRAY = "indices"
+_WEIGHTS_ARRAY = "weights"
+
+
+class SimilarityGraph(object):
+    """
+    A sparse graph over the words in the norms, with an edge between similar words weighted by their distance.
+
+    The adjacency is stored in compressed sparse row (CSR) form: the neighbours of the word in row i are
+    `indices[indptr[i]:indptr[i+1]]`, at distances `weights[indptr[i]:indptr[i+1]]`.  Graphs can be saved as .npy
+    files and loaded back memory-mapped, so queries on a saved graph don't need it to be rebuilt or even read into
+    memory.
+    """
+
+    def __init__(self, words: List[str], indptr: ndarray, indices: ndarray, weights: ndarray, meta: Dict = None):
+        """
+        Prefer `SimilarityGraph.knn`, `SimilarityGraph.within` or `SimilarityGraph.load`.
+        :param words:
+            The word for each row.
+        :param indptr:
+        :param indices:
+        :param weights:
+        :param meta:
+            How the graph was built.
+        """
+        self.words: List[str] = words
+        self.indptr: ndarray = indptr
+        self.indices: ndarray = indices
+        self.weights: ndarray = weights
+        self.meta: Dict = meta if meta is not None else dict()
+
+        # word -> row
+        self._row_for_word: Dict[str, int] = {word: row for row, word in enumerate(words)}
+        # Computed on first use
+        self._component_labels: Optional[ndarray] = None
+
+    # region Building
+
+    @classmethod
+    def from_edges(cls, words: List[str], sources: ndarray, targets: ndarray, weights: ndarray,
+                   symmetric: bool = True, meta: Dict = None) -> "SimilarityGraph":
+        """
+        Build a graph from lists of edges.
+        :param words:
+        :param sources, targets:
+            Rows of the words at each end of each edge.
+        :param weights:
+            The distance for each edge.
+        :param symmetric:
+            Make each edge go both ways.  Duplicate edges are dropped.
+        :param meta:
+        """
+        sources = asarray(sources, dtype=int64)
+        targets = asarray(targets, dtype=int64)
+        weights = asarray(weights, dtype=float32)
+        if symmetric:
+            sources, targets = concatenate([sources, targets]), concatenate([targets, sources])
+            weights = concatenate([weights, weights])
+
+        # Sort by source, then target, and drop duplicates
+        order = lexsort((targets, sources))
+        sources, targets, weights = sources[order], targets[order], weights[order]
+        if len(sources) > 0:
+            keep = ones(len(sources), dtype=bool)
+            keep[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+            sources, targets, weights = sources[keep], targets[keep], weights[keep]
+
+        n_nodes = len(words)
+        indptr = zeros(n_nodes + 1, dtype=int64)
+        cumsum(bincount(sources, minlength=n_nodes), out=indptr[1:])
+        return cls(words=words,
+                   indptr=indptr,
+                   indices=targets.astype(int32 if n_nodes < 2 ** 31 else int64),
+                   weights=weights,
+                   meta=meta)
+
+    @classmethod
+    def knn(cls, norms: SensorimotorNorms, k: int,
+            distance_type: DistanceType = DistanceType.cosine,
+            subspace: Subspace = Subspace.sensorimotor,
+            symmetric: bool = True,
+            **tile_kwargs) -> "SimilarityGraph":
+        """
+        The k-nearest-neighbour graph: an edge from each word to each of its k nearest other words.
+        :param norms:
+        :param k:
+        :param distance_type:
+        :param subspace:
+        :param symmetric:
+            Also add the reverse of each edge, so words can have more than k neighbours.  Otherwise edges are directed.
+        :param tile_kwargs:
+            Passed to `distances.iter_distance_tiles`.
+        """
+        words = list(norms.iter_words())
+        neighbour_rows, neighbour_distances = nearest_k(norms.matrix()[:, subspace.dims], None, distance_type, k,
+                                                        **tile_kwargs)
+        sources = repeat(arange(len(words)), neighbour_rows.shape[1])
+        graph = cls.from_edges(words, sources, neighbour_rows.ravel(), neighbour_distances.ravel(),
+                               symmetric=symmetric,
+                               meta=_build_meta(norms, distance_type, subspace, kind="knn", k=k, symmetric=symmetric))
+        logger.info(f"Built {k}-nearest-neighbour graph with {graph.n_edges:,} edges")
+        return graph
+
+    @classmethod
+    def within(cls, norms: SensorimotorNorms, threshold: float,
+               distance_type: DistanceType = DistanceType.cosine,
+               subspace: Subspace = Subspace.sensorimotor,
+               **tile_kwargs) -> "SimilarityGraph":
+        """
+        The epsilon graph: an edge between each pair of distinct words within a threshold distance of each other.
+        :param norms:
+        :param threshold:
+            Words at distance <= threshold are joined.
+        :param distance_type:
+        :param subspace:
+        :param tile_kwargs:
+            Passed to `distances.iter_distance_tiles`.
+        """
+        words = list(norms.iter_words())
+        sources, targets, distances = distances_within(norms.matrix()[:, subspace.dims], None, distance_type, threshold,
+                                                       **tile_kwargs)
+        graph = cls.from_edges(words, sources, targets, distances, symmetric=True,
+                               meta=_build_meta(norms, distance_type, subspace, kind="within", threshold=threshold,
+                                                symmetric=True))
+        logger.info(f"Built graph of words within {threshold} with {graph.n_edges:,} edges")
+        return graph
+
+    # endregion
+
+    # region Saving and loading
+
+    def save(self, directory: str):
+        """
+        Save the graph to `directory`, which is created if it doesn't exist.  Any graph already there is replaced.
+        """
+        save_array_set(
+            directory,
+            arrays={
+                _INDPTR_ARRAY: asarray(self.indptr),
+                _INDICES_ARRAY: asarray(self.indices),
+                _WEIGHTS_ARRAY: asarray(self.weights),
+            },
+            meta={
+                "version": _GRAPH_FORMAT_VERSION,
+                "words": self.words,
+                **self.meta,
+            })
+        logger.info(f"Saved graph to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "SimilarityGraph":
+        """
+        Load a graph saved by `save`.
+        :param directory:
+        :param mmap:
+            Memory-map the adjacency arrays rather than reading them.
+        """
+        meta, arrays = load_array_set(directory, mmap_mode="r" if mmap else None)
+        if meta["version"] != _GRAPH_FORMAT_VERSION:
+            raise ValueError(f"Graph in {directory} has version {meta['version']}, "
+                             f"expected {_GRAPH_FORMAT_VERSION}. Rebuild it.")
+        words = meta.pop("words")
+        del meta["version"]
+        return cls(words=words,
+                   indptr=arrays[_INDPTR_ARRAY],
+                   indices=arrays[_INDICES_ARRAY],
+                   weights=arrays[_WEIGHTS_ARRAY],
+                   meta=meta)
+
+    # endregion
+
+    # region Queries
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.words)
+
+    @property
+    def n_edges(self) -> int:
+        """The number of stored edges.  In a symmetric graph, each undirected edge is stored both ways."""
+        return int(self.indptr[-1])
+
+    def _row(self, word: str) -> int:
+        try:
+            return self._row_for_word[word]
+        except KeyError:
+            raise WordNotInNormsError(word)
+
+    def _rows(self, words: Iterable[str]) -> ndarray:
+        return asarray([self._row(word) for word in words], dtype=int64)
+
+    def has_word(self, word: str) -> bool:
+        return word in self._row_for_word
+
+    def neighbours(self, word: str) -> List[Tuple[str, float]]:
+        """
+        The neighbours of a word and their distances, nearest first.
+        :raises WordNotInNormsError:
+        """
+        row = self._row(word)
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        neighbour_rows = self.indices[start:stop]
+        distances = self.weights[start:stop]
+        order = argsort(distances, kind="stable")
+        return [(self.words[neighbour_rows[i]], float(distances[i])) for i in order]
+
+    def _neighbour_rows(self, rows: ndarray) -> ndarray:
+        """All the neighbours of a batch of rows, concatenated, with repeats."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return empty(0, dtype=int64)
+        # Positions in `indices`: each row's start, plus 0, 1, ... up to its length
+        offsets = arange(total) - repeat(cumsum(lengths) - lengths, lengths)
+        return asarray(self.indices[repeat(starts, lengths) + offsets], dtype=int64)
+
+    def expand(self, words: Iterable[str], hops: int = 1) -> List[str]:
+        """
+        The words within a number of hops of any of the given words (including the given words), in row order.
+        :raises WordNotInNormsError:
+        """
+        rows = unique(self._rows(words))
+        reached = zeros(self.n_nodes, dtype=bool)
+        reached[rows] = True
+        frontier = rows
+        for _ in range(hops):
+            neighbour_rows = self._neighbour_rows(frontier)
+            frontier = unique(neighbour_rows[~reached[neighbour_rows]])
+            if len(frontier) == 0:
+                break
+            reached[frontier] = True
+        return [self.words[row] for row in flatnonzero(reached)]
+
+    def degree(self, word: str) -> int:
+        """
+        The number of neighbours of a word (out-neighbours, for a directed graph).
+        :raises WordNotInNormsError:
+        """
+        row = self._row(word)
+        return int(self.indptr[row + 1] - self.indptr[row])
+
+    def degrees(self) -> ndarray:
+        """The degree of each word, in row order."""
+        return diff(self.indptr)
+
+    def component_labels(self) -> ndarray:
+        """
+        The connected component each word belongs to, in row order, labelled by the smallest row in the component.
+        Edges are treated as undirected, so for a directed graph these are the weakly connected components.
+        Computed on first use.
+        """
+        if self._component_labels is None:
+            self._component_labels = self._compute_component_labels()
+        return self._component_labels
+
+    def _compute_component_labels(self) -> ndarray:
+        # Label propagation: every node repeatedly takes the smallest label among itself and its neighbours, with
+        # pointer jumping to shortcut long chains, until nothing changes.
+        n_nodes = self.n_nodes
+        labels = arange(n_nodes, dtype=int64)
+        if self.n_edges == 0:
+            return labels
+        sources = repeat(arange(n_nodes, dtype=int64), diff(self.indptr))
+        targets = asarray(self.indices, dtype=int64)
+        while True:
+            previous = labels
+            # Along edges in both directions, so directed graphs are treated as undirected
+            candidate = labels.copy()
+            minimum.at(candidate, sources, labels[targets])
+            minimum.at(candidate, targets, labels[sources])
+            labels = candidate[candidate]
+            while True:
+                jumped = labels[labels]
+                if (jumped == labels).all():
+                    break
+                labels = jumped
+            if (labels == previous).all():
+                return labels
+
+    def component_of(self, word: str) -> int:
+        """
+        The label of the connected component a word belongs to.
+        :raises WordNotInNormsError:
+        """
+        return int(self.component_labels()[self._row(word)])
+
+    def component_sizes(self) -> Dict[int, int]:
+        """Component label -> number of words in the component."""
+        labels, counts = unique(self.component_labels(), return_counts=True)
+        return {int(label): int(count) for label, count in zip(labels, counts)}
+
+    def n_components(self) -> int:
+        return len(unique(self.component_labels()))
+
+    # endregion
+
+
+def _build_meta(norms: SensorimotorNorms, distance_type: DistanceType, subspace: Subspace, kind: str,
+                **params) -> Dict:
+    return {
+        "kind": kind,
+        "distance_type": distance_type.value,
+        "subspace": subspace.value,
+        "using_breng_translation": norms.using_breng_translation,
+        **params,
+    }
+
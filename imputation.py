@@ -0,0 +1,255 @@
+"""
+===========================
+Estimated vectors for words which aren't in the norms, from related words which are.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import re
+from enum import Enum, auto
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from numpy import ndarray, empty, flatnonzero, fromiter, intp, nan, zeros
+
+from .lru_cache import LRUCache
+from .sensorimotor_norms import SensorimotorNorms, Subspace
+from .variants import normalise
+
+logger = getLogger(__name__)
+
+_component_separators = re.compile(r"[\s\-]+")
+
+# (suffix, replacements) for stripping inflectional and common derivational suffixes, tried in order.
+# Each replacement is appended to what's left after removing the suffix, e.g. "ies" -> "y" turns "berries" to "berry".
+_SUFFIX_RULES: List[Tuple[str, List[str]]] = [
+    ("ies",  ["y"]),
+    ("ied",  ["y"]),
+    ("iest", ["y"]),
+    ("ier",  ["y"]),
+    ("ily",  ["y"]),
+    ("iness", ["y"]),
+    ("sses", ["ss"]),
+    ("ches", ["ch"]),
+    ("shes", ["sh"]),
+    ("xes",  ["x"]),
+    ("ing",  ["", "e"]),
+    ("ed",   ["", "e"]),
+    ("est",  ["", "e"]),
+    ("er",   ["", "e"]),
+    ("ly",   [""]),
+    ("ness", [""]),
+    ("ment", [""]),
+    ("ful",  [""]),
+    ("less", [""]),
+    ("s",    [""]),
+]
+# Shortest stem worth looking up
+_MIN_STEM_LENGTH = 3
+
+
+class EstimateKind(Enum):
+    """How a word's vector was estimated."""
+    # A spelling variant of the word is in the norms: up to case and whitespace, hyphenation, AmEng/BrEng, or
+    # (optionally) a small misspelling
+    variant = auto()
+    # The word is a multi-word item or compound, and its components are in the norms.  The estimate is their mean.
+    components = auto()
+    # Another form of the word (e.g. its stem, with an inflection removed) is in the norms
+    stem = auto()
+
+
+class Estimate(object):
+    """How a word's vector was estimated, and from which words in the norms."""
+
+    def __init__(self, kind: EstimateKind, rows: List[int]):
+        self.kind: EstimateKind = kind
+        # The rows whose vectors are averaged
+        self.rows: List[int] = rows
+
+    def __repr__(self) -> str:
+        return f"Estimate({self.kind.name}, rows={self.rows})"
+
+
+def stem_candidates(word: str) -> List[str]:
+    """
+    Possible base forms of a word with a suffix removed, most likely first.
+    E.g. "running" -> ["runn", "runne", "run"], one of which is hopefully in the norms.
+    """
+    candidates = []
+    for suffix, replacements in _SUFFIX_RULES:
+        if not word.endswith(suffix):
+            continue
+        stem = word[:-len(suffix)]
+        for replacement in replacements:
+            candidate = stem + replacement
+            if len(candidate) >= _MIN_STEM_LENGTH and candidate not in candidates:
+                candidates.append(candidate)
+        # Doubled final consonant, e.g. "running" -> "run"
+        if len(stem) > _MIN_STEM_LENGTH and stem[-1] == stem[-2] and stem[-1] not in "aeiouls":
+            if stem[:-1] not in candidates:
+                candidates.append(stem[:-1])
+    return candidates
+
+
+class VectorImputer(object):
+    """
+    Estimates vectors for words which aren't in the norms from related words which are, tried in order:
+        spelling variants (see `variants.VariantIndex`);
+        morphological stems, e.g. "berries" -> "berry";
+        components of multi-word items and compounds, e.g. "ice-cream van", each of which may itself be a variant or
+        stem.
+
+    Estimates are cached per word, so batches with many repeats of the same missing words only resolve each once.
+    """
+
+    def __init__(self,
+                 norms: SensorimotorNorms,
+                 subspace: Subspace = Subspace.sensorimotor,
+                 use_variants: bool = True,
+                 use_components: bool = True,
+                 use_stems: bool = True,
+                 use_edit_distance: bool = False,
+                 cache_size: int = 1_000_000,
+                 ):
+        """
+        :param norms:
+        :param subspace:
+            Which dimensions to return.
+        :param use_variants:
+        :param use_components:
+        :param use_stems:
+        :param use_edit_distance:
+            Also accept variants which are small misspellings of a word in the norms.  Off by default, as they're more
+            often a different word than a misspelling.
+        :param cache_size:
+            Number of words whose estimates are cached.
+        """
+        self.norms: SensorimotorNorms = norms
+        self.subspace: Subspace = subspace
+        self.use_variants: bool = use_variants
+        self.use_components: bool = use_components
+        self.use_stems: bool = use_stems
+        self.use_edit_distance: bool = use_edit_distance
+
+        self._vectors: ndarray = norms.matrix()[:, subspace.dims]
+        self.cache: LRUCache = LRUCache(cache_size)
+
+    # region Estimating single words
+
+    def _find_row(self, word: str) -> Optional[int]:
+        """The row of the word or (if enabled) a spelling variant of it."""
+        if not self.use_variants:
+            row = self.norms.rows_for_words([word])[0]
+            return int(row) if row >= 0 else None
+        match = self.norms.match_word(word, allow_edit_distance=self.use_edit_distance)
+        return match.row if match is not None else None
+
+    def _find_stem_row(self, word: str) -> Optional[int]:
+        for candidate in stem_candidates(word):
+            row = self._find_row(candidate)
+            if row is not None:
+                return row
+        return None
+
+    def _estimate_single(self, word: str) -> Optional[Estimate]:
+        """An estimate from a variant or stem of a single word."""
+        row = self._find_row(word)
+        if row is not None:
+            return Estimate(EstimateKind.variant, [row])
+        if self.use_stems:
+            row = self._find_stem_row(word)
+            if row is not None:
+                return Estimate(EstimateKind.stem, [row])
+        return None
+
+    def _compute_estimate(self, word: str) -> Optional[Estimate]:
+        normalised = normalise(word)
+        estimate = self._estimate_single(normalised)
+        if estimate is not None:
+            return estimate
+
+        if self.use_components:
+            components = [c for c in _component_separators.split(normalised) if c]
+            if len(components) > 1:
+                rows = []
+                for component in components:
+                    component_estimate = self._estimate_single(component)
+                    if component_estimate is None:
+                        # Only estimate from all the components, as a compound isn't much like any one of them
+                        return None
+                    rows.extend(component_estimate.rows)
+                return Estimate(EstimateKind.components, rows)
+        return None
+
+    def estimate(self, word: str) -> Optional[Estimate]:
+        """
+        How the vector for a word not in the norms would be estimated.
+        :return:
+            The estimate, or None if the word can't be estimated.
+        """
+        return self.cache.get_or_compute(word, lambda: self._compute_estimate(word))
+
+    def vector_for_word(self, word: str) -> Optional[ndarray]:
+        """
+        The vector for a word, estimated if it's not in the norms.
+        :return:
+            The vector, or None if the word isn't in the norms and can't be estimated.
+        """
+        row = self.norms.rows_for_words([word])[0]
+        if row >= 0:
+            return self._vectors[row]
+        estimate = self.estimate(word)
+        if estimate is None:
+            return None
+        return self._vectors[estimate.rows].mean(axis=0)
+
+    # endregion
+
+    def matrix_for_words(self, words: Iterable[str], fill_value: float = nan) -> Tuple[ndarray, ndarray, ndarray]:
+        """
+        Vectors for a batch of words, like `SensorimotorNorms.matrix_for_words`, but estimating those not in the norms
+        rather than raising.  Each distinct word is only looked up (or estimated) once.
+        :param words:
+        :param fill_value:
+            Value filling the rows of words which can't be estimated.
+        :return:
+            A words-x-dims matrix;
+            a boolean mask which is True for the words found in the norms;
+            and a boolean mask which is True for the words whose vectors were estimated.
+            Words which are in neither mask got `fill_value`.
+        """
+        if not hasattr(words, "__len__"):
+            words = list(words)
+
+        # word -> index among the distinct words
+        distinct: Dict[str, int] = dict()
+        inverse = fromiter((distinct.setdefault(word, len(distinct)) for word in words), dtype=intp, count=len(words))
+        distinct_words = list(distinct)
+
+        rows = self.norms.rows_for_words(distinct_words)
+        found = rows >= 0
+        estimated = zeros(len(distinct_words), dtype=bool)
+
+        matrix = empty((len(distinct_words), self._vectors.shape[1]), dtype=self._vectors.dtype)
+        matrix[found] = self._vectors[rows[found]]
+        matrix[~found] = fill_value
+        for i in flatnonzero(~found):
+            estimate = self.estimate(distinct_words[i])
+            if estimate is not None:
+                matrix[i] = self._vectors[estimate.rows].mean(axis=0)
+                estimated[i] = True
+
+        logger.debug(f"{len(words):,} words ({len(distinct_words):,} distinct): {int(found.sum()):,} found, "
+                     f"{int(estimated.sum()):,} estimated")
+        return matrix[inverse], found[inverse], estimated[inverse]
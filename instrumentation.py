@@ -0,0 +1,280 @@
+"""
+===========================
+Timings, counters and latency histograms for the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from logging import getLogger, Logger, INFO
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+logger = getLogger(__name__)
+
+# Upper bounds of latency histogram buckets, in seconds
+DEFAULT_LATENCY_BUCKETS = [
+    1e-7, 2.5e-7, 5e-7,
+    1e-6, 2.5e-6, 5e-6,
+    1e-5, 2.5e-5, 5e-5,
+    1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2,
+    1e-1, 2.5e-1, 5e-1,
+    1.0,
+]
+
+
+class LatencyHistogram(object):
+    """Counts of call latencies in buckets, plus the total count, errors and summed time."""
+
+    def __init__(self, bucket_bounds: List[float]):
+        self.bucket_bounds: List[float] = bucket_bounds
+        # One more bucket than bounds, for latencies above the largest bound
+        self.bucket_counts: List[int] = [0] * (len(bucket_bounds) + 1)
+        self.count: int = 0
+        self.errors: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.bucket_counts[bisect_left(self.bucket_bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate of a latency quantile: the upper bound of the bucket it falls in.
+        Infinite if it falls above the largest bound, NaN if there are no observations.
+        """
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.bucket_bounds, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_seconds": self.sum,
+            "buckets": {str(bound): count for bound, count in zip(self.bucket_bounds, self.bucket_counts)},
+            "overflow": self.bucket_counts[-1],
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+        }
+
+
+class Sink(object):
+    """Receives instrumentation as it's recorded.  Override what's needed."""
+
+    def on_phase(self, name: str, seconds: float):
+        """A phase (e.g. of construction) finished."""
+        pass
+
+    def on_flush(self, instrumentation: "Instrumentation"):
+        """`Instrumentation.flush` was called."""
+        pass
+
+
+class LoggingSink(Sink):
+    """Logs phase timings as they happen, and a summary of everything on flush."""
+
+    def __init__(self, log: Optional[Logger] = None, level: int = INFO):
+        self.log: Logger = log if log is not None else logger
+        self.level: int = level
+
+    def on_phase(self, name: str, seconds: float):
+        self.log.log(self.level, f"{name}: {seconds * 1000:.1f}ms")
+
+    def on_flush(self, instrumentation: "Instrumentation"):
+        for name, histogram in sorted(instrumentation.histograms.items()):
+            self.log.log(self.level, f"{name}: {histogram.count:,} calls ({histogram.errors:,} errors), "
+                                     f"p50 <= {histogram.quantile(0.5) * 1e6:g}us, "
+                                     f"p99 <= {histogram.quantile(0.99) * 1e6:g}us")
+        for name, count in sorted(instrumentation.counters.items()):
+            self.log.log(self.level, f"{name}: {count:,}")
+
+
+class CallbackSink(Sink):
+    """Passes phase timings and flushed snapshots to callbacks."""
+
+    def __init__(self,
+                 on_phase: Optional[Callable[[str, float], None]] = None,
+                 on_flush: Optional[Callable[[Dict], None]] = None):
+        """
+        :param on_phase:
+            Called with (phase name, seconds).
+        :param on_flush:
+            Called with `Instrumentation.snapshot()`.
+        """
+        self._on_phase = on_phase
+        self._on_flush = on_flush
+
+    def on_phase(self, name: str, seconds: float):
+        if self._on_phase is not None:
+            self._on_phase(name, seconds)
+
+    def on_flush(self, instrumentation: "Instrumentation"):
+        if self._on_flush is not None:
+            self._on_flush(instrumentation.snapshot())
+
+
+class PrometheusFileSink(Sink):
+    """Writes the Prometheus text exposition on flush, e.g. for the node exporter's textfile collector."""
+
+    def __init__(self, file_path: str, prefix: str = "sensorimotor_norms"):
+        self.file_path: str = file_path
+        self.prefix: str = prefix
+
+    def on_flush(self, instrumentation: "Instrumentation"):
+        from .array_files import atomic_write
+
+        text = instrumentation.prometheus_text(self.prefix)
+        atomic_write(self.file_path, lambda f: f.write(text.encode("utf-8")))
+
+
+class _Timed(object):
+    """Context manager recording the latency of a call."""
+    __slots__ = ("_instrumentation", "_name", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._instrumentation.observe(self._name, perf_counter() - self._start, error=exc_type is not None)
+        return False
+
+
+class _Phase(object):
+    """Context manager recording the duration of a phase."""
+    __slots__ = ("_instrumentation", "_name", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._instrumentation.record_phase(self._name, perf_counter() - self._start)
+        return False
+
+
+class Instrumentation(object):
+    """
+    Records phase timings, event counters and per-method latency histograms, and passes them on to sinks.
+
+    Pass one to `SensorimotorNorms` to instrument it.  Without one, each instrumented method only pays for a single
+    `is None` check.
+    """
+
+    def __init__(self, sinks: List[Sink] = None, latency_buckets: List[float] = None):
+        """
+        :param sinks:
+        :param latency_buckets:
+            Upper bounds of latency histogram buckets, in seconds.  Defaults to `DEFAULT_LATENCY_BUCKETS`.
+        """
+        self.sinks: List[Sink] = list(sinks) if sinks is not None else []
+        self.latency_buckets: List[float] = sorted(latency_buckets if latency_buckets is not None
+                                                   else DEFAULT_LATENCY_BUCKETS)
+        # Total seconds spent in each phase
+        self.phase_seconds: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.histograms: Dict[str, LatencyHistogram] = dict()
+        self._lock: Lock = Lock()
+
+    def phase(self, name: str) -> _Phase:
+        """Context manager timing a phase."""
+        return _Phase(self, name)
+
+    def timed(self, name: str) -> _Timed:
+        """Context manager recording the latency of a call, and whether it raised."""
+        return _Timed(self, name)
+
+    def record_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phase_seconds[name] += seconds
+        for sink in self.sinks:
+            sink.on_phase(name, seconds)
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        """Record the latency of a call."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram(self.latency_buckets)
+            histogram.observe(seconds, error=error)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far, as plain data."""
+        with self._lock:
+            return {
+                "phase_seconds": dict(self.phase_seconds),
+                "counters": dict(self.counters),
+                "latencies": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+
+    def flush(self):
+        """Pass everything recorded so far to the sinks."""
+        for sink in self.sinks:
+            sink.on_flush(self)
+
+    def reset(self):
+        with self._lock:
+            self.phase_seconds.clear()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus_text(self, prefix: str = "sensorimotor_norms") -> str:
+        """Everything recorded so far, in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {prefix}_phase_seconds counter")
+            for name, seconds in sorted(self.phase_seconds.items()):
+                lines.append(f'{prefix}_phase_seconds{{phase="{name}"}} {seconds!r}')
+
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, count in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {count}')
+
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'{prefix}_errors_total{{method="{name}"}} {histogram.errors}')
+
+            lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bucket_bounds, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{prefix}_latency_seconds_bucket{{method="{name}",le="{bound!r}"}} {cumulative}')
+                lines.append(f'{prefix}_latency_seconds_bucket{{method="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_latency_seconds_sum{{method="{name}"}} {histogram.sum!r}')
+                lines.append(f'{prefix}_latency_seconds_count{{method="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,147 @@
+"""
+===========================
+Nearest neighbours in sensorimotor space.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from typing import List, Tuple, Iterable
+
+from numpy import ndarray, array, asarray, empty, float64, intp, argpartition, argsort, take_along_axis, arange, inf
+
+from .distances import DistanceType, PreparedMatrix, prepared_distances
+from .sensorimotor_norms import SensorimotorNorms, Subspace
+
+# Upper bound on the size of each block of distances computed at once
+_DEFAULT_MAX_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class NeighbourIndex(object):
+    """
+    Exact k-nearest-neighbour search over the words in the norms.
+
+    Queries are answered by computing distances to every word in blocks of queries, so memory stays bounded and the
+    work is done by a few large vectorised operations.  (With only 11 dimensions and tens of thousands of words, exact
+    blocked search beats tree-based indices.)  The word vectors are preprocessed for the chosen distance once, when the
+    index is built.
+    """
+
+    def __init__(self,
+                 norms: SensorimotorNorms,
+                 distance_type: DistanceType = DistanceType.cosine,
+                 subspace: Subspace = Subspace.sensorimotor,
+                 max_block_bytes: int = _DEFAULT_MAX_BLOCK_BYTES,
+                 ):
+        """
+        :param norms:
+        :param distance_type:
+        :param subspace:
+            Restrict the search to the sensory or motor dimensions.
+        :param max_block_bytes:
+            Upper bound on the memory used for each block of distances.
+        """
+        self.norms: SensorimotorNorms = norms
+        self.distance_type: DistanceType = distance_type
+        self.subspace: Subspace = subspace
+        self.words: List[str] = list(norms.iter_words())
+
+        if distance_type is DistanceType.cosine and hasattr(norms, "derived"):
+            # Unit vectors are precomputed with the norms.  (Not by `shared.SharedNorms`, which are prepared as usual.)
+            self._prepared: PreparedMatrix = PreparedMatrix.from_unit_vectors(norms.derived.unit_vectors(subspace))
+        else:
+            self._prepared: PreparedMatrix = PreparedMatrix(norms.matrix()[:, subspace.dims], distance_type)
+
+        # Minkowski distances need an extra block-sized temporary
+        bytes_per_query = 8 * len(self.words) * (2 if distance_type is DistanceType.minkowski3 else 1)
+        self._queries_per_block: int = max(1, max_block_bytes // bytes_per_query)
+
+    def nearest_to_vectors(self, vectors: ndarray, k: int, exclude_rows: ndarray = None) -> Tuple[ndarray, ndarray]:
+        """
+        The k nearest words to each of a batch of vectors.
+        :param vectors:
+            queries-x-dims matrix, with dims matching the subspace of the index.
+        :param k:
+        :param exclude_rows:
+            Optional row of the norms to exclude from the results for each query, or -1 to exclude nothing.
+        :return:
+            Tuple of queries-x-k arrays: the rows of the nearest words in the norms, and their distances, nearest first.
+            Rows can be converted to words with `self.words`.
+        """
+        return self._nearest_to_prepared(PreparedMatrix(vectors, self.distance_type), k, exclude_rows)
+
+    def _nearest_to_prepared(self, queries: PreparedMatrix, k: int, exclude_rows: ndarray = None
+                             ) -> Tuple[ndarray, ndarray]:
+        n_queries = len(queries)
+        k = min(k, len(self.words) - (0 if exclude_rows is None else 1))
+
+        nearest_rows = empty((n_queries, k), dtype=intp)
+        nearest_distances = empty((n_queries, k), dtype=float64)
+        for start in range(0, n_queries, self._queries_per_block):
+            stop = min(start + self._queries_per_block, n_queries)
+            distances = prepared_distances(queries.rows(start, stop), self._prepared)
+            if exclude_rows is not None:
+                block_exclude = asarray(exclude_rows[start:stop])
+                block_queries = arange(stop - start)[block_exclude >= 0]
+                distances[block_queries, block_exclude[block_exclude >= 0]] = inf
+
+            # Partial sort to get the k nearest, then sort just those
+            block_rows = argpartition(distances, k - 1, axis=1)[:, :k]
+            block_distances = take_along_axis(distances, block_rows, axis=1)
+            order = argsort(block_distances, axis=1, kind="stable")
+            nearest_rows[start:stop] = take_along_axis(block_rows, order, axis=1)
+            nearest_distances[start:stop] = take_along_axis(block_distances, order, axis=1)
+
+        return nearest_rows, nearest_distances
+
+    def nearest_to_words(self, words: Iterable[str], k: int, include_self: bool = False) -> Tuple[ndarray, ndarray]:
+        """
+        The k nearest words to each of a batch of words.
+        :param words:
+        :param k:
+        :param include_self:
+            If False (the default), a word is not counted among its own neighbours.
+        :return:
+            As for `nearest_to_vectors`.
+        :raises: WordNotInNormsError
+        """
+        rows = array([self.norms._row(word) for word in words], dtype=intp)
+        # The words' own rows are already prepared
+        return self._nearest_to_prepared(self._prepared.take(rows), k, exclude_rows=None if include_self else rows)
+
+    def nearest_to_vector(self, vector: ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        The k nearest words to a vector.
+        :return:
+            List of (word, distance) pairs, nearest first.
+        """
+        rows, distances = self.nearest_to_vectors(vector, k)
+        return [(self.words[row], float(distance)) for row, distance in zip(rows[0], distances[0])]
+
+    def nearest_to_word(self, word: str, k: int, include_self: bool = False) -> List[Tuple[str, float]]:
+        """
+        The k nearest words to a word.
+        Results are cached when the norms' result cache is enabled (see `SensorimotorNorms.enable_result_cache`).
+        :return:
+            List of (word, distance) pairs, nearest first.
+        :raises: WordNotInNormsError
+        """
+        cache = self.norms.result_cache
+        if cache is not None:
+            key = ("nearest_to_word", self.distance_type, self.subspace, word, k, include_self)
+            # Cached as a tuple so callers can't modify the cached result
+            return list(cache.get_or_compute(key, lambda: tuple(self._nearest_to_word(word, k, include_self))))
+        return self._nearest_to_word(word, k, include_self)
+
+    def _nearest_to_word(self, word: str, k: int, include_self: bool) -> List[Tuple[str, float]]:
+        rows, distances = self.nearest_to_words([word], k, include_self=include_self)
+        return [(self.words[row], float(distance)) for row, distance in zip(rows[0], distances[0])]
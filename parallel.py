@@ -0,0 +1,270 @@
+"""
+===========================
+Annotating corpora across multiple processes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from logging import getLogger
+from os import cpu_count, path
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .annotation import CorpusAnnotator, DocumentProfile, ProfileAccumulator, default_tokenizer
+from .shared import SharedNorms
+
+logger = getLogger(__name__)
+
+_DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+
+
+class ParallelAnnotator(object):
+    """
+    Annotates documents or files in a pool of worker processes.
+
+    Workers attach to a shared export of the norms (see `SensorimotorNorms.export_shared`) rather than each loading the
+    norms afresh, so every process maps the same copy of the data.
+
+    Results come back in input order, and partial results are always merged in the same order, so the output doesn't
+    depend on how work happens to be scheduled.
+    """
+
+    def __init__(self,
+                 shared_directory: str,
+                 n_processes: Optional[int] = None,
+                 tokenizer: Callable[[str], List[str]] = default_tokenizer,
+                 dominant_cols: List[str] = None,
+                 documents_per_task: int = 256,
+                 shard_bytes: int = _DEFAULT_SHARD_BYTES,
+                 progress_interval: float = 30.0,
+                 ):
+        """
+        :param shared_directory:
+            Directory the norms were exported to with `SensorimotorNorms.export_shared`.  Export with
+            `include_stats=True` unless `dominant_cols` is empty.
+        :param n_processes:
+            Defaults to the number of CPUs.
+        :param tokenizer:
+            As for `CorpusAnnotator`.  Must be picklable, i.e. a module-level function.
+        :param dominant_cols:
+            As for `CorpusAnnotator`.
+        :param documents_per_task:
+            Number of documents sent to a worker at once.
+        :param shard_bytes:
+            Files are split into shards of about this size, at line boundaries, so a few large files can still occupy
+            every worker.
+        :param progress_interval:
+            Log progress at most this often, in seconds.
+        """
+        self.shared_directory: str = shared_directory
+        self.n_processes: int = n_processes if n_processes is not None else cpu_count()
+        self.tokenizer: Callable[[str], List[str]] = tokenizer
+        self.dominant_cols: List[str] = dominant_cols
+        self.documents_per_task: int = documents_per_task
+        self.shard_bytes: int = shard_bytes
+        self.progress_interval: float = progress_interval
+
+    @classmethod
+    def from_norms(cls, norms, shared_directory: str, **kwargs) -> "ParallelAnnotator":
+        """
+        Export the norms to `shared_directory` and annotate with them.
+        :param norms:
+            A `SensorimotorNorms`.
+        :param shared_directory:
+        :param kwargs:
+            Passed to the constructor.
+        """
+        norms.export_shared(shared_directory, include_stats=kwargs.get("dominant_cols") != [])
+        return cls(shared_directory, **kwargs)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.n_processes,
+                                   initializer=_init_annotation_worker,
+                                   initargs=(self.shared_directory, self.tokenizer, self.dominant_cols))
+
+    def annotate(self, documents: Iterable[Union[str, List[str]]]) -> Iterator[DocumentProfile]:
+        """
+        Yields the profile of each document, in order.
+        :param documents:
+            Each document is either a string, which is tokenized, or a list of tokens.
+        """
+        progress = _Progress("documents", self.progress_interval)
+        with self._pool() as pool:
+            tasks = (
+                (_annotate_documents, first_id, batch)
+                for first_id, batch in _batched(documents, self.documents_per_task)
+            )
+            for profiles in _ordered_results(pool, tasks, n_in_flight=2 * self.n_processes):
+                progress.update(len(profiles), sum(p.n_tokens for p in profiles))
+                yield from profiles
+        progress.finish()
+
+    def annotate_files(self, file_paths: List[str],
+                       encoding: str = "utf-8") -> Tuple[List[DocumentProfile], DocumentProfile]:
+        """
+        Annotates each file as a single document, with each line tokenized separately.  (So multi-word items aren't
+        matched across line breaks.)
+        :param file_paths:
+        :param encoding:
+        :return:
+            The profile of each file (with `document_id` its position in `file_paths`), and the profile of all the files
+            together.
+        """
+        shards = [
+            (file_i, start, stop)
+            for file_i, file_path in enumerate(file_paths)
+            for start, stop in _file_shards(file_path, self.shard_bytes)
+        ]
+
+        progress = _Progress("shards", self.progress_interval)
+        file_accumulators: List[Optional[ProfileAccumulator]] = [None] * len(file_paths)
+        with self._pool() as pool:
+            tasks = (
+                (_annotate_file_shard, file_paths[file_i], start, stop, encoding)
+                for file_i, start, stop in shards
+            )
+            # Shards are merged in the order they appear in the files
+            for (file_i, _start, _stop), accumulator in zip(
+                    shards, _ordered_results(pool, tasks, n_in_flight=2 * self.n_processes)):
+                if file_accumulators[file_i] is None:
+                    file_accumulators[file_i] = accumulator
+                else:
+                    file_accumulators[file_i].merge(accumulator)
+                progress.update(1, accumulator.n_tokens)
+        progress.finish()
+
+        total: Optional[ProfileAccumulator] = None
+        for accumulator in file_accumulators:
+            if total is None:
+                total = ProfileAccumulator(n_dims=len(accumulator.sum),
+                                           dominant_categories=accumulator.dominant_categories)
+            total.merge(accumulator)
+        file_profiles = [accumulator.profile(file_i) for file_i, accumulator in enumerate(file_accumulators)]
+        return file_profiles, (total.profile(0) if total is not None else None)
+
+
+def _batched(items: Iterable, batch_size: int) -> Iterator[Tuple[int, List]]:
+    """Yields (index of first item, list of items) batches."""
+    batch = []
+    first_i = 0
+    for i, item in enumerate(items):
+        if not batch:
+            first_i = i
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield first_i, batch
+            batch = []
+    if batch:
+        yield first_i, batch
+
+
+def _ordered_results(pool: ProcessPoolExecutor, tasks: Iterator[Tuple], n_in_flight: int) -> Iterator:
+    """
+    Runs (function, *args) tasks in the pool, keeping a bounded window in flight, and yields the results in order.
+    """
+    in_flight = deque()
+    tasks = iter(tasks)
+    for function, *args in tasks:
+        in_flight.append(pool.submit(function, *args))
+        if len(in_flight) >= n_in_flight:
+            break
+    while in_flight:
+        result = in_flight.popleft().result()
+        for function, *args in tasks:
+            in_flight.append(pool.submit(function, *args))
+            break
+        yield result
+
+
+def _file_shards(file_path: str, shard_bytes: int) -> List[Tuple[int, int]]:
+    """Splits a file into (start, stop) byte ranges of about `shard_bytes`, each beginning at the start of a line."""
+    size = path.getsize(file_path)
+    starts = [0]
+    with open(file_path, mode="rb") as f:
+        position = shard_bytes
+        while position < size:
+            f.seek(position)
+            # Move on to the start of the next line
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            starts.append(position)
+            position += shard_bytes
+    return list(zip(starts, starts[1:] + [size]))
+
+
+class _Progress(object):
+    """Logs progress and throughput at intervals."""
+
+    def __init__(self, unit: str, interval: float):
+        self.unit: str = unit
+        self.interval: float = interval
+        self.n_done: int = 0
+        self.n_tokens: int = 0
+        self._start: float = perf_counter()
+        self._last_logged: float = self._start
+
+    def update(self, n_done: int, n_tokens: int):
+        self.n_done += n_done
+        self.n_tokens += n_tokens
+        now = perf_counter()
+        if now - self._last_logged >= self.interval:
+            self._last_logged = now
+            self._log(now)
+
+    def finish(self):
+        self._log(perf_counter())
+
+    def _log(self, now: float):
+        elapsed = now - self._start
+        rate = self.n_tokens / elapsed if elapsed > 0 else 0
+        logger.info(f"Annotated {self.n_done:,} {self.unit}, {self.n_tokens:,} tokens in {elapsed:.1f}s "
+                    f"({rate:,.0f} tokens/s)")
+
+
+# Per-process state for annotation workers
+_worker_annotator: Optional[CorpusAnnotator] = None
+
+
+def _init_annotation_worker(shared_directory: str, tokenizer: Callable[[str], List[str]], dominant_cols: List[str]):
+    global _worker_annotator
+    _worker_annotator = CorpusAnnotator(SharedNorms(shared_directory),
+                                        tokenizer=tokenizer, dominant_cols=dominant_cols)
+
+
+def _annotate_documents(first_id: int, documents: List[Union[str, List[str]]]) -> List[DocumentProfile]:
+    return [
+        _worker_annotator.annotate_document(document, document_id=first_id + i)
+        for i, document in enumerate(documents)
+    ]
+
+
+def _annotate_file_shard(file_path: str, start: int, stop: int, encoding: str) -> ProfileAccumulator:
+    with open(file_path, mode="rb") as f:
+        # Lines are resolved in batches, rather than one at a time
+        return _worker_annotator.accumulate_lines(line.decode(encoding) for line in _iter_lines(f, start, stop))
+
+
+def _iter_lines(f, start: int, stop: int) -> Iterator[bytes]:
+    """The lines of a binary file starting in the byte range [start, stop)."""
+    f.seek(start)
+    position = start
+    while position < stop:
+        line = f.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line
@@ -0,0 +1,125 @@
+"""
+===========================
+Finding multi-word norms items in running text.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Key under which a trie node stores the row of the item ending there.
+# Tokens are always strings, so this can't clash with a child.
+_ROW = None
+
+
+class PhraseTrie(object):
+    """
+    A trie over the tokens of norms items, used to find items in a stream of tokens.
+
+    Scanning finds, at each position, the longest item starting there, and then resumes after it (leftmost-longest).
+    As items are at most a few tokens long, this takes time linear in the length of the text.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, int]]):
+        """
+        :param items:
+            (item, row) pairs.  Items are split into tokens on single spaces.
+        """
+        self._root: Dict = dict()
+        self.n_items: int = 0
+        # Length in tokens of the longest item
+        self.max_length: int = 0
+        for item, row in items:
+            tokens = item.split(" ")
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, dict())
+            if _ROW not in node:
+                self.n_items += 1
+            node[_ROW] = row
+            self.max_length = max(self.max_length, len(tokens))
+
+    @classmethod
+    def from_norms(cls, norms, multiword_only: bool = False) -> "PhraseTrie":
+        """
+        A trie over the words in the norms (`SensorimotorNorms` or `shared.SharedNorms`), with their row ids.
+        :param norms:
+        :param multiword_only:
+            If True, only multi-word items are included.  Useful when single words will be looked up separately.
+        """
+        return cls(
+            (word, row)
+            for row, word in enumerate(norms.iter_words())
+            if not multiword_only or " " in word
+        )
+
+    def __len__(self) -> int:
+        return self.n_items
+
+    def __contains__(self, item: str) -> bool:
+        return self.row_for(item) is not None
+
+    def row_for(self, item: str) -> Optional[int]:
+        """The row of an item, or None if it's not in the trie."""
+        node = self._root
+        for token in item.split(" "):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(_ROW)
+
+    def longest_match(self, tokens: Sequence[str], start: int) -> Optional[Tuple[int, int]]:
+        """
+        The longest item beginning at `tokens[start]`.
+        :return:
+            (stop, row) of the match, so it spans `tokens[start:stop]`, or None if no item begins there.
+        """
+        match = None
+        node = self._root
+        for i in range(start, min(start + self.max_length, len(tokens))):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            row = node.get(_ROW)
+            if row is not None:
+                match = (i + 1, row)
+        return match
+
+    def scan(self, tokens: Sequence[str], stop: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+        """
+        Finds the items in a sequence of tokens.
+        :param tokens:
+        :param stop:
+            If given, only matches starting before this position are found.  A match starting before it may still end
+            after it.
+        :return:
+            Yields (start, stop, row) for each match, in order.  Matches don't overlap.
+        """
+        if stop is None:
+            stop = len(tokens)
+        root = self._root
+        i = 0
+        while i < stop:
+            # Most tokens don't start an item, so check that before anything else
+            if tokens[i] in root:
+                match = self.longest_match(tokens, i)
+                if match is not None:
+                    match_stop, row = match
+                    yield i, match_stop, row
+                    i = match_stop
+                    continue
+            i += 1
+
+    def find_all(self, tokens: Sequence[str]) -> List[Tuple[int, int, int]]:
+        """All (start, stop, row) matches in a sequence of tokens."""
+        return list(self.scan(tokens))
@@ -0,0 +1,146 @@
+"""
+===========================
+Linear projections of the sensorimotor vectors: PCA, whitening and subspaces.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from enum import Enum
+from typing import Dict
+
+from numpy import ndarray, abs as np_abs, argmax, argsort, arange, asarray, eye, float64, sign, sqrt, zeros
+from numpy.linalg import eigh
+
+from .sensorimotor_norms import Subspace
+
+# Components with less variance than this are treated as having none, and aren't scaled up by whitening
+_MIN_VARIANCE = 1e-12
+
+
+class ProjectionKind(Enum):
+    """Kinds of projection."""
+    # The subspace's own dimensions, unchanged
+    subspace = "subspace"
+    # Principal components: centred, and rotated onto the axes of greatest variance
+    pca      = "pca"
+    # Principal components scaled to unit variance
+    whitened = "whitened"
+
+
+class Projection(object):
+    """
+    A linear projection of full sensorimotor vectors (all of `VectorColNames`), fitted once over all the words in the
+    norms.
+
+    Projecting is a single matrix multiply: `vectors @ basis - offset`.  Projections onto the sensory or motor subspace
+    have zeros in the basis for the other dimensions, so they too take full vectors.
+    """
+
+    def __init__(self, kind: ProjectionKind, subspace: Subspace, arrays: Dict[str, ndarray]):
+        """
+        :param kind:
+        :param subspace:
+        :param arrays:
+            As computed by `fit`.  Use that rather than calling this directly.
+        """
+        self.kind: ProjectionKind = kind
+        self.subspace: Subspace = subspace
+        self.arrays: Dict[str, ndarray] = arrays
+        for values in self.arrays.values():
+            values.flags.writeable = False
+
+    @classmethod
+    def fit(cls, vectors: ndarray, kind: ProjectionKind, subspace: Subspace = Subspace.sensorimotor) -> "Projection":
+        """
+        :param vectors:
+            words-x-dims matrix of sensorimotor vectors.
+        :param kind:
+        :param subspace:
+        """
+        vectors = asarray(vectors, dtype=float64)
+        n_dims = vectors.shape[1]
+        dims = arange(n_dims)[subspace.dims]
+        sub_vectors = vectors[:, dims]
+
+        if kind is ProjectionKind.subspace:
+            sub_basis = eye(len(dims))
+            mean = zeros(n_dims)
+            variances = sub_vectors.var(axis=0, ddof=1)
+        else:
+            sub_mean = sub_vectors.mean(axis=0)
+            centred = sub_vectors - sub_mean
+            covariance = centred.T @ centred / max(len(centred) - 1, 1)
+            variances, sub_basis = eigh(covariance)
+            # Greatest variance first
+            order = argsort(variances)[::-1]
+            variances, sub_basis = variances[order].clip(min=0), sub_basis[:, order]
+            # Fix the sign of each component so its largest loading is positive, so repeated fits agree
+            sub_basis = sub_basis * sign(sub_basis[argmax(np_abs(sub_basis), axis=0), arange(len(dims))])
+            if kind is ProjectionKind.whitened:
+                scales = sqrt(variances)
+                scales[variances < _MIN_VARIANCE] = 1
+                sub_basis = sub_basis / scales
+            mean = zeros(n_dims)
+            mean[dims] = sub_mean
+
+        # Embed the subspace basis in the full space
+        basis = zeros((n_dims, len(dims)))
+        basis[dims] = sub_basis
+        return cls(kind, subspace, {
+            "basis": basis,
+            "offset": mean @ basis,
+            "variances": variances,
+        })
+
+    @property
+    def basis(self) -> ndarray:
+        """dims-x-components matrix."""
+        return self.arrays["basis"]
+
+    @property
+    def offset(self) -> ndarray:
+        """The projection of the mean, subtracted after multiplying by the basis to centre the result."""
+        return self.arrays["offset"]
+
+    @property
+    def n_components(self) -> int:
+        return self.basis.shape[1]
+
+    @property
+    def explained_variance(self) -> ndarray:
+        """The variance of the words along each component."""
+        return self.arrays["variances"]
+
+    @property
+    def explained_variance_ratio(self) -> ndarray:
+        """The fraction of the subspace's total variance along each component."""
+        total = self.explained_variance.sum()
+        return self.explained_variance / total if total > 0 else self.explained_variance
+
+    def truncated(self, n_components: int) -> "Projection":
+        """The projection onto just the first `n_components` components, without refitting."""
+        return Projection(self.kind, self.subspace, {
+            "basis": self.basis[:, :n_components],
+            "offset": self.offset[:n_components],
+            "variances": self.explained_variance[:n_components],
+        })
+
+    def project(self, vectors: ndarray) -> ndarray:
+        """
+        :param vectors:
+            A words-x-dims matrix of full sensorimotor vectors, or a single vector.
+        :return:
+            words-x-components coordinates (or a single row of them).
+        """
+        return asarray(vectors, dtype=float64) @ self.basis - self.offset
+
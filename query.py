@@ -0,0 +1,321 @@
+"""
+===========================
+Selecting words from the norms by conditions on their stats.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from numpy import ndarray, asarray, empty, isnan, argsort, searchsorted, flatnonzero, sort, equal, not_equal, less, \
+    less_equal, greater, greater_equal, logical_and, logical_or, logical_not, isin, issubdtype, number, floating, \
+    zeros
+
+# Comparisons which a sorted index can answer, and the range of sorted values they select:
+# op -> (searchsorted side for the lower bound, or None if unbounded below;
+#        searchsorted side for the upper bound, or None if unbounded above)
+_RANGE_SIDES = {
+    equal:         ("left", "right"),
+    less:          (None, "left"),
+    less_equal:    (None, "right"),
+    greater:       ("right", None),
+    greater_equal: ("left", None),
+}
+
+
+def _missing(values: ndarray) -> ndarray:
+    """Mask of the missing values in a column: NaN, or None in a column of objects."""
+    if issubdtype(values.dtype, floating):
+        return isnan(values)
+    if values.dtype == object:
+        # NaN is the only value not equal to itself
+        return equal(values, None) | not_equal(values, values)
+    return zeros(values.shape, dtype=bool)
+
+
+class Predicate(object):
+    """
+    A condition on the columns of the norms.
+    Combine with `&`, `|` and `~`.
+    """
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        """Write the mask of rows satisfying the predicate into `out`."""
+        raise NotImplementedError()
+
+    @property
+    def cols(self) -> Set[str]:
+        """The columns the predicate refers to."""
+        raise NotImplementedError()
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return _And([self, other])
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return _Or([self, other])
+
+    def __invert__(self) -> "Predicate":
+        return _Not(self)
+
+
+class _Comparison(Predicate):
+    def __init__(self, col: str, op: Callable, value):
+        self.col: str = col
+        self.op: Callable = op
+        self.value = value
+
+    @property
+    def cols(self) -> Set[str]:
+        return {self.col}
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        column = columns.get(self.col)
+        self.op(column, self.value, out=out)
+        if self.op is not_equal:
+            # Missing values aren't equal to anything either
+            logical_and(out, logical_not(_missing(column)), out=out)
+
+
+class _Between(Predicate):
+    def __init__(self, col: str, low: float, high: float):
+        self.col: str = col
+        self.low: float = low
+        self.high: float = high
+
+    @property
+    def cols(self) -> Set[str]:
+        return {self.col}
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        column = columns.get(self.col)
+        greater_equal(column, self.low, out=out)
+        logical_and(out, less_equal(column, self.high), out=out)
+
+
+class _IsIn(Predicate):
+    def __init__(self, col: str, values: Iterable):
+        self.col: str = col
+        self.values: List = list(values)
+
+    @property
+    def cols(self) -> Set[str]:
+        return {self.col}
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        out[:] = isin(columns.get(self.col), self.values)
+
+
+class _And(Predicate):
+    def __init__(self, predicates: List[Predicate]):
+        # Flatten nested conjunctions, so they're evaluated in a single pass
+        self.predicates: List[Predicate] = [
+            leaf
+            for predicate in predicates
+            for leaf in (predicate.predicates if isinstance(predicate, _And) else [predicate])
+        ]
+
+    @property
+    def cols(self) -> Set[str]:
+        return set().union(*(predicate.cols for predicate in self.predicates))
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        out[:] = True
+        scratch = empty(out.shape, dtype=bool)
+        for predicate in self.predicates:
+            predicate.evaluate(columns, scratch)
+            logical_and(out, scratch, out=out)
+
+
+class _Or(Predicate):
+    def __init__(self, predicates: List[Predicate]):
+        self.predicates: List[Predicate] = [
+            leaf
+            for predicate in predicates
+            for leaf in (predicate.predicates if isinstance(predicate, _Or) else [predicate])
+        ]
+
+    @property
+    def cols(self) -> Set[str]:
+        return set().union(*(predicate.cols for predicate in self.predicates))
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        out[:] = False
+        scratch = empty(out.shape, dtype=bool)
+        for predicate in self.predicates:
+            predicate.evaluate(columns, scratch)
+            logical_or(out, scratch, out=out)
+
+
+class _Not(Predicate):
+    def __init__(self, predicate: Predicate):
+        self.predicate: Predicate = predicate
+
+    @property
+    def cols(self) -> Set[str]:
+        return self.predicate.cols
+
+    def evaluate(self, columns: "_Columns", out: ndarray):
+        self.predicate.evaluate(columns, out)
+        logical_not(out, out=out)
+        # Rows missing a value weren't selected by the predicate, but aren't selected by its negation either
+        for col in self.cols:
+            logical_and(out, logical_not(_missing(columns.get(col))), out=out)
+
+
+class Column(object):
+    """
+    A column of the norms, to build predicates from, e.g.:
+        col(DataColNames.dominant_perceptual) == "Visual"
+        col(ComputedColNames.fraction_known) > 0.9
+    Comparisons with missing values (including `!=`) are always False, and a negated predicate (`~`) is False for
+    rows missing a value in any of the columns it refers to.
+    """
+
+    def __init__(self, name: str):
+        self.name: str = name
+
+    def __eq__(self, value) -> Predicate:
+        return _Comparison(self.name, equal, value)
+
+    def __ne__(self, value) -> Predicate:
+        return _Comparison(self.name, not_equal, value)
+
+    def __lt__(self, value) -> Predicate:
+        return _Comparison(self.name, less, value)
+
+    def __le__(self, value) -> Predicate:
+        return _Comparison(self.name, less_equal, value)
+
+    def __gt__(self, value) -> Predicate:
+        return _Comparison(self.name, greater, value)
+
+    def __ge__(self, value) -> Predicate:
+        return _Comparison(self.name, greater_equal, value)
+
+    def between(self, low: float, high: float) -> Predicate:
+        """low <= value <= high"""
+        return _Between(self.name, low, high)
+
+    def isin(self, values: Iterable) -> Predicate:
+        return _IsIn(self.name, values)
+
+    # Comparison operators are overloaded, so columns can't be hashed by value
+    __hash__ = None
+
+
+def col(name: str) -> Column:
+    """A column of the norms, to build predicates from.  See `Column`."""
+    return Column(name)
+
+
+class SortedIndex(object):
+    """The rows of a numeric column in order of value, for answering range conditions without scanning the column."""
+
+    def __init__(self, values: ndarray):
+        """
+        :raises ValueError: When the column isn't numeric.
+        """
+        if not issubdtype(values.dtype, number):
+            raise ValueError(f"Can only index numeric columns, not {values.dtype}")
+        values = asarray(values, dtype=float)
+        missing = isnan(values)
+        # Missing values sort last, and are never selected
+        self.order: ndarray = argsort(values, kind="stable")
+        self.n_present: int = int(len(values) - missing.sum())
+        self.sorted_values: ndarray = values[self.order[:self.n_present]]
+
+    def rows_in_range(self, low: float, low_side: Optional[str], high: float, high_side: Optional[str]) -> ndarray:
+        """Rows with values in the range, unordered."""
+        start = searchsorted(self.sorted_values, low, side=low_side) if low_side is not None else 0
+        stop = searchsorted(self.sorted_values, high, side=high_side) if high_side is not None else self.n_present
+        return self.order[start:max(start, stop)]
+
+
+class _Columns(object):
+    """Columns of the norms, optionally restricted to a subset of rows."""
+
+    def __init__(self, get_column: Callable[[str], ndarray], rows: Optional[ndarray] = None):
+        self._get_column: Callable[[str], ndarray] = get_column
+        self._rows: Optional[ndarray] = rows
+
+    def get(self, col: str) -> ndarray:
+        column = self._get_column(col)
+        return column if self._rows is None else column[self._rows]
+
+
+class Query(object):
+    """
+    The rows of the norms satisfying all of a list of predicates.
+
+    Predicates are evaluated together in a single pass over the columns involved, writing into one mask, without
+    building intermediate frames.  When one of the conditions is a range or equality condition on a column with a
+    sorted index (see `SensorimotorNorms.create_sorted_index`), the index selects the candidate rows and the other
+    conditions are only checked on those.
+    """
+
+    def __init__(self, norms, predicates: Iterable[Predicate]):
+        """
+        :param norms:
+            A `SensorimotorNorms`.
+        :param predicates:
+            All of these must be satisfied.
+        """
+        self.norms = norms
+        self.predicate: _And = _And(list(predicates))
+
+    def _indexed_candidates(self) -> Tuple[Optional[ndarray], List[Predicate]]:
+        """
+        Use the most selective indexed condition to find candidate rows.
+        :return:
+            Candidate rows (or None if no condition can use an index), and the remaining conditions to check.
+        """
+        best: Optional[Tuple[ndarray, int]] = None
+        for i, predicate in enumerate(self.predicate.predicates):
+            index = self.norms.sorted_indexes.get(getattr(predicate, "col", None))
+            if index is None:
+                continue
+            if isinstance(predicate, _Comparison) and predicate.op in _RANGE_SIDES:
+                low_side, high_side = _RANGE_SIDES[predicate.op]
+                rows = index.rows_in_range(predicate.value, low_side, predicate.value, high_side)
+            elif isinstance(predicate, _Between):
+                rows = index.rows_in_range(predicate.low, "left", predicate.high, "right")
+            else:
+                continue
+            if best is None or len(rows) < len(best[0]):
+                best = (rows, i)
+        if best is None:
+            return None, self.predicate.predicates
+        rows, used_i = best
+        return sort(rows), [p for i, p in enumerate(self.predicate.predicates) if i != used_i]
+
+    def rows(self) -> ndarray:
+        """The rows satisfying the query, in ascending order."""
+        candidates, remaining = self._indexed_candidates()
+        if candidates is None:
+            mask = empty(self.norms.n_items, dtype=bool)
+            self.predicate.evaluate(_Columns(self.norms._column), mask)
+            return flatnonzero(mask)
+        if not remaining or len(candidates) == 0:
+            return candidates
+        mask = empty(len(candidates), dtype=bool)
+        _And(remaining).evaluate(_Columns(self.norms._column, rows=candidates), mask)
+        return candidates[mask]
+
+    def words(self) -> List[str]:
+        """The words satisfying the query, in the order of the norms."""
+        words = self.norms._words
+        return [words[row] for row in self.rows()]
+
+    def count(self) -> int:
+        return len(self.rows())
+
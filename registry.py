@@ -0,0 +1,96 @@
+"""
+===========================
+Process-wide registry of loaded norms data, shared between norms objects.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import getLogger
+from os import path, stat
+from threading import Lock
+from typing import Tuple, Optional
+from weakref import WeakValueDictionary
+
+logger = getLogger(__name__)
+
+
+def file_source_key(file_path: str) -> str:
+    """
+    Key for data read from a file: its real path, size and mtime.  Cheap, as it doesn't read the file, and changes
+    whenever the file is rewritten.
+    """
+    real_path = path.realpath(file_path)
+    file_stat = stat(real_path)
+    return f"file:{real_path}:{file_stat.st_size}:{file_stat.st_mtime_ns}"
+
+
+def frame_source_key(frame) -> str:
+    """
+    Key for data taken from an in-memory DataFrame.
+    Norms objects built from a frame hold on to it, so its id can't be reused while anything is registered under it.
+    """
+    return f"frame:{id(frame)}"
+
+
+class NormsRegistry(object):
+    """
+    Loaded norms data (frames of columns, the vectors matrix, derived features), keyed by the source it came from and
+    a name for the piece of data.
+
+    `SensorimotorNorms` objects look here before reading anything, and register what they read, so any number of them
+    over the same source share one copy.  E.g. a BrEng-translated and an untranslated view of the same file only
+    differ in their words, and share all the numeric data.
+
+    Entries are held weakly, so they're dropped once no norms object uses them.  Anything registered must be treated as
+    read-only.
+    """
+
+    def __init__(self):
+        self._entries: WeakValueDictionary = WeakValueDictionary()
+        self._lock: Lock = Lock()
+
+    def get(self, source_key: str, name: str) -> Optional[object]:
+        """The registered data, or None."""
+        return self._entries.get((source_key, name))
+
+    def register(self, source_key: str, name: str, data: object) -> object:
+        """
+        Register data, unless something is already registered under the same key.
+        :return:
+            Whichever is registered, which is what the caller should use.
+        """
+        key: Tuple[str, str] = (source_key, name)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+            self._entries[key] = data
+            return data
+
+    def clear(self):
+        """
+        Forget everything registered.  Norms objects already using the data keep it, but new ones won't share with
+        them.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._entries
+
+
+# The registry used by all norms objects in this process
+norms_registry = NormsRegistry()
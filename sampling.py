@@ -0,0 +1,232 @@
+"""
+===========================
+Sampling and matching stimuli from the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from numpy import ndarray, arange, asarray, argsort, column_stack, concatenate, empty, flatnonzero, float64, intp, \
+    isnan, nanmean, nanstd, ones, unique, zeros
+from numpy.random import default_rng, Generator
+
+from .distances import DistanceType, nearest_k
+from .sensorimotor_norms import DataColNames
+
+# Number of nearest candidates considered for each item per round of matching
+_MATCH_CANDIDATES = 10
+
+
+class StimulusSampler(object):
+    """
+    Seeded, vectorised sampling of words from the norms.
+
+    Candidate sets are given as arrays of rows, e.g. from `SensorimotorNorms.query(...).rows()`; by default all words
+    are candidates.  Results are rows; convert them to words with `words_for_rows`.
+    """
+
+    def __init__(self, norms, seed: Optional[int] = None):
+        """
+        :param norms:
+            A `SensorimotorNorms`.
+        :param seed:
+            Samples are reproducible given the same seed and the same sequence of calls.
+        """
+        self.norms = norms
+        self.rng: Generator = default_rng(seed)
+
+    def _candidates(self, rows: Optional[ndarray]) -> ndarray:
+        return arange(self.norms.n_items) if rows is None else asarray(rows, dtype=intp)
+
+    def words_for_rows(self, rows: ndarray) -> List[str]:
+        words = self.norms._words
+        return [words[row] for row in rows]
+
+    def sample(self, n: int, rows: Optional[ndarray] = None, replace: bool = False) -> ndarray:
+        """
+        Draw n rows at once.
+        :param n:
+        :param rows:
+            Candidate rows.  Defaults to all.
+        :param replace:
+            Sample with replacement.
+        :return:
+            The sampled rows, in the order drawn.
+        :raises ValueError: When sampling without replacement and there aren't n candidates.
+        """
+        return self.rng.choice(self._candidates(rows), size=n, replace=replace)
+
+    def sample_stratified(self,
+                          n_per_stratum: Union[int, Dict[str, int]],
+                          by: str = DataColNames.dominant_sensorimotor,
+                          rows: Optional[ndarray] = None,
+                          replace: bool = False,
+                          ) -> Dict[str, ndarray]:
+        """
+        Draw rows separately from each value of a categorical column (e.g. a `Dominant.*` column).
+        :param n_per_stratum:
+            Number to draw from every stratum, or a dict of stratum -> number.  Strata not in the dict aren't drawn
+            from.
+        :param by:
+            Column to stratify by.
+        :param rows:
+            Candidate rows.  Defaults to all.
+        :param replace:
+        :return:
+            Dict of stratum -> sampled rows.
+        :raises ValueError: When a stratum hasn't enough candidates: fewer than asked for without replacement, or none
+            with replacement.
+        """
+        candidates = self._candidates(rows)
+        codes, categories = self.norms.categorical_codes(by)
+        candidate_codes = codes[candidates]
+
+        # Group candidates by stratum in one sort rather than a mask per stratum
+        order = argsort(candidate_codes, kind="stable")
+        sorted_codes = candidate_codes[order]
+        present_codes, starts = unique(sorted_codes, return_index=True)
+        stops = concatenate([starts[1:], [len(sorted_codes)]])
+        strata = {
+            categories[code]: candidates[order[start:stop]]
+            for code, start, stop in zip(present_codes, starts, stops)
+            # Missing values have code -1
+            if code >= 0
+        }
+
+        if isinstance(n_per_stratum, int):
+            n_per_stratum = {stratum: n_per_stratum for stratum in categories}
+        samples = dict()
+        for stratum, n in n_per_stratum.items():
+            stratum_rows = strata.get(stratum, empty(0, dtype=intp))
+            # Even with replacement, there must be something to draw
+            if len(stratum_rows) < (n if not replace else min(n, 1)):
+                raise ValueError(f"Can't draw {n} from stratum {stratum} of {by}, "
+                                 f"which only has {len(stratum_rows)} candidates")
+            samples[stratum] = self.rng.choice(stratum_rows, size=n, replace=replace)
+        return samples
+
+    def match(self,
+              rows_a: ndarray,
+              rows_b: ndarray,
+              cols: List[str],
+              exact_cols: List[str] = None,
+              replace: bool = False,
+              max_distance: Optional[float] = None,
+              ) -> Tuple[ndarray, ndarray, ndarray]:
+        """
+        Pair each row in `rows_a` with the closest row in `rows_b` on some stats, e.g. to match items across two
+        conditions on familiarity and strength.
+
+        Columns are standardised over the union of both sets, and closeness is Euclidean distance between standardised
+        values.  Each item's nearest candidates are found with `distances.nearest_k` in blocks.  Without replacement,
+        pairs are assigned greedily from those candidates, closest first, with further rounds for items whose candidates
+        were all taken.
+
+        :param rows_a:
+        :param rows_b:
+        :param cols:
+            Numeric columns to match on.
+        :param exact_cols:
+            Columns which must be equal within a pair, e.g. `Dominant.*` columns.
+        :param replace:
+            Allow a row of `rows_b` to be paired more than once.
+        :param max_distance:
+            Don't make pairs further apart than this.
+        :return:
+            Tuple of arrays: the paired rows of a, the paired rows of b, and the distance of each pair.  Rows of a left
+            unpaired (because of missing values, `max_distance`, `exact_cols`, or running out of rows of b) are omitted.
+        """
+        rows_a = asarray(rows_a, dtype=intp)
+        rows_b = asarray(rows_b, dtype=intp)
+
+        values = column_stack([asarray(self.norms._column(col), dtype=float64) for col in cols])
+        values_a, values_b = values[rows_a], values[rows_b]
+        pooled = concatenate([values_a, values_b])
+        mean = nanmean(pooled, axis=0)
+        std = nanstd(pooled, axis=0)
+        std[(std == 0) | isnan(std)] = 1
+        values_a = (values_a - mean) / std
+        values_b = (values_b - mean) / std
+
+        # Rows with missing values can't be matched
+        usable_a = flatnonzero(~isnan(values_a).any(axis=1))
+        usable_b = flatnonzero(~isnan(values_b).any(axis=1))
+
+        # Split into blocks which must match exactly
+        if exact_cols:
+            exact_codes = column_stack([self.norms.categorical_codes(col)[0] for col in exact_cols])
+            keys_a = exact_codes[rows_a[usable_a]]
+            keys_b = exact_codes[rows_b[usable_b]]
+            blocks = []
+            for key in unique(keys_a, axis=0):
+                blocks.append((usable_a[(keys_a == key).all(axis=1)], usable_b[(keys_b == key).all(axis=1)]))
+        else:
+            blocks = [(usable_a, usable_b)]
+
+        paired_a, paired_b, paired_distances = [], [], []
+        for block_a, block_b in blocks:
+            if len(block_a) == 0 or len(block_b) == 0:
+                continue
+            i_a, i_b, distances = _match_block(values_a[block_a], values_b[block_b], replace=replace)
+            paired_a.append(block_a[i_a])
+            paired_b.append(block_b[i_b])
+            paired_distances.append(distances)
+
+        if not paired_a:
+            return empty(0, dtype=intp), empty(0, dtype=intp), empty(0, dtype=float64)
+        i_a = concatenate(paired_a)
+        i_b = concatenate(paired_b)
+        distances = concatenate(paired_distances)
+        if max_distance is not None:
+            close = distances <= max_distance
+            i_a, i_b, distances = i_a[close], i_b[close], distances[close]
+        # Report in the order of rows_a
+        order = argsort(i_a, kind="stable")
+        return rows_a[i_a[order]], rows_b[i_b[order]], distances[order]
+
+
+def _match_block(a: ndarray, b: ndarray, replace: bool) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    Pair rows of `a` with nearby rows of `b`.
+    :return:
+        Indices into a, indices into b, and distances, for each pair.
+    """
+    if replace:
+        idxs, distances = nearest_k(a, b, DistanceType.euclidean, 1)
+        return arange(len(a)), idxs[:, 0], distances[:, 0]
+
+    matched_b = empty(len(a), dtype=intp)
+    matched_distances = empty(len(a), dtype=float64)
+    unmatched_a = arange(len(a))
+    available_b = ones(len(b), dtype=bool)
+    paired = zeros(len(a), dtype=bool)
+    while len(unmatched_a) > 0 and available_b.any():
+        candidates_b = flatnonzero(available_b)
+        idxs, distances = nearest_k(a[unmatched_a], b[candidates_b], DistanceType.euclidean, _MATCH_CANDIDATES)
+        k = idxs.shape[1]
+        # Assign the closest pairs first.  Each round makes at least one pair, and usually nearly all of them.
+        for flat_i in argsort(distances, axis=None, kind="stable"):
+            query_i, candidate_i = divmod(int(flat_i), k)
+            i_a = unmatched_a[query_i]
+            i_b = candidates_b[idxs[query_i, candidate_i]]
+            if paired[i_a] or not available_b[i_b]:
+                continue
+            paired[i_a] = True
+            available_b[i_b] = False
+            matched_b[i_a] = i_b
+            matched_distances[i_a] = distances[query_i, candidate_i]
+        unmatched_a = flatnonzero(~paired)
+
+    i_a = flatnonzero(paired)
+    return i_a, matched_b[i_a], matched_distances[i_a]
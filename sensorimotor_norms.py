@@ -14,19 +14,36 @@ caiwingfield.net
 2019
 ---------------------------
 """
+from __future__ import annotations
+
+from contextlib import nullcontext
+from enum import Enum
 from random import randint
-from typing import List, Iterable
+from typing import Dict, List, Iterable, Tuple, Optional, Set, TYPE_CHECKING
 from logging import getLogger
 
-from numpy import array
-from pandas import DataFrame, read_csv
-
+from .cache import NormsCache
 from .exceptions import WordNotInNormsError
+from .instrumentation import Instrumentation
+from .lru_cache import LRUCache
+from .registry import norms_registry, file_source_key, frame_source_key
 from .config.preferences import Preferences
 
 
+# numpy and pandas are imported where they're used, so importing this module is quick
+if TYPE_CHECKING:
+    from numpy import array, ndarray
+    from pandas import DataFrame
+    from .derived import DerivedFeatures
+    from .projection import Projection, ProjectionKind
+    from .query import Predicate, Query, SortedIndex
+    from .variants import VariantIndex, VariantMatch
+
 logger = getLogger(__name__)
 
+# Stands in for a phase timer when instrumentation is off
+_UNTIMED = nullcontext()
+
 
 class DataColNames(object):
     """Column names used in sensorimotor data file."""
@@ -107,6 +124,92 @@ class ComputedColNames(object):
     fraction_known = "Percentage_known.sensorimotor"
 
 
+class _ColumnGroup(Enum):
+    """Groups of columns which are loaded together."""
+    words   = "words"
+    vectors = "vectors"
+    sd      = "sd"
+    # All other columns, including computed columns
+    stats   = "stats"
+
+
+class LoadProfile(Enum):
+    """Which columns of the norms to load."""
+    # Words and vector columns
+    vectors    = "vectors"
+    # Words, vector and SD columns
+    vectors_sd = "vectors_sd"
+    # Everything
+    full       = "full"
+
+    @property
+    def _groups(self) -> Set[_ColumnGroup]:
+        if self is LoadProfile.vectors:
+            return {_ColumnGroup.words, _ColumnGroup.vectors}
+        elif self is LoadProfile.vectors_sd:
+            return {_ColumnGroup.words, _ColumnGroup.vectors, _ColumnGroup.sd}
+        elif self is LoadProfile.full:
+            return set(_ColumnGroup)
+        else:
+            raise NotImplementedError(self)
+
+
+class _LoadedWith(object):
+    """
+    Descriptor for an attribute of `SensorimotorNorms` which is only set once a group of columns has been loaded.
+    Accessing it before then loads the group.  After that, the instance attribute takes precedence, so there's no extra
+    cost to accessing it.
+    """
+
+    def __init__(self, group: _ColumnGroup):
+        self.group: _ColumnGroup = group
+        self.name: Optional[str] = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance._require(self.group)
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(f"{self.name} isn't loaded with the {instance.profile.name} load profile")
+
+
+class Subspace(Enum):
+    """Subspaces of the sensorimotor vector space."""
+    sensorimotor = "sensorimotor"
+    sensory      = "sensory"
+    motor        = "motor"
+
+    @property
+    def col_names(self) -> List[str]:
+        """The vector columns spanning this subspace."""
+        if self is Subspace.sensorimotor:
+            return SensorimotorNorms.VectorColNames
+        elif self is Subspace.sensory:
+            return SensorimotorNorms.SensoryColNames
+        elif self is Subspace.motor:
+            return SensorimotorNorms.MotorColNames
+        else:
+            raise NotImplementedError(self)
+
+    @property
+    def dims(self) -> slice:
+        """The slice of the vector columns spanning this subspace."""
+        n_sensory = len(SensorimotorNorms.SensoryColNames)
+        if self is Subspace.sensorimotor:
+            return slice(None)
+        elif self is Subspace.sensory:
+            return slice(None, n_sensory)
+        elif self is Subspace.motor:
+            return slice(n_sensory, None)
+        else:
+            raise NotImplementedError(self)
+
+
 class SensorimotorNorms(object):
 
     SensoryColNames = [
@@ -144,81 +247,433 @@ class SensorimotorNorms(object):
     ]
 
     VectorColNames = SensoryColNames + MotorColNames
+    SDColNames = SensorySDColNames + MotorSDColNames
+
+    # Attributes which are only set once the column group they're built from has been loaded
+    _words          = _LoadedWith(_ColumnGroup.words)
+    _row_for_word   = _LoadedWith(_ColumnGroup.words)
+    _columns        = _LoadedWith(_ColumnGroup.words)
+    n_items         = _LoadedWith(_ColumnGroup.words)
+    _vectors        = _LoadedWith(_ColumnGroup.vectors)
+    _sensory        = _LoadedWith(_ColumnGroup.vectors)
+    _motor          = _LoadedWith(_ColumnGroup.vectors)
 
     def __init__(self,
                  use_breng_translation: bool = False,
                  verbose: bool = False,
+                 use_cache: bool = True,
+                 lazy: bool = False,
+                 profile: LoadProfile = LoadProfile.full,
+                 compact: bool = False,
+                 instrumentation: Optional[Instrumentation] = None,
+                 norms_path: Optional[str] = None,
+                 frame: Optional[DataFrame] = None,
+                 cache_dir: Optional[str] = None,
+                 translation_table_path: Optional[str] = None,
+                 share_data: bool = True,
                  ):
-        self.data: DataFrame = read_csv(Preferences.sensorimotor_norms_path,
-                                        index_col=None, header=0,
-                                        dtype={
-                                            # Prevent the "nan" item from being interpreted as a NaN
-                                            DataColNames.word: str,
-                                            DataColNames.n_known_action: int,
-                                            DataColNames.n_known_perceptual: int,
-                                            DataColNames.n_list_action: int,
-                                            DataColNames.n_list_perceptual: int,
-                                            # All vector cols are floats
-                                            **{
-                                                vector_col: float
-                                                for vector_col in SensorimotorNorms.VectorColNames
-                                            }
-                                        },
-                                        keep_default_na=False)
-
-        # Trim whitespace and convert words to lower case
-        self.data[DataColNames.word] = self.data[DataColNames.word].str.strip()
-        self.data[DataColNames.word] = self.data[DataColNames.word].str.lower()
-
-        # Apply BrEng translation if necessary
+        """
+        :param use_breng_translation:
+            Translate the words in the norms from AmEng to BrEng spellings.
+        :param verbose:
+        :param use_cache:
+            Load the parsed norms from the on-disk cache in `Preferences.cache_dir` if there's a current snapshot there,
+            and write one if not.  The snapshot is invalidated automatically when the norms file or the translation
+            dictionary changes.
+        :param lazy:
+            Don't load anything until it's first needed, and then only load the columns needed.  E.g. `has_word` only
+            reads the words, and the vector lookups only the words and vector columns.
+        :param profile:
+            Which columns to load.  Columns outside the profile are never read, and behave as if they're not in the
+            data.
+        :param compact:
+            Store columns in compact dtypes: float32 for ratings and other real-valued stats, the smallest integer type
+            that fits for counts, and categoricals for the `Dominant.*` columns.  Vectors are then stored as float32
+            too, though the vector lookups still return float64.
+        :param instrumentation:
+            If given, records how long each phase of loading takes, and counts and latencies of the per-word and matrix
+            lookups.  Can also be set or unset later via the `instrumentation` attribute.
+        :param norms_path:
+            The norms file to load.  Defaults to `Preferences.sensorimotor_norms_path`.
+        :param frame:
+            Load the norms from this DataFrame, with the same columns as the file, instead of from a file.  It's never
+            cached on disk.  Mustn't be modified afterwards.
+        :param cache_dir:
+            Defaults to `Preferences.cache_dir`.
+        :param translation_table_path:
+            Where the BrEng translation table is kept.  Defaults to `Preferences.breng_translation_table_path`.
+        :param share_data:
+            Share loaded data with other norms objects over the same source in this process, through
+            `registry.norms_registry`, rather than each keeping its own copy.  Objects which only differ in whether
+            they're translated share all but the words.
+        """
         self.using_breng_translation: bool = use_breng_translation
-        if use_breng_translation:
-            from .breng_translation.translation_logic import select_best_translations
-            logger.info("Using BrEng translations")
-            translations = select_best_translations(list(self.data[DataColNames.word]), verbose=verbose)
-            self.data[DataColNames.word] = self.data[DataColNames.word].map(translations)
-            # Make sure the labels are unique
-            assert len(list(self.data[DataColNames.word])) == len(set(self.data[DataColNames.word]))
-
-        # Convert word column to index
-        self.data.set_index(DataColNames.word, inplace=True, drop=False)
-
-        # region Add computed columns
-
-        self.data[ComputedColNames.fraction_known] = (self.data[DataColNames.n_known_perceptual] + self.data[DataColNames.n_known_action]) / (self.data[DataColNames.n_list_perceptual] + self.data[DataColNames.n_list_action])
+        self.profile: LoadProfile = profile
+        self.compact: bool = compact
+        self._verbose: bool = verbose
+        self.instrumentation: Optional[Instrumentation] = instrumentation
+
+        if norms_path is not None and frame is not None:
+            raise ValueError("Give at most one of norms_path and frame")
+        self._norms_path: Optional[str] = norms_path
+        self._source_frame: Optional[DataFrame] = frame
+        self._translation_table_path: Optional[str] = translation_table_path
+        self._share_data: bool = share_data
+        # Computed on first load
+        self._source_key: Optional[str] = None
+
+        self._cache: Optional[NormsCache] = (
+            NormsCache(cache_dir if cache_dir is not None else Preferences.cache_dir,
+                       self.norms_path, use_breng_translation)
+            if use_cache and frame is None else None)
+
+        # Each loaded group's columns.  Non-word groups are indexed by row, as they may be shared with norms objects
+        # whose words differ.
+        self._frames: Dict[_ColumnGroup, DataFrame] = dict()
+        # All of them together, indexed by word, built when it's first asked for
+        self._data: Optional[DataFrame] = None
+        self._loaded_groups: Set[_ColumnGroup] = set()
+        # Built on first use
+        self._variant_index: Optional[VariantIndex] = None
+        # Opt-in, see `enable_result_cache`
+        self.result_cache: Optional[LRUCache] = None
+        # Computed on first use
+        self._derived: Optional[DerivedFeatures] = None
+        # (kind, subspace) -> projection, fitted on first use
+        self._projections: Dict[Tuple[ProjectionKind, Subspace], Projection] = dict()
+        # col -> index, see `create_sorted_index`
+        self.sorted_indexes: Dict[str, SortedIndex] = dict()
 
-        # endregion
-
-        self.n_items = len(list(self.iter_words()))
         self.n_dims = len(self.VectorColNames)
 
         self.rating_min = 0.0
         self.rating_max = 5.0
 
+        if not lazy:
+            with self._phase("construction"):
+                self._require(*_ColumnGroup)
+
+    @property
+    def norms_path(self) -> Optional[str]:
+        """The norms file, or None if the norms come from a frame."""
+        if self._source_frame is not None:
+            return None
+        if self._norms_path is None:
+            self._norms_path = Preferences.sensorimotor_norms_path
+        return self._norms_path
+
+    @property
+    def data(self) -> DataFrame:
+        """All the data in the load profile, loading it first if necessary."""
+        self._require(*_ColumnGroup)
+        if self._data is None:
+            from pandas import concat
+
+            with self._phase("concat"):
+                word_index = self._frames[_ColumnGroup.words].index
+                # Rows are in the same order for every group, as they're all read from the same source
+                self._data = concat([self._frames[_ColumnGroup.words].copy()] + [
+                    self._frames[group].set_axis(word_index, axis=0)
+                    for group in _ColumnGroup
+                    if group is not _ColumnGroup.words and group in self._frames
+                ], axis=1)
+        return self._data
+
+    # region Loading
+
+    def _phase(self, name: str):
+        """Context manager timing a phase of loading, if instrumentation is on."""
+        if self.instrumentation is None:
+            return _UNTIMED
+        return self.instrumentation.phase(name)
+
+    def _require(self, *groups: _ColumnGroup):
+        """Make sure that groups of columns have been loaded."""
+        available = self.profile._groups
+        missing = [g for g in _ColumnGroup if g in groups and g in available and g not in self._loaded_groups]
+        if len(missing) == 0:
+            return
+        # Everything else is indexed by word, so the words come first
+        if _ColumnGroup.words not in self._loaded_groups and _ColumnGroup.words not in missing:
+            missing.insert(0, _ColumnGroup.words)
+
+        frames: Dict[_ColumnGroup, DataFrame] = dict()
+        if self._share_data:
+            for group in missing:
+                shared = norms_registry.get(self._registry_key(), self._shared_name(group))
+                if shared is not None:
+                    frames[group] = shared
+            if self.instrumentation is not None:
+                self.instrumentation.count("registry_hits", len(frames))
+        not_shared = [g for g in missing if g not in frames]
+        if self._cache is not None and len(not_shared) > 0:
+            with self._phase("cache_load"):
+                for group in not_shared:
+                    cached = self._cache.load(self._cache_name(group))
+                    if cached is not None:
+                        frames[group] = cached
+            if self.instrumentation is not None:
+                to_read = [g for g in not_shared if g not in frames]
+                self.instrumentation.count("cache_hits", len(not_shared) - len(to_read))
+                self.instrumentation.count("cache_misses", len(to_read))
+        to_read = [g for g in not_shared if g not in frames]
+        if len(to_read) > 0:
+            read = self._read_groups(to_read)
+            frames.update(read)
+            if self._cache is not None:
+                with self._phase("cache_save"):
+                    for group, frame in read.items():
+                        self._cache.save(self._cache_name(group), frame)
+        if self._share_data:
+            for group in not_shared:
+                # If another object registered the same data meanwhile, use theirs
+                frames[group] = norms_registry.register(self._registry_key(), self._shared_name(group), frames[group])
+
+        self._frames.update(frames)
+        # Rebuilt with the new columns when it's next asked for
+        self._data = None
+        self._loaded_groups.update(missing)
+        with self._phase("build_lookup_tables"):
+            self._build_lookup_tables(missing)
+
+    def _read_groups(self, groups: List[_ColumnGroup]) -> Dict[_ColumnGroup, DataFrame]:
+        """Read and process groups of columns from the source file."""
+        from pandas import read_csv
+
+        source_path = self.norms_path
+
+        group_cols: Dict[_ColumnGroup, List[str]] = dict()
+        for group in groups:
+            if group is _ColumnGroup.words:
+                group_cols[group] = [DataColNames.word]
+            elif group is _ColumnGroup.vectors:
+                group_cols[group] = SensorimotorNorms.VectorColNames
+            elif group is _ColumnGroup.sd:
+                group_cols[group] = SensorimotorNorms.SDColNames
+            elif group is _ColumnGroup.stats:
+                # Everything else in the file
+                header = (self._source_frame.columns if self._source_frame is not None
+                          else read_csv(source_path, nrows=0).columns)
+                group_cols[group] = [col for col in header if SensorimotorNorms._group_for_col(col) is _ColumnGroup.stats]
+            else:
+                raise NotImplementedError(group)
+
+        use_cols = [col for group in groups for col in group_cols[group]]
+        dtypes = {
+            # Prevent the "nan" item from being interpreted as a NaN
+            DataColNames.word: str,
+            DataColNames.n_known_action: int,
+            DataColNames.n_known_perceptual: int,
+            DataColNames.n_list_action: int,
+            DataColNames.n_list_perceptual: int,
+            # All vector cols are floats
+            **{
+                vector_col: float
+                for vector_col in SensorimotorNorms.VectorColNames
+            }
+        }
+        if self._source_frame is not None:
+            with self._phase("copy_frame"):
+                data: DataFrame = self._source_frame[use_cols].astype(
+                    {col: dtype for col, dtype in dtypes.items() if col in use_cols})
+        else:
+            with self._phase("read_csv"):
+                data: DataFrame = read_csv(source_path,
+                                           index_col=None, header=0,
+                                           usecols=use_cols,
+                                           dtype=dtypes,
+                                           keep_default_na=False)
+
+        frames: Dict[_ColumnGroup, DataFrame] = dict()
+        for group in groups:
+            frame = data[group_cols[group]].copy()
+
+            if group is _ColumnGroup.words:
+                # Trim whitespace and convert words to lower case
+                with self._phase("normalise_words"):
+                    frame[DataColNames.word] = frame[DataColNames.word].str.strip()
+                    frame[DataColNames.word] = frame[DataColNames.word].str.lower()
+
+                # Apply BrEng translation if necessary
+                if self.using_breng_translation:
+                    from .breng_translation.translation_table import translations_for_words
+                    logger.info("Using BrEng translations")
+                    with self._phase("breng_translation"):
+                        translations = translations_for_words(frame[DataColNames.word], verbose=self._verbose,
+                                                              file_path=self._translation_table_path)
+                        frame[DataColNames.word] = frame[DataColNames.word].map(translations)
+                    # Make sure the labels are unique
+                    assert len(list(frame[DataColNames.word])) == len(set(frame[DataColNames.word]))
+
+                # Convert word column to index
+                with self._phase("set_index"):
+                    frame.set_index(DataColNames.word, inplace=True, drop=False)
+
+            elif group is _ColumnGroup.stats:
+
+                # region Add computed columns
+
+                frame[ComputedColNames.fraction_known] = (frame[DataColNames.n_known_perceptual] + frame[DataColNames.n_known_action]) / (frame[DataColNames.n_list_perceptual] + frame[DataColNames.n_list_action])
+
+                # endregion
+
+            if self.compact:
+                with self._phase("compact"):
+                    frame = _compact_frame(frame)
+
+            frames[group] = frame
+
+        return frames
+
+    def _cache_name(self, group: _ColumnGroup) -> str:
+        return f"{group.value}.compact" if self.compact else group.value
+
+    def _registry_key(self) -> str:
+        """The key for this object's source in `norms_registry`."""
+        if self._source_key is None:
+            self._source_key = (frame_source_key(self._source_frame) if self._source_frame is not None
+                                else file_source_key(self.norms_path))
+        return self._source_key
+
+    def _shared_name(self, group: _ColumnGroup) -> str:
+        """The name of a group in `norms_registry`.  Only the words depend on translation."""
+        if group is _ColumnGroup.words:
+            return f"{self._cache_name(group)}.{'breng' if self.using_breng_translation else 'ameng'}"
+        return self._cache_name(group)
+
+    def _build_lookup_tables(self, groups: List[_ColumnGroup]):
+        """
+        Build the lookup tables for newly loaded groups of columns.
+        Per-word lookups go through these rather than `self.data.loc`, which would build a whole mixed-dtype row.
+        """
+        from numpy import ascontiguousarray
+
+        if _ColumnGroup.words in groups:
+            self._words: List[str] = list(self._frames[_ColumnGroup.words].index)
+            # word -> row
+            self._row_for_word: Dict[str, int] = {word: row for row, word in enumerate(self._words)}
+            self.n_items = len(self._words)
+            # col name -> values (views onto the frames where possible)
+            self._columns: Dict[str, ndarray] = dict()
+
+        if _ColumnGroup.vectors in groups:
+            # Contiguous words-x-dims matrix, with sensory and motor as views onto it.
+            # Read-only, as views onto it are handed out.
+            matrix_name = f"{self._cache_name(_ColumnGroup.vectors)}.matrix"
+            vectors = norms_registry.get(self._registry_key(), matrix_name) if self._share_data else None
+            if vectors is None:
+                vectors = ascontiguousarray(self._frames[_ColumnGroup.vectors][SensorimotorNorms.VectorColNames].values,
+                                            dtype="float32" if self.compact else "float64")
+                vectors.setflags(write=False)
+                if self._share_data:
+                    vectors = norms_registry.register(self._registry_key(), matrix_name, vectors)
+            self._vectors: ndarray = vectors
+            self._sensory: ndarray = self._vectors[:, :len(SensorimotorNorms.SensoryColNames)]
+            self._motor: ndarray = self._vectors[:, len(SensorimotorNorms.SensoryColNames):]
+
+        for group in groups:
+            frame = self._frames[group]
+            for col in frame.columns:
+                self._columns[col] = frame[col].to_numpy()
+
+    @staticmethod
+    def _group_for_col(col: str) -> _ColumnGroup:
+        if col == DataColNames.word:
+            return _ColumnGroup.words
+        if col in SensorimotorNorms.VectorColNames:
+            return _ColumnGroup.vectors
+        if col in SensorimotorNorms.SDColNames:
+            return _ColumnGroup.sd
+        return _ColumnGroup.stats
+
+    def _column(self, col: str) -> ndarray:
+        """
+        The values of a column, loading it first if necessary.
+        :raises KeyError: When the column is not in the data.
+        """
+        try:
+            return self._columns[col]
+        except KeyError:
+            self._require(SensorimotorNorms._group_for_col(col))
+            return self._columns[col]
+
+    # endregion
+
     def iter_words(self) -> Iterable[str]:
-        for word in self.data.index:
+        for word in self._words:
             yield word
 
     def random_word(self) -> str:
-        return self.data[DataColNames.word].iloc[randint(0, self.n_items-1)]
+        return self._words[randint(0, self.n_items-1)]
 
     def has_word(self, word: str) -> bool:
         """True if a word is in the norms, else False."""
-        return word in self.data.index
+        return word in self._row_for_word
 
-    def sensorimotor_vector_for_word(self, word: str) -> array:
+    def _row(self, word: str) -> int:
         """
-        A vector of sensorimotor data associated with each word.
-        :param word:
-        :return:
+        The row of a word in the lookup tables.
         :raises: WordNotInNormsError
         """
         try:
-            data_for_word = self.data.loc[word]
+            return self._row_for_word[word]
         except KeyError:
             raise WordNotInNormsError(word)
 
-        return data_for_word[SensorimotorNorms.VectorColNames].values.astype(float)
+    def variant_index(self) -> VariantIndex:
+        """
+        Index of variant spellings of the words in the norms, built the first time it's needed.
+        See `variants.VariantIndex`.
+        """
+        if self._variant_index is None:
+            from .variants import VariantIndex
+            self._variant_index = VariantIndex(self._words)
+        return self._variant_index
+
+    def match_word(self, word: str, allow_edit_distance: bool = True) -> Optional[VariantMatch]:
+        """
+        Find the word in the norms, falling back to variant spellings (case, whitespace, hyphenation, AmEng/BrEng and
+        small misspellings) when it's not there exactly.
+        :param word:
+        :param allow_edit_distance:
+            Match small misspellings.  See `VariantIndex.lookup`.
+        :return:
+            The match, which says which word in the norms was matched and how, or None if nothing matched.
+        """
+        row = self._row_for_word.get(word)
+        if row is not None:
+            from .variants import VariantMatch, MatchKind
+            return VariantMatch(word, row, MatchKind.exact)
+        if self.result_cache is not None:
+            return self.result_cache.get_or_compute(
+                ("match_word", word, allow_edit_distance),
+                lambda: self.variant_index().lookup(word, allow_edit_distance=allow_edit_distance))
+        return self.variant_index().lookup(word, allow_edit_distance=allow_edit_distance)
+
+    def enable_result_cache(self, max_size: int = 10_000):
+        """
+        Cache derived per-word results (variant matches, neighbour lists from a `neighbours.NeighbourIndex` over these
+        norms, and so on), keeping the `max_size` most recently used.
+        Hit, miss and eviction counts are available from `self.result_cache.stats()`.
+
+        Plain vector and stat lookups aren't cached, as they're already just an index into an array.
+        """
+        self.result_cache = LRUCache(max_size)
+
+    def disable_result_cache(self):
+        self.result_cache = None
+
+    def sensorimotor_vector_for_word(self, word: str) -> array:
+        """
+        A vector of sensorimotor data associated with each word.
+        :param word:
+        :return:
+        :raises: WordNotInNormsError
+        """
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("sensorimotor_vector_for_word"):
+                return self._vectors[self._row(word)].astype(float)
+        return self._vectors[self._row(word)].astype(float)
 
     def sensory_vector_for_word(self, word: str) -> array:
         """
@@ -227,12 +682,10 @@ class SensorimotorNorms(object):
         :return:
         :raises: WordNotInNormsError
         """
-        try:
-            data_for_word = self.data.loc[word]
-        except KeyError:
-            raise WordNotInNormsError(word)
-
-        return data_for_word[SensorimotorNorms.SensoryColNames].values.astype(float)
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("sensory_vector_for_word"):
+                return self._sensory[self._row(word)].astype(float)
+        return self._sensory[self._row(word)].astype(float)
 
     def motor_vector_for_word(self, word: str) -> array:
         """
@@ -241,12 +694,10 @@ class SensorimotorNorms(object):
         :return:
         :raises: WordNotInNormsError
         """
-        try:
-            data_for_word = self.data.loc[word]
-        except KeyError:
-            raise WordNotInNormsError(word)
-
-        return data_for_word[SensorimotorNorms.MotorColNames].values.astype(float)
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("motor_vector_for_word"):
+                return self._motor[self._row(word)].astype(float)
+        return self._motor[self._row(word)].astype(float)
 
     def fraction_known(self, word: str) -> float:
         """
@@ -258,12 +709,10 @@ class SensorimotorNorms(object):
         :raises: WordNotInNormsError
             When the requested word is not in the norms
         """
-        try:
-            data_for_word = self.data.loc[word]
-        except KeyError:
-            raise WordNotInNormsError(word)
-
-        return data_for_word[ComputedColNames.fraction_known]
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("fraction_known"):
+                return self._column(ComputedColNames.fraction_known)[self._row(word)]
+        return self._column(ComputedColNames.fraction_known)[self._row(word)]
 
     def matrix_for_words(self, words: List[str]) -> array:
         """
@@ -272,14 +721,78 @@ class SensorimotorNorms(object):
         :return:
         :raises: WordNotInNormsError
         """
-        try:
-            data_for_words = self.data.loc[words]
-        except KeyError as er:
-            raise WordNotInNormsError(er.args[0])
-        return data_for_words[SensorimotorNorms.VectorColNames].values.astype(float)
+        if self.instrumentation is not None:
+            self.instrumentation.count("matrix_for_words.words", len(words))
+            with self.instrumentation.timed("matrix_for_words"):
+                return self._vectors[[self._row(word) for word in words]].astype(float, copy=False)
+        return self._vectors[[self._row(word) for word in words]].astype(float, copy=False)
 
     def matrix(self) -> array:
-        return self.data[SensorimotorNorms.VectorColNames].values.astype(float)
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("matrix"):
+                return self._vectors.astype(float)
+        return self._vectors.astype(float)
+
+    def rows_for_words(self, words: Iterable[str]) -> array:
+        """
+        The rows of a batch of words in `matrix()`, without raising for words not in the norms.
+        :param words:
+        :return:
+            Array of row indices, with -1 for words not in the norms.
+        """
+        from numpy import fromiter, intp
+
+        if not hasattr(words, "__len__"):
+            words = list(words)
+        get_row = self._row_for_word.get
+        return fromiter((get_row(word, -1) for word in words), dtype=intp, count=len(words))
+
+    def lookup_words(self, words: Iterable[str], cols: List[str] = None, fill_value: float = float("nan")) -> Tuple[array, array]:
+        """
+        Look up data for a batch of words at once, without raising for words not in the norms.
+        :param words:
+        :param cols:
+            Numeric columns to return, in order.  E.g. `SensoryColNames`, `MotorColNames`, `SDColNames` or any
+            numeric stat columns.  Defaults to `VectorColNames`.
+        :param fill_value:
+            Value filling the rows of words not in the norms.
+        :return:
+            A words-x-cols matrix, and a boolean mask which is True for the words which were found.
+        :raises KeyError: When a column is not in the data.
+        :raises ValueError: When a column isn't numeric.
+        """
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("lookup_words"):
+                matrix, found = self._lookup_words(words, cols, fill_value)
+            n_found = int(found.sum())
+            self.instrumentation.count("lookup_words.found", n_found)
+            self.instrumentation.count("lookup_words.missing", len(found) - n_found)
+            return matrix, found
+        return self._lookup_words(words, cols, fill_value)
+
+    def _lookup_words(self, words: Iterable[str], cols: Optional[List[str]], fill_value: float) -> Tuple[array, array]:
+        from numpy import empty, float64
+
+        rows = self.rows_for_words(words)
+        found = rows >= 0
+
+        if cols is None or cols == SensorimotorNorms.VectorColNames:
+            matrix = self._vectors.take(rows, axis=0)
+        elif cols == SensorimotorNorms.SensoryColNames:
+            matrix = self._sensory.take(rows, axis=0)
+        elif cols == SensorimotorNorms.MotorColNames:
+            matrix = self._motor.take(rows, axis=0)
+        else:
+            matrix = empty((len(rows), len(cols)), dtype=float64)
+            for i, col in enumerate(cols):
+                values = self._column(col)
+                if values.dtype.kind not in "biuf":
+                    raise ValueError(f"{col} is not a numeric column")
+                matrix[:, i] = values.take(rows)
+
+        # Rows of -1 will have taken the last row, so overwrite them
+        matrix[~found] = fill_value
+        return matrix, found
 
     def stat_for_word(self, word: str, stat_col: str) -> float:
         """
@@ -287,11 +800,179 @@ class SensorimotorNorms(object):
         :raises WordNotInNormsError: When the word is in correct.
         :raises KeyError: When the column is not in the data.
         """
-        try:
-            data_for_word = self.data.loc[word]
-        except KeyError:
-            raise WordNotInNormsError(word)
-        return data_for_word[stat_col]
+        if self.instrumentation is not None:
+            with self.instrumentation.timed("stat_for_word"):
+                # The word first, so a missing word is reported before a missing column, as without instrumentation
+                row = self._row(word)
+                return self._column(stat_col)[row]
+        row = self._row(word)
+        return self._column(stat_col)[row]
+
+    def categorical_codes(self, col: str) -> Tuple[array, List[str]]:
+        """
+        The values of a categorical column (e.g. `DataColNames.dominant_perceptual`) as integer codes.
+        :return:
+            Array of codes, one per row, and the list of categories they index.
+        :raises KeyError: When the column is not in the data.
+        """
+        from pandas import factorize
+
+        codes, categories = factorize(self._column(col))
+        return codes, [str(c) for c in categories]
+
+    def query(self, *predicates: Predicate) -> Query:
+        """
+        Select the words satisfying all of the predicates, e.g.:
+            norms.query(col(DataColNames.dominant_perceptual) == "Visual",
+                        col(ComputedColNames.fraction_known) > 0.9).words()
+        See `query.Query`.
+        """
+        from .query import Query
+        return Query(self, predicates)
+
+    def create_sorted_index(self, col: str):
+        """
+        Index a numeric column, so that queries with range or equality conditions on it don't need to scan it.
+        :raises KeyError: When the column is not in the data.
+        :raises ValueError: When the column isn't numeric.
+        """
+        from .query import SortedIndex
+        self.sorted_indexes[col] = SortedIndex(self._column(col))
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """
+        Approximate memory used by the loaded data and lookup tables, in bytes.
+        """
+        from sys import getsizeof
+
+        footprint = {
+            "data": sum(int(frame.memory_usage(deep=True).sum()) for frame in self._frames.values()),
+        }
+        if self._data is not None:
+            footprint["data_frame"] = int(self._data.memory_usage(deep=True).sum())
+        if "_vectors" in self.__dict__:
+            footprint["vectors"] = self._vectors.nbytes
+        if "_row_for_word" in self.__dict__:
+            footprint["word_index"] = getsizeof(self._row_for_word)
+        if self._derived is not None:
+            footprint["derived"] = self._derived.nbytes()
+        if len(self._projections) > 0:
+            footprint["projections"] = sum(values.nbytes
+                                           for projection in self._projections.values()
+                                           for values in projection.arrays.values())
+        footprint["total"] = sum(footprint.values())
+        return footprint
+
+    @property
+    def derived(self) -> DerivedFeatures:
+        """
+        Features derived from the vectors (norms, unit vectors, rescaled values, subspace summaries), computed for all
+        words the first time they're needed.  They're saved with the on-disk cache, if it's in use.
+        See `derived.DerivedFeatures`.
+        """
+        if self._derived is None:
+            from .derived import DerivedFeatures
+
+            cache_name = "derived.compact" if self.compact else "derived"
+            if self._share_data:
+                self._derived = norms_registry.get(self._registry_key(), cache_name)
+            if self._derived is None:
+                arrays = self._cache.load(cache_name) if self._cache is not None else None
+                if arrays is not None:
+                    self._derived = DerivedFeatures(arrays)
+                else:
+                    self._derived = DerivedFeatures.compute(self._vectors, self.rating_min, self.rating_max)
+                    if self._cache is not None:
+                        self._cache.save(cache_name, self._derived.arrays)
+                if self._share_data:
+                    self._derived = norms_registry.register(self._registry_key(), cache_name, self._derived)
+        return self._derived
+
+    def projection(self, kind: ProjectionKind = None, subspace: Subspace = None) -> Projection:
+        """
+        A linear projection (principal components, whitened principal components, or just the dimensions of a
+        subspace) fitted over all the words.  Each is fitted the first time it's needed, and saved with the on-disk
+        cache, if it's in use.
+        See `projection.Projection`.
+        :param kind:
+            Defaults to `ProjectionKind.pca`.
+        :param subspace:
+            Defaults to `Subspace.sensorimotor`.
+        """
+        from .projection import Projection, ProjectionKind
+
+        if kind is None:
+            kind = ProjectionKind.pca
+        if subspace is None:
+            subspace = Subspace.sensorimotor
+
+        projection = self._projections.get((kind, subspace))
+        if projection is None:
+            cache_name = f"projection.{kind.value}.{subspace.value}{'.compact' if self.compact else ''}"
+            if self._share_data:
+                projection = norms_registry.get(self._registry_key(), cache_name)
+            if projection is None:
+                arrays = self._cache.load(cache_name) if self._cache is not None else None
+                if arrays is not None:
+                    projection = Projection(kind, subspace, arrays)
+                else:
+                    projection = Projection.fit(self._vectors, kind, subspace)
+                    if self._cache is not None:
+                        self._cache.save(cache_name, projection.arrays)
+                if self._share_data:
+                    projection = norms_registry.register(self._registry_key(), cache_name, projection)
+            self._projections[(kind, subspace)] = projection
+        return projection
+
+    def project_words(self, words: List[str], kind: ProjectionKind = None, subspace: Subspace = None,
+                      n_components: Optional[int] = None) -> array:
+        """
+        Projected coordinates for a batch of words: a single matrix multiply against the fitted projection.
+        :param words:
+        :param kind:
+            See `projection`.
+        :param subspace:
+            See `projection`.
+        :param n_components:
+            Keep only the first few components.  Defaults to all of them.
+        :return:
+            words-x-components matrix.
+        :raises: WordNotInNormsError
+        """
+        projection = self.projection(kind, subspace)
+        if n_components is not None:
+            projection = projection.truncated(n_components)
+        return projection.project(self.matrix_for_words(words))
+
+    def export_shared(self, directory: str, include_sd: bool = False, include_stats: bool = False):
+        """
+        Export the norms as memory-mapped files in `directory`, for any number of processes to attach to as
+        `shared.SharedNorms` without copying or re-parsing.
+        :param directory:
+        :param include_sd:
+            Include the SD columns.
+        :param include_stats:
+            Include the summary stats columns.
+        """
+        from .shared import export_shared_norms
+        export_shared_norms(self, directory, include_sd=include_sd, include_stats=include_stats)
+
+
+def _compact_frame(frame: DataFrame) -> DataFrame:
+    """Converts columns to compact dtypes."""
+    from pandas import to_numeric
+
+    for col in frame.columns:
+        if col == DataColNames.word:
+            continue
+        kind = frame[col].dtype.kind
+        if kind == "f":
+            frame[col] = frame[col].astype("float32")
+        elif kind in "iu":
+            frame[col] = to_numeric(frame[col], downcast="integer")
+        elif kind != "b":
+            frame[col] = frame[col].astype("category")
+    return frame
 
 
 if __name__ == '__main__':
@@ -302,3 +983,10 @@ if __name__ == '__main__':
                 datefmt="%Y-%m-%d %H:%M:%S")
 
     sn = SensorimotorNorms(use_breng_translation=True, verbose=True)
+
+    # Report the memory used by each load profile
+    for load_profile in LoadProfile:
+        for compact_dtypes in [False, True]:
+            footprint = SensorimotorNorms(profile=load_profile, compact=compact_dtypes).memory_footprint()
+            logger.info(f"{load_profile.name}{' (compact)' if compact_dtypes else ''}: "
+                        f"{footprint['total'] / 1024 / 1024:.1f} MiB")
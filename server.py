@@ -0,0 +1,363 @@
+"""
+===========================
+Serving lookups from one loaded copy of the norms to other processes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import asyncio
+import json
+from logging import getLogger
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from .distances import DistanceType
+from .exceptions import NormsServerError
+from .sensorimotor_norms import SensorimotorNorms, Subspace
+
+logger = getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Longest request or response line, in bytes.  Large batches make long lines.
+_MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+# The protocol is newline-delimited JSON over a TCP or Unix socket, so any language can use it.
+#
+# Each request is a JSON object on a single line, with an "id" (echoed back in the response) and an "op":
+#     {"id": 1, "op": "vectors", "words": ["apple", "xyz"], "subspace": "sensorimotor"}
+#         -> {"id": 1, "result": {"vectors": [[...11 floats...], null]}}
+#     {"id": 2, "op": "stats", "words": ["apple"], "cols": ["Dominant.perceptual", "Percentage_known.sensorimotor"]}
+#         -> {"id": 2, "result": {"stats": {"Dominant.perceptual": ["Visual"], "Percentage_known.sensorimotor": [1.0]}}}
+#     {"id": 3, "op": "neighbours", "words": ["apple"], "k": 5, "distance": "cosine", "subspace": "sensorimotor"}
+#         -> {"id": 3, "result": {"neighbours": [[["pear", 0.01], ...]]}}
+#     {"id": 4, "op": "has_words", "words": ["apple"]}
+#         -> {"id": 4, "result": {"has_words": [true]}}
+#     {"id": 5, "op": "info"}
+#         -> {"id": 5, "result": {"n_items": ..., "vector_cols": [...], ...}}
+# Words not in the norms give null.  Missing values are null too.
+# A request which can't be handled gets {"id": ..., "error": "..."}.
+# Responses on a connection come back in the order the requests were sent.
+
+
+def _nulls_for_nans(values: list) -> list:
+    # NaN isn't valid JSON
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+
+class NormsServer(object):
+    """
+    Serves batched lookups from a single `SensorimotorNorms` over a local socket.
+    """
+
+    def __init__(self, norms: SensorimotorNorms):
+        self.norms: SensorimotorNorms = norms
+        # (distance, subspace) -> index, built on first use
+        self._neighbour_indexes: Dict[Tuple[DistanceType, Subspace], "NeighbourIndex"] = dict()
+        # Neighbour requests are handled in executor threads, so building indexes is guarded
+        self._neighbour_indexes_lock: Lock = Lock()
+
+    def handle(self, request) -> Dict:
+        """
+        The response to a request.
+        :param request:
+            The parsed JSON of the request, which should be an object.
+        """
+        if not isinstance(request, dict):
+            return {"id": None, "error": f"Request must be a JSON object, not {type(request).__name__}"}
+        request_id = request.get("id")
+        try:
+            op = request["op"]
+            if op == "vectors":
+                result = self._vectors(request["words"], Subspace(request.get("subspace", "sensorimotor")))
+            elif op == "stats":
+                result = self._stats(request["words"], request["cols"])
+            elif op == "neighbours":
+                result = self._neighbours(request["words"], int(request.get("k", 10)),
+                                          DistanceType(request.get("distance", "cosine")),
+                                          Subspace(request.get("subspace", "sensorimotor")))
+            elif op == "has_words":
+                result = {"has_words": [self.norms.has_word(word) for word in request["words"]]}
+            elif op == "info":
+                result = self._info()
+            else:
+                raise ValueError(f"Unknown op {op!r}")
+        except (KeyError, ValueError, TypeError) as er:
+            return {"id": request_id, "error": f"{type(er).__name__}: {er}"}
+        return {"id": request_id, "result": result}
+
+    def _vectors(self, words: List[str], subspace: Subspace) -> Dict:
+        rows = self.norms.rows_for_words(words)
+        vectors = self.norms._vectors[rows.clip(0)][:, subspace.dims].tolist()
+        return {"vectors": [_nulls_for_nans(vector) if row >= 0 else None for vector, row in zip(vectors, rows)]}
+
+    def _stats(self, words: List[str], cols: List[str]) -> Dict:
+        rows = self.norms.rows_for_words(words)
+        found = rows >= 0
+        stats = dict()
+        for col in cols:
+            values = _nulls_for_nans(self.norms._column(col)[rows.clip(0)].tolist())
+            stats[col] = [value if is_found else None for value, is_found in zip(values, found)]
+        return {"stats": stats}
+
+    def _neighbour_index(self, distance_type: DistanceType, subspace: Subspace) -> "NeighbourIndex":
+        index = self._neighbour_indexes.get((distance_type, subspace))
+        if index is not None:
+            return index
+        with self._neighbour_indexes_lock:
+            # Another thread may have built it while we waited
+            index = self._neighbour_indexes.get((distance_type, subspace))
+            if index is None:
+                from .neighbours import NeighbourIndex
+                index = NeighbourIndex(self.norms, distance_type=distance_type, subspace=subspace)
+                self._neighbour_indexes[(distance_type, subspace)] = index
+        return index
+
+    def _neighbours(self, words: List[str], k: int, distance_type: DistanceType, subspace: Subspace) -> Dict:
+        if k < 1:
+            raise ValueError(f"k must be at least 1, not {k}")
+        index = self._neighbour_index(distance_type, subspace)
+
+        found_words = [word for word in words if self.norms.has_word(word)]
+        neighbours_for_word = dict()
+        if found_words:
+            rows, distances = index.nearest_to_words(found_words, k)
+            for word, word_rows, word_distances in zip(found_words, rows, distances):
+                neighbours_for_word[word] = [[index.words[row], float(distance)]
+                                             for row, distance in zip(word_rows, word_distances)]
+        return {"neighbours": [neighbours_for_word.get(word) for word in words]}
+
+    def _info(self) -> Dict:
+        return {
+            "n_items": self.norms.n_items,
+            "vector_cols": SensorimotorNorms.VectorColNames,
+            "using_breng_translation": self.norms.using_breng_translation,
+        }
+
+    def _handle_safely(self, request) -> Dict:
+        """`handle`, but replying with an error for anything unexpected, so one bad request can't drop the connection."""
+        try:
+            return self.handle(request)
+        except Exception as er:
+            logger.exception("Failed to handle request")
+            return {"id": request.get("id") if isinstance(request, dict) else None,
+                    "error": f"{type(er).__name__}: {er}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as er:
+                    response = {"id": None, "error": f"Invalid JSON: {er}"}
+                else:
+                    if isinstance(request, dict) and request.get("op") == "neighbours":
+                        # Neighbour searches can take a while, and numpy releases the GIL, so keep the loop free
+                        response = await loop.run_in_executor(None, self._handle_safely, request)
+                    else:
+                        response = self._handle_safely(request)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as er:
+            logger.warning(f"Dropped connection ({er})")
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        server = await asyncio.start_server(self._handle_connection, host=host, port=port, limit=_MAX_LINE_BYTES)
+        logger.info(f"Serving sensorimotor norms on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def serve_unix(self, path: str):
+        server = await asyncio.start_unix_server(self._handle_connection, path=path, limit=_MAX_LINE_BYTES)
+        logger.info(f"Serving sensorimotor norms on {path}")
+        async with server:
+            await server.serve_forever()
+
+
+class NormsClient(object):
+    """
+    asyncio client for a `NormsServer`.
+
+    The per-word methods (`vector`, `stats`, `neighbours`) coalesce concurrent calls: calls made in the same turn of the
+    event loop are sent together as a single batched request.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_batch: int = 1024):
+        """
+        Use `connect` rather than calling this directly.
+        :param max_batch:
+            Most words sent in one coalesced request.  1 disables coalescing.
+        """
+        self._reader: asyncio.StreamReader = reader
+        self._writer: asyncio.StreamWriter = writer
+        self.max_batch: int = max_batch
+
+        self._next_id: int = 0
+        # request id -> future for its result
+        self._waiting: Dict[int, asyncio.Future] = dict()
+        # (op, params) -> (word, future) pairs waiting to be sent
+        self._batches: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = dict()
+        self._read_task: asyncio.Task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None,
+                      **kwargs) -> "NormsClient":
+        """
+        :param host:
+        :param port:
+        :param path:
+            Connect to a Unix socket at this path instead of over TCP.
+        :param kwargs:
+            Passed to the constructor.
+        """
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=_MAX_LINE_BYTES)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=_MAX_LINE_BYTES)
+        return cls(reader, writer, **kwargs)
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._read_task.cancel()
+
+    async def request(self, op: str, **params) -> Dict:
+        """
+        Send a single request.
+        :return:
+            The result.
+        :raises NormsServerError: When the server couldn't handle the request.
+        """
+        request_id = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps({"id": request_id, "op": op, **params}).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(NormsServerError(response["error"]))
+                else:
+                    future.set_result(response["result"])
+        finally:
+            # Connection closed: fail everything still waiting
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to norms server closed"))
+            self._waiting.clear()
+
+    # region Coalesced per-word calls
+
+    def _submit(self, op: str, params: Tuple[Tuple[str, object], ...], word: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (op, params)
+        batch = self._batches.setdefault(key, [])
+        batch.append((word, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            # Send once everything else ready to run this turn has had the chance to add to the batch
+            loop.call_soon(self._flush, key)
+        return future
+
+    def _flush(self, key: Tuple):
+        batch = self._batches.pop(key, None)
+        if batch:
+            asyncio.get_running_loop().create_task(self._send_batch(key, batch))
+
+    async def _send_batch(self, key: Tuple, batch: List[Tuple[str, asyncio.Future]]):
+        op, params = key
+        try:
+            result = await self.request(op, words=[word for word, _ in batch], **dict(params))
+        except Exception as er:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(er)
+            return
+        if op == "stats":
+            values = [
+                {col: col_values[i] for col, col_values in result["stats"].items()}
+                for i in range(len(batch))
+            ]
+        else:
+            values = result[op]
+        for (_, future), value in zip(batch, values):
+            if not future.done():
+                future.set_result(value)
+
+    async def vector(self, word: str, subspace: Subspace = Subspace.sensorimotor) -> Optional[List[float]]:
+        """The vector for a word, or None if it's not in the norms."""
+        return await self._submit("vectors", (("subspace", subspace.value),), word)
+
+    async def stats(self, word: str, cols: List[str]) -> Dict[str, object]:
+        """col -> value for a word.  Values are None if the word's not in the norms."""
+        return await self._submit("stats", (("cols", tuple(cols)),), word)
+
+    async def neighbours(self, word: str, k: int = 10,
+                         distance_type: DistanceType = DistanceType.cosine,
+                         subspace: Subspace = Subspace.sensorimotor) -> Optional[List[Tuple[str, float]]]:
+        """(word, distance) pairs for the k nearest words, or None if the word's not in the norms."""
+        neighbours = await self._submit("neighbours",
+                                        (("k", k), ("distance", distance_type.value), ("subspace", subspace.value)),
+                                        word)
+        return [tuple(pair) for pair in neighbours] if neighbours is not None else None
+
+    # endregion
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Serve sensorimotor norms lookups over a local socket.")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix-socket", type=str, default=None,
+                        help="Serve on a Unix socket at this path instead of over TCP.")
+    parser.add_argument("--breng", action="store_true", help="Use BrEng spellings.")
+    parser.add_argument("--compact", action="store_true", help="Store the norms in compact dtypes.")
+    args = parser.parse_args()
+
+    server = NormsServer(SensorimotorNorms(use_breng_translation=args.breng, compact=args.compact))
+    if args.unix_socket is not None:
+        asyncio.run(server.serve_unix(args.unix_socket))
+    else:
+        asyncio.run(server.serve_tcp(args.host, args.port))
+
+
+if __name__ == '__main__':
+    from logging import basicConfig, INFO
+
+    basicConfig(level=INFO,
+                format="%(asctime)s | %(levelname)s | %(module)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+
+    main()
@@ -0,0 +1,238 @@
+"""
+===========================
+Read-only, memory-mapped norms shared between processes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import getLogger
+from typing import Dict, Iterable, List, Tuple
+
+from numpy import array, empty, float64, fromiter, int16, intp, nan, ndarray
+
+from .array_files import save_array_set, load_array_set
+from .exceptions import WordNotInNormsError
+
+logger = getLogger(__name__)
+
+# Bump this whenever the layout of exported files changes
+_SHARED_FORMAT_VERSION = 2
+
+_MATRIX_ARRAY = "matrix"
+_CODES_ARRAY = "codes"
+
+
+def export_shared_norms(norms: "SensorimotorNorms", directory: str,
+                        include_sd: bool = False, include_stats: bool = False):
+    """
+    Export the norms to `directory` so they can be attached to by `SharedNorms`.
+
+    The vector columns (and optionally the SD and summary stats columns) are written as a single float64 matrix with
+    one row per word, in the same order as `norms.iter_words()`.  Non-numeric summary stats (i.e. the `Dominant.*`
+    columns) are written as integer codes into a list of categories.
+
+    :param norms:
+    :param directory:
+        Created if it doesn't exist.  Any existing export there is replaced.
+    :param include_sd:
+        Include the SD columns.
+    :param include_stats:
+        Include the summary stats columns, including computed columns.
+    """
+    from pandas.api.types import is_numeric_dtype
+    from .sensorimotor_norms import SensorimotorNorms, DataColNames
+
+    numeric_cols: List[str] = list(SensorimotorNorms.VectorColNames)
+    categorical_cols: List[str] = []
+    if include_sd:
+        numeric_cols += SensorimotorNorms.SDColNames
+    if include_stats:
+        already_included = set(numeric_cols) | set(SensorimotorNorms.SDColNames)
+        for col in norms.data.columns:
+            if col == DataColNames.word or col in already_included:
+                continue
+            if is_numeric_dtype(norms.data[col]):
+                numeric_cols.append(col)
+            else:
+                categorical_cols.append(col)
+
+    categories: Dict[str, List[str]] = dict()
+    # Codes of -1 are missing values
+    codes = empty((norms.n_items, len(categorical_cols)), dtype=int16)
+    for i, col in enumerate(categorical_cols):
+        col_codes, col_categories = norms.data[col].factorize()
+        codes[:, i] = col_codes
+        categories[col] = [str(c) for c in col_categories]
+
+    save_array_set(
+        directory,
+        arrays={
+            _MATRIX_ARRAY: norms.data[numeric_cols].values.astype(float64),
+            _CODES_ARRAY: codes,
+        },
+        meta={
+            "version": _SHARED_FORMAT_VERSION,
+            "using_breng_translation": norms.using_breng_translation,
+            "words": list(norms.iter_words()),
+            "numeric_cols": numeric_cols,
+            "categorical_cols": categorical_cols,
+            "categories": categories,
+        })
+
+    logger.info(f"Exported shared norms to {directory}")
+
+
+class SharedNorms(object):
+    """
+    A read-only view of norms exported by `export_shared_norms`.
+
+    The data is memory-mapped rather than read, so attaching is nearly instant, and any number of processes attached to
+    the same export share a single copy of it in the OS page cache.  Supports the lookup methods of `SensorimotorNorms`
+    for whichever columns were exported.  Returned arrays are read-only views into the shared data.
+    """
+
+    def __init__(self, directory: str):
+        meta, arrays = load_array_set(directory)
+        if meta["version"] != _SHARED_FORMAT_VERSION:
+            raise ValueError(f"Shared norms in {directory} have version {meta['version']}, "
+                             f"expected {_SHARED_FORMAT_VERSION}. Re-export them.")
+
+        self.directory: str = directory
+        self.using_breng_translation: bool = meta["using_breng_translation"]
+
+        self._words: List[str] = meta["words"]
+        # word -> row offset
+        self._row_for_word: Dict[str, int] = {word: row for row, word in enumerate(self._words)}
+
+        self._matrix: ndarray = arrays[_MATRIX_ARRAY]
+        # Codes of -1 are missing values
+        self._codes: ndarray = arrays[_CODES_ARRAY]
+        self._numeric_col_idxs: Dict[str, int] = {col: i for i, col in enumerate(meta["numeric_cols"])}
+        self._categorical_col_idxs: Dict[str, int] = {col: i for i, col in enumerate(meta["categorical_cols"])}
+        self._categories: Dict[str, List[str]] = meta["categories"]
+
+        from .sensorimotor_norms import SensorimotorNorms
+        self.n_items = len(self._words)
+        self.n_dims = len(SensorimotorNorms.VectorColNames)
+        # The vector columns are always exported first, sensory then motor
+        self._vectors: ndarray = self._matrix[:, :self.n_dims]
+        self._sensory: ndarray = self._matrix[:, :len(SensorimotorNorms.SensoryColNames)]
+        self._motor: ndarray = self._matrix[:, len(SensorimotorNorms.SensoryColNames):self.n_dims]
+
+        self.rating_min = 0.0
+        self.rating_max = 5.0
+
+    def _row(self, word: str) -> int:
+        try:
+            return self._row_for_word[word]
+        except KeyError:
+            raise WordNotInNormsError(word)
+
+    def iter_words(self) -> Iterable[str]:
+        for word in self._words:
+            yield word
+
+    def has_word(self, word: str) -> bool:
+        """True if a word is in the norms, else False."""
+        return word in self._row_for_word
+
+    def sensorimotor_vector_for_word(self, word: str) -> array:
+        """
+        :raises: WordNotInNormsError
+        """
+        return self._vectors[self._row(word)]
+
+    def sensory_vector_for_word(self, word: str) -> array:
+        """
+        :raises: WordNotInNormsError
+        """
+        return self._sensory[self._row(word)]
+
+    def motor_vector_for_word(self, word: str) -> array:
+        """
+        :raises: WordNotInNormsError
+        """
+        return self._motor[self._row(word)]
+
+    def fraction_known(self, word: str) -> float:
+        """
+        :raises: WordNotInNormsError
+        :raises: KeyError: When the stats weren't exported.
+        """
+        from .sensorimotor_norms import ComputedColNames
+        return self.stat_for_word(word, ComputedColNames.fraction_known)
+
+    def matrix_for_words(self, words: List[str]) -> array:
+        """
+        :raises: WordNotInNormsError
+        """
+        return self._vectors[[self._row(word) for word in words]]
+
+    def matrix(self) -> array:
+        return self._vectors
+
+    def rows_for_words(self, words: Iterable[str]) -> array:
+        """
+        The rows of a batch of words in `matrix()`, with -1 for words not in the norms.
+        """
+        if not hasattr(words, "__len__"):
+            words = list(words)
+        get_row = self._row_for_word.get
+        return fromiter((get_row(word, -1) for word in words), dtype=intp, count=len(words))
+
+    def lookup_words(self, words: Iterable[str], cols: List[str] = None, fill_value: float = nan) -> Tuple[array, array]:
+        """
+        Look up data for a batch of words at once, without raising for words not in the norms.
+        :param words:
+        :param cols:
+            Exported numeric columns to return, in order.  Defaults to `VectorColNames`.
+        :param fill_value:
+            Value filling the rows of words not in the norms.
+        :return:
+            A words-x-cols matrix, and a boolean mask which is True for the words which were found.
+        :raises KeyError: When a column was not exported, or isn't numeric.
+        """
+        rows = self.rows_for_words(words)
+        found = rows >= 0
+        if cols is None:
+            matrix = self._vectors.take(rows, axis=0)
+        else:
+            col_idxs = [self._numeric_col_idxs[col] for col in cols]
+            matrix = self._matrix.take(rows, axis=0)[:, col_idxs]
+        # Rows of -1 will have taken the last row, so overwrite them
+        matrix[~found] = fill_value
+        return matrix, found
+
+    def categorical_codes(self, col: str) -> Tuple[array, List[str]]:
+        """
+        The values of an exported categorical column as integer codes.
+        :return:
+            Array of codes, one per row, and the list of categories they index.  Missing values have code -1.
+        :raises KeyError: When the column was not exported, or isn't categorical.
+        """
+        return self._codes[:, self._categorical_col_idxs[col]], self._categories[col]
+
+    def stat_for_word(self, word: str, stat_col: str):
+        """
+        Look up a statistical value by its column name.
+        Numeric stats come back as floats, and missing categorical stats as None.
+        :raises WordNotInNormsError: When the word is in correct.
+        :raises KeyError: When the column was not exported.
+        """
+        row = self._row(word)
+        if stat_col in self._numeric_col_idxs:
+            return self._matrix[row, self._numeric_col_idxs[stat_col]]
+        if stat_col in self._categorical_col_idxs:
+            code = self._codes[row, self._categorical_col_idxs[stat_col]]
+            return self._categories[stat_col][code] if code >= 0 else None
+        raise KeyError(stat_col)
@@ -0,0 +1,131 @@
+"""
+===========================
+Shared test setup: synthetic norms, and a stand-in for the BrEng dictionary submodule.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import os
+import sys
+from atexit import register
+from collections import Counter
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from types import ModuleType
+from typing import Dict, List
+
+import pytest
+
+_REPO_DIR = path.dirname(path.dirname(path.realpath(__file__)))
+_PACKAGE_NAME = "sensorimotor_norms"
+
+# Number of words in the synthetic norms
+N_WORDS = 300
+
+
+def _make_package_importable():
+    """
+    The repository is itself the `sensorimotor_norms` package.  Make it importable under that name wherever it's checked
+    out, including from worker processes.
+    """
+    if path.basename(_REPO_DIR) == _PACKAGE_NAME:
+        parent_dir = path.dirname(_REPO_DIR)
+    else:
+        parent_dir = mkdtemp(prefix="sensorimotor_norms_tests_")
+        os.symlink(_REPO_DIR, path.join(parent_dir, _PACKAGE_NAME))
+        # Removes the link, not what it points to
+        register(rmtree, parent_dir, ignore_errors=True)
+    # With the repository itself on the path (e.g. when run from it with `python -m pytest`), sensorimotor_norms.py
+    # would shadow the package
+    sys.path[:] = [p for p in sys.path if path.realpath(p or os.curdir) != _REPO_DIR]
+    sys.path.insert(0, parent_dir)
+    os.environ["PYTHONPATH"] = os.pathsep.join([parent_dir] + [p for p in [os.environ.get("PYTHONPATH")] if p])
+
+
+_make_package_importable()
+
+
+class FakeDialectDictionary(object):
+    """The parts of the dictionary submodule's `ameng_to_breng` which the package uses."""
+
+    def __init__(self, translations: Dict[str, List[str]]):
+        self._translations: Dict[str, List[str]] = translations
+        self.source_vocab = set(translations)
+
+    def translations_for(self, word: str) -> List[str]:
+        return list(self._translations.get(word, []))
+
+
+DEFAULT_TRANSLATIONS = {
+    "color": ["colour"],
+    "center": ["centre"],
+    "gray": ["grey"],
+    "labor": ["labour"],
+    "anesthetize": ["anaesthetise", "anaesthetize"],
+}
+
+
+def install_fake_dictionary(monkeypatch, translations: Dict[str, List[str]],
+                            ameng_counts: Dict[str, int] = None, breng_counts: Dict[str, int] = None):
+    """
+    Make the dictionary submodule importable as a stand-in with the given translations.
+    Modules which imported the dictionary are forgotten, so they're re-imported against the stand-in.
+    """
+    dictionary = ModuleType(f"{_PACKAGE_NAME}.breng_translation.dictionary")
+    dictionary.__path__ = []
+    dialect_dictionary = ModuleType(f"{_PACKAGE_NAME}.breng_translation.dictionary.dialect_dictionary")
+    dialect_dictionary.ameng_to_breng = FakeDialectDictionary(translations)
+    vocabulary = ModuleType(f"{_PACKAGE_NAME}.breng_translation.dictionary.vocabulary")
+    vocabulary.ameng_counter = Counter(ameng_counts or dict())
+    vocabulary.breng_counter = Counter(breng_counts or dict())
+    dictionary.dialect_dictionary = dialect_dictionary
+    dictionary.vocabulary = vocabulary
+
+    monkeypatch.setitem(sys.modules, dictionary.__name__, dictionary)
+    monkeypatch.setitem(sys.modules, dialect_dictionary.__name__, dialect_dictionary)
+    monkeypatch.setitem(sys.modules, vocabulary.__name__, vocabulary)
+    monkeypatch.delitem(sys.modules, f"{_PACKAGE_NAME}.breng_translation.translation_logic", raising=False)
+    return dialect_dictionary.ameng_to_breng
+
+
+@pytest.fixture
+def fake_dictionary(monkeypatch) -> FakeDialectDictionary:
+    """A stand-in for the dictionary submodule, with a few common translations."""
+    return install_fake_dictionary(monkeypatch, DEFAULT_TRANSLATIONS,
+                                   ameng_counts={"anesthetize": 3}, breng_counts={"anaesthetise": 5})
+
+
+@pytest.fixture
+def missing_dictionary(monkeypatch):
+    """Make importing the dictionary submodule fail, as it does when it isn't checked out."""
+    monkeypatch.setitem(sys.modules, f"{_PACKAGE_NAME}.breng_translation.dictionary", None)
+    monkeypatch.delitem(sys.modules, f"{_PACKAGE_NAME}.breng_translation.translation_logic", raising=False)
+
+
+@pytest.fixture(scope="session")
+def norms_path(tmp_path_factory) -> str:
+    """A synthetic norms file, with the same columns as the real one."""
+    from sensorimotor_norms.benchmarks.synthetic import write_synthetic_norms
+
+    file_path = str(tmp_path_factory.mktemp("norms") / "norms.csv")
+    write_synthetic_norms(file_path, N_WORDS, seed=0, dictionary_fraction=0)
+    return file_path
+
+
+@pytest.fixture
+def norms(norms_path):
+    """Norms loaded from the synthetic file, without the on-disk cache."""
+    from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms
+
+    return SensorimotorNorms(norms_path=norms_path, use_cache=False)
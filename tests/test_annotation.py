@@ -0,0 +1,94 @@
+"""
+===========================
+Tests for the streaming corpus annotator.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pandas
+import pytest
+from numpy import cbrt, isnan
+from numpy.testing import assert_allclose
+
+from sensorimotor_norms.annotation import CorpusAnnotator
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames
+from sensorimotor_norms.shared import SharedNorms, export_shared_norms
+
+
+@pytest.fixture
+def multiword(norms) -> str:
+    return next(word for word in norms.iter_words() if " " in word)
+
+
+def _assert_same_profile(profile, other):
+    assert (profile.n_tokens, profile.n_tokens_matched, profile.n_items) == (
+        other.n_tokens, other.n_tokens_matched, other.n_items)
+    assert_allclose(profile.mean, other.mean)
+    assert_allclose(profile.max, other.max)
+    assert_allclose(profile.minkowski3, other.minkowski3)
+    assert profile.dominant_counts == other.dominant_counts
+
+
+def test_profile_of_single_words(norms):
+    words = [word for word in norms.iter_words() if " " not in word][:3]
+    profile = CorpusAnnotator(norms).annotate_document(words + ["notaword"])
+
+    vectors = norms.matrix_for_words(words)
+    assert (profile.n_tokens, profile.n_tokens_matched, profile.n_items) == (4, 3, 3)
+    assert profile.coverage == 0.75
+    assert_allclose(profile.mean, vectors.mean(axis=0))
+    assert_allclose(profile.max, vectors.max(axis=0))
+    assert_allclose(profile.minkowski3, cbrt((vectors ** 3).mean(axis=0)))
+    assert sum(profile.dominant_counts[DataColNames.dominant_perceptual].values()) == 3
+
+
+def test_multiword_items_are_preferred(norms, multiword):
+    profile = CorpusAnnotator(norms).annotate_document(multiword.split(" "))
+    assert (profile.n_tokens, profile.n_tokens_matched, profile.n_items) == (2, 2, 1)
+    assert_allclose(profile.mean, norms.sensorimotor_vector_for_word(multiword))
+
+
+def test_chunking_doesnt_change_profiles(norms, multiword):
+    words = list(norms.iter_words())
+    # Put the multi-word item across chunk boundaries
+    document = " ".join(words[:20] + [multiword, "notaword"] + words[40:50] + [multiword])
+    whole = CorpusAnnotator(norms).annotate_document(document)
+    for chunk_size in [2, 3, 5]:
+        _assert_same_profile(CorpusAnnotator(norms, chunk_size=chunk_size).annotate_document(document), whole)
+
+
+def test_empty_document(norms):
+    profile = CorpusAnnotator(norms).annotate_document("")
+    assert profile.n_items == 0
+    assert isnan(profile.mean).all()
+    assert isnan(profile.coverage)
+
+
+def test_shared_norms_give_same_profiles(tmp_path, norms):
+    export_shared_norms(norms, str(tmp_path), include_stats=True)
+    document = " ".join(list(norms.iter_words())[::7])
+    _assert_same_profile(CorpusAnnotator(SharedNorms(str(tmp_path))).annotate_document(document),
+                         CorpusAnnotator(norms).annotate_document(document))
+
+
+def test_missing_dominant_values_arent_counted(norms_path):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    frame.loc[0, DataColNames.dominant_perceptual] = None
+    norms = SensorimotorNorms(frame=frame, share_data=False)
+    words = list(norms.iter_words())[:2]
+
+    profile = CorpusAnnotator(norms).annotate_document(words)
+
+    assert profile.n_items == 2
+    assert sum(profile.dominant_counts[DataColNames.dominant_perceptual].values()) == 1
+    assert sum(profile.dominant_counts[DataColNames.dominant_action].values()) == 2
@@ -0,0 +1,58 @@
+"""
+===========================
+Tests for batch lookups with missing-word masks.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import isnan
+from numpy.testing import assert_array_equal
+
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, ComputedColNames
+
+
+def test_rows_for_words(norms):
+    words = list(norms.iter_words())
+    assert_array_equal(norms.rows_for_words([words[3], "not a word", words[0]]), [3, -1, 0])
+    # Any iterable will do
+    assert_array_equal(norms.rows_for_words(iter([words[1]])), [1])
+
+
+def test_lookup_words_masks_missing_words(norms):
+    words = list(norms.iter_words())
+    batch = [words[5], "not a word", words[2], "also not a word"]
+
+    matrix, found = norms.lookup_words(batch)
+
+    assert_array_equal(found, [True, False, True, False])
+    assert_array_equal(matrix[found], norms.matrix_for_words([words[5], words[2]]))
+    assert isnan(matrix[~found]).all()
+
+
+@pytest.mark.parametrize("cols", [
+    SensorimotorNorms.SensoryColNames,
+    SensorimotorNorms.MotorColNames,
+    SensorimotorNorms.SDColNames,
+    [ComputedColNames.fraction_known, DataColNames.minkowski3_sensorimotor],
+])
+def test_lookup_words_columns(norms, cols):
+    word = list(norms.iter_words())[7]
+    matrix, found = norms.lookup_words([word, "not a word"], cols=cols, fill_value=-1)
+    assert_array_equal(matrix[0], [norms.stat_for_word(word, col) for col in cols])
+    assert (matrix[1] == -1).all()
+
+
+def test_lookup_words_rejects_non_numeric_columns(norms):
+    with pytest.raises(ValueError):
+        norms.lookup_words([next(iter(norms.iter_words()))], cols=[DataColNames.dominant_perceptual])
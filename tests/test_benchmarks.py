@@ -0,0 +1,65 @@
+"""
+===========================
+Tests for the synthetic norms and the benchmark suite.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+
+import pandas
+
+from sensorimotor_norms.benchmarks import synthetic
+from sensorimotor_norms.benchmarks.suite import run_suite
+from sensorimotor_norms.benchmarks.synthetic import write_synthetic_norms
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames
+
+
+def test_synthetic_norms_look_like_the_real_ones(tmp_path, monkeypatch):
+    # Several chunks
+    monkeypatch.setattr(synthetic, "_CHUNK_ROWS", 150)
+    file_path = str(tmp_path / "norms.csv")
+    write_synthetic_norms(file_path, 400, seed=3, dictionary_fraction=0, multiword_fraction=0.05)
+
+    data = pandas.read_csv(file_path, keep_default_na=False)
+    assert list(data.columns) == [value for name, value in vars(DataColNames).items() if not name.startswith("_")]
+    assert len(data) == 400
+    assert data[DataColNames.word].is_unique
+    assert data[DataColNames.word].str.contains(" ").sum() == 20
+    vectors = data[SensorimotorNorms.VectorColNames]
+    assert ((vectors >= 0) & (vectors <= 5)).all().all()
+
+    norms = SensorimotorNorms(norms_path=file_path, use_cache=False, share_data=False)
+    assert norms.n_items == 400
+
+
+def test_synthetic_norms_are_reproducible(tmp_path):
+    paths = [str(tmp_path / "a.csv"), str(tmp_path / "b.csv"), str(tmp_path / "c.csv")]
+    for file_path, seed in zip(paths, [0, 0, 1]):
+        write_synthetic_norms(file_path, 100, seed=seed, dictionary_fraction=0)
+    contents = [open(file_path, encoding="utf-8").read() for file_path in paths]
+    assert contents[0] == contents[1] != contents[2]
+
+
+def test_small_suite_runs(tmp_path):
+    output_path = str(tmp_path / "results.json")
+    results = run_suite(sizes=[200], repeats=1, output_path=output_path)
+
+    with open(output_path, mode="r", encoding="utf-8") as output_file:
+        assert json.load(output_file) == results
+    size_results = results["sizes"]["200"]
+    assert size_results["n_words"] == 200
+    assert set(size_results["single_lookup_ns"]) == {"sensorimotor_vector_for_word", "stat_for_word"}
+    assert all(seconds > 0 for seconds in size_results["construction_seconds"].values())
+    assert {"ameng", "ameng_vectors_profile", "ameng_lazy_vectors", "ameng_cached"} <= set(
+        size_results["construction_seconds"])
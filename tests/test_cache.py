@@ -0,0 +1,87 @@
+"""
+===========================
+Tests for the on-disk cache of parsed norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pickle
+from shutil import copyfile
+
+import pandas
+import pytest
+from pandas.testing import assert_frame_equal
+
+from sensorimotor_norms.cache import NormsCache
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms
+
+
+def test_saved_snapshot_is_loaded(tmp_path, norms_path):
+    cache = NormsCache(str(tmp_path), norms_path, use_breng_translation=False)
+    assert cache.load("words") is None
+    cache.save("words", {"a": 1})
+    assert NormsCache(str(tmp_path), norms_path, use_breng_translation=False).load("words") == {"a": 1}
+
+
+def test_snapshots_are_separate_for_translation(tmp_path, norms_path):
+    NormsCache(str(tmp_path), norms_path, use_breng_translation=False).save("words", "ameng")
+    assert NormsCache(str(tmp_path), norms_path, use_breng_translation=True).load("words") is None
+
+
+def test_changed_source_invalidates(tmp_path, norms_path):
+    source_path = str(tmp_path / "norms.csv")
+    copyfile(norms_path, source_path)
+    NormsCache(str(tmp_path), source_path, use_breng_translation=False).save("words", "old")
+
+    with open(source_path, mode="a", encoding="utf-8") as source_file:
+        source_file.write("\n")
+    assert NormsCache(str(tmp_path), source_path, use_breng_translation=False).load("words") is None
+
+
+def test_other_pandas_version_invalidates(tmp_path, norms_path, monkeypatch):
+    NormsCache(str(tmp_path), norms_path, use_breng_translation=False).save("words", "old")
+    monkeypatch.setattr(pandas, "__version__", "0.0.1")
+    assert NormsCache(str(tmp_path), norms_path, use_breng_translation=False).load("words") is None
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path, norms_path):
+    cache = NormsCache(str(tmp_path), norms_path, use_breng_translation=False)
+    cache.save("words", "ok")
+    snapshot_path = cache._snapshot_path("words")
+    with open(snapshot_path, mode="wb") as snapshot_file:
+        snapshot_file.write(b"not a pickle")
+    assert cache.load("words") is None
+
+
+class _Unpicklable(object):
+    def __reduce__(self):
+        raise pickle.PicklingError("Can't be pickled")
+
+
+def test_failed_save_keeps_previous_snapshot(tmp_path, norms_path):
+    cache_dir = tmp_path / "cache"
+    cache = NormsCache(str(cache_dir), norms_path, use_breng_translation=False)
+    cache.save("words", "old")
+    with pytest.raises(pickle.PicklingError):
+        cache.save("words", _Unpicklable())
+    assert cache.load("words") == "old"
+    assert not any(p.name.endswith(".tmp") for p in cache_dir.iterdir())
+
+
+def test_cached_norms_match_uncached(tmp_path, norms_path):
+    uncached = SensorimotorNorms(norms_path=norms_path, use_cache=False)
+    # The first load writes the snapshots, the second reads them
+    SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False)
+    assert any(tmp_path.iterdir())
+    cached = SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False)
+    assert_frame_equal(cached.data, uncached.data)
@@ -0,0 +1,68 @@
+"""
+===========================
+Tests for precomputed derived features.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import zeros
+from numpy.linalg import norm
+from numpy.testing import assert_allclose
+
+from sensorimotor_norms.derived import DerivedFeatures
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, Subspace
+
+
+@pytest.mark.parametrize("subspace", list(Subspace))
+def test_features_match_vectors(norms, subspace):
+    vectors = norms.matrix()[:, subspace.dims]
+    derived = norms.derived
+
+    assert_allclose(derived.l2_norms(subspace), norm(vectors, axis=1))
+    assert_allclose(norm(derived.unit_vectors(subspace), axis=1), 1)
+    assert_allclose(derived.max_strength(subspace), vectors.max(axis=1))
+    assert_allclose(derived.minkowski3(subspace), (vectors ** 3).sum(axis=1) ** (1 / 3))
+
+
+@pytest.mark.parametrize("subspace, max_strength_col, minkowski3_col", [
+    (Subspace.sensory,      DataColNames.max_strength_perceptual,   DataColNames.minkowski3_perceptual),
+    (Subspace.motor,        DataColNames.max_strength_action,       DataColNames.minkowski3_action),
+    (Subspace.sensorimotor, DataColNames.max_strength_sensorimotor, DataColNames.minkowski3_sensorimotor),
+])
+def test_features_match_norms_stats(norms, subspace, max_strength_col, minkowski3_col):
+    # The stats are rounded in the file
+    assert_allclose(norms.derived.max_strength(subspace), norms.data[max_strength_col], atol=1e-3)
+    assert_allclose(norms.derived.minkowski3(subspace), norms.data[minkowski3_col], atol=1e-3)
+
+
+def test_rescaled_and_zero_vectors():
+    vectors = zeros((2, len(SensorimotorNorms.VectorColNames)))
+    vectors[1] = 5
+    derived = DerivedFeatures.compute(vectors, rating_min=0, rating_max=5)
+    assert_allclose(derived.rescaled, [[0] * 11, [1] * 11])
+    # Zero vectors stay zero rather than becoming NaN
+    assert_allclose(derived.unit_vectors()[0], 0)
+    with pytest.raises(ValueError):
+        derived.l2_norms()[0] = 1
+
+
+def test_derived_features_are_cached(tmp_path, norms_path, norms, monkeypatch):
+    expected = norms.derived.unit_vectors()
+    SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False).derived
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Derived features were recomputed")
+    monkeypatch.setattr(DerivedFeatures, "compute", fail)
+    cached = SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False)
+    assert_allclose(cached.derived.unit_vectors(), expected)
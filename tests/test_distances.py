@@ -0,0 +1,97 @@
+"""
+===========================
+Tests for all-pairs distances computed in tiles.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import empty, fill_diagonal, float64, inf, nonzero, sort, triu_indices
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.distances import DistanceType, distances_to_file, distances_within, iter_distance_tiles, \
+    nearest_k, pairwise_distances
+
+# Small enough that 60 rows need several tiles
+_SMALL_MEMORY = 8 * 20 * 20
+
+
+@pytest.fixture
+def vectors():
+    return default_rng(0).uniform(0, 5, size=(60, 11))
+
+
+@pytest.fixture
+def other_vectors():
+    return default_rng(1).uniform(0, 5, size=(25, 11))
+
+
+@pytest.mark.parametrize("distance_type", list(DistanceType))
+@pytest.mark.parametrize("n_processes", [1, 2])
+def test_tiles_cover_the_whole_matrix(vectors, other_vectors, distance_type, n_processes):
+    expected = pairwise_distances(vectors, other_vectors, distance_type)
+    assembled = empty(expected.shape, dtype=float64)
+    assembled.fill(inf)
+    for rows, cols, distances in iter_distance_tiles(vectors, other_vectors, distance_type,
+                                                     max_memory_bytes=_SMALL_MEMORY, n_processes=n_processes):
+        assembled[rows, cols] = distances
+    assert_allclose(assembled, expected)
+
+
+def test_distances_to_file(tmp_path, vectors):
+    expected = pairwise_distances(vectors, vectors, DistanceType.euclidean)
+
+    full_distances = distances_to_file(vectors, None, DistanceType.euclidean, str(tmp_path / "full.npy"),
+                                       dtype=float64, max_memory_bytes=_SMALL_MEMORY)
+    assert_allclose(full_distances, expected)
+
+    condensed = distances_to_file(vectors, None, DistanceType.euclidean, str(tmp_path / "condensed.npy"),
+                                  dtype=float64, condensed=True, max_memory_bytes=_SMALL_MEMORY)
+    # Same order as scipy's pdist
+    assert_allclose(condensed, expected[triu_indices(len(vectors), k=1)])
+
+    with pytest.raises(ValueError):
+        distances_to_file(vectors, vectors, DistanceType.euclidean, str(tmp_path / "bad.npy"), condensed=True)
+
+
+def test_nearest_k(vectors, other_vectors):
+    distances = pairwise_distances(vectors, vectors, DistanceType.cosine)
+    fill_diagonal(distances, inf)
+
+    idxs, nearest_distances = nearest_k(vectors, None, DistanceType.cosine, k=4, max_memory_bytes=_SMALL_MEMORY)
+
+    assert_allclose(nearest_distances, sort(distances, axis=1)[:, :4])
+    # No row is its own neighbour
+    assert (idxs.T != range(len(vectors))).all()
+
+    between = pairwise_distances(vectors, other_vectors, DistanceType.cosine)
+    _idxs, nearest_distances = nearest_k(vectors, other_vectors, DistanceType.cosine, k=4,
+                                         max_memory_bytes=_SMALL_MEMORY)
+    assert_allclose(nearest_distances, sort(between, axis=1)[:, :4])
+
+
+def test_distances_within(vectors):
+    distances = pairwise_distances(vectors, vectors, DistanceType.euclidean)
+    # Midway between two distances, so rounding can't move pairs across it
+    sorted_distances = sort(distances[triu_indices(len(vectors), k=1)])
+    threshold = float(sorted_distances[50] + sorted_distances[51]) / 2
+    expected_is, expected_js = nonzero(distances <= threshold)
+    upper = expected_is < expected_js
+
+    i, j, within = distances_within(vectors, None, DistanceType.euclidean, threshold, max_memory_bytes=_SMALL_MEMORY)
+
+    order = sorted(range(len(i)), key=lambda n: (i[n], j[n]))
+    assert_array_equal(i[order], expected_is[upper])
+    assert_array_equal(j[order], expected_js[upper])
+    assert_allclose(within[order], distances[expected_is[upper], expected_js[upper]])
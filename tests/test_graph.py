@@ -0,0 +1,130 @@
+"""
+===========================
+Tests for sparse similarity graphs.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+import os
+
+import pytest
+from numpy import argsort, fill_diagonal, inf, memmap, nonzero, sort, triu_indices
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.distances import DistanceType, pairwise_distances
+from sensorimotor_norms.graph import SimilarityGraph
+from sensorimotor_norms.sensorimotor_norms import Subspace
+
+
+@pytest.fixture
+def small_graph() -> SimilarityGraph:
+    """Components {a, b, c}, {d, e} and {f}."""
+    return SimilarityGraph.from_edges(list("abcdef"), sources=[0, 1, 3], targets=[1, 2, 4], weights=[0.1, 0.2, 0.3])
+
+
+def _edges(graph: SimilarityGraph):
+    return {(graph.words[row], graph.words[graph.indices[i]])
+            for row in range(graph.n_nodes)
+            for i in range(graph.indptr[row], graph.indptr[row + 1])}
+
+
+def test_knn_graph_matches_brute_force(norms):
+    k = 4
+    vectors = norms.matrix()[:, Subspace.sensory.dims]
+    distances = pairwise_distances(vectors, vectors, DistanceType.euclidean)
+    fill_diagonal(distances, inf)
+
+    graph = SimilarityGraph.knn(norms, k, distance_type=DistanceType.euclidean, subspace=Subspace.sensory,
+                                symmetric=False)
+
+    words = graph.words
+    assert words == list(norms.iter_words())
+    for row in range(0, len(words), 7):
+        neighbours = graph.neighbours(words[row])
+        assert [word for word, _ in neighbours] == [words[i] for i in argsort(distances[row], kind="stable")[:k]]
+        assert_allclose([distance for _, distance in neighbours], sort(distances[row])[:k], rtol=1e-5)
+
+    symmetric = SimilarityGraph.knn(norms, k, distance_type=DistanceType.euclidean, subspace=Subspace.sensory)
+    directed_edges = _edges(graph)
+    assert _edges(symmetric) == directed_edges | {(b, a) for a, b in directed_edges}
+    assert (symmetric.degrees() >= k).all()
+
+
+def test_within_graph_matches_brute_force(norms):
+    distances = pairwise_distances(norms.matrix(), norms.matrix(), DistanceType.cosine)
+    # Between two distances, so nothing is on the boundary
+    upper = sort(distances[triu_indices(len(distances), k=1)])
+    threshold = float((upper[200] + upper[201]) / 2)
+
+    graph = SimilarityGraph.within(norms, threshold)
+
+    fill_diagonal(distances, inf)
+    rows, cols = nonzero(distances <= threshold)
+    assert _edges(graph) == {(graph.words[row], graph.words[col]) for row, col in zip(rows, cols)}
+    assert graph.n_edges == 2 * 201
+    assert graph.meta["kind"] == "within"
+
+
+def test_components_and_expansion(small_graph):
+    assert_array_equal(small_graph.component_labels(), [0, 0, 0, 3, 3, 5])
+    assert small_graph.component_sizes() == {0: 3, 3: 2, 5: 1}
+    assert small_graph.n_components() == 3
+    assert small_graph.component_of("e") == 3
+    assert small_graph.expand(["a"]) == ["a", "b"]
+    assert small_graph.expand(["a", "f"], hops=5) == ["a", "b", "c", "f"]
+    assert small_graph.degree("b") == 2
+    assert small_graph.neighbours("b") == [("a", pytest.approx(0.1)), ("c", pytest.approx(0.2))]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load(tmp_path, small_graph, mmap):
+    directory = str(tmp_path / "graph")
+    small_graph.save(directory)
+
+    loaded = SimilarityGraph.load(directory, mmap=mmap)
+
+    assert loaded.words == small_graph.words
+    assert isinstance(loaded.indices, memmap) == mmap
+    for name in ["indptr", "indices", "weights"]:
+        assert_array_equal(getattr(loaded, name), getattr(small_graph, name))
+    assert_array_equal(loaded.component_labels(), small_graph.component_labels())
+
+
+def test_saving_over_a_graph_replaces_it(tmp_path, small_graph):
+    directory = str(tmp_path / "graph")
+    small_graph.save(directory)
+    old = SimilarityGraph.load(directory)
+
+    new_graph = SimilarityGraph.from_edges(list("abcdef"), sources=[0], targets=[5], weights=[0.5])
+    new_graph.save(directory)
+
+    assert _edges(SimilarityGraph.load(directory)) == {("a", "f"), ("f", "a")}
+    # Graphs loaded before are unaffected
+    assert _edges(old) == _edges(small_graph)
+    # Only the new graph's files are left, and no temporary files
+    files = os.listdir(directory)
+    assert len(files) == 4
+    assert not any(file_name.endswith(".tmp") for file_name in files)
+
+
+def test_loading_an_old_graph_fails(tmp_path, small_graph):
+    directory = str(tmp_path / "graph")
+    small_graph.save(directory)
+    meta_path = os.path.join(directory, "meta.json")
+    with open(meta_path, mode="r", encoding="utf-8") as meta_file:
+        meta = json.load(meta_file)
+    with open(meta_path, mode="w", encoding="utf-8") as meta_file:
+        json.dump({**meta, "version": 1}, meta_file)
+    with pytest.raises(ValueError):
+        SimilarityGraph.load(directory)
@@ -0,0 +1,105 @@
+"""
+===========================
+Tests for estimating vectors of words which aren't in the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pandas
+import pytest
+from numpy import isnan
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.imputation import EstimateKind, VectorImputer, stem_candidates
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, Subspace
+from sensorimotor_norms.variants import VariantIndex
+
+_WORDS = ["berry", "run", "ice", "cream", "elephant"]
+
+
+@pytest.fixture
+def known_norms(missing_dictionary, norms_path) -> SensorimotorNorms:
+    """The synthetic norms, with some real words in the first rows."""
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    frame = frame[~frame[DataColNames.word].isin(_WORDS)].reset_index(drop=True)
+    frame.loc[:len(_WORDS) - 1, DataColNames.word] = _WORDS
+    return SensorimotorNorms(frame=frame, share_data=False)
+
+
+def _row(norms: SensorimotorNorms, word: str) -> int:
+    return int(norms.rows_for_words([word])[0])
+
+
+def test_stem_candidates():
+    assert stem_candidates("berries")[0] == "berry"
+    assert "run" in stem_candidates("running")
+    assert stem_candidates("cat") == []
+
+
+@pytest.mark.parametrize("word, kind, components", [
+    (" Berry", EstimateKind.variant, ["berry"]),
+    ("berries", EstimateKind.stem, ["berry"]),
+    ("running", EstimateKind.stem, ["run"]),
+    ("ice-cream", EstimateKind.components, ["ice", "cream"]),
+    ("ice creams", EstimateKind.components, ["ice", "cream"]),
+    ("ice-cream van", None, None),
+    ("elephnat", None, None),
+])
+def test_estimates(known_norms, word, kind, components):
+    estimate = VectorImputer(known_norms).estimate(word)
+    if kind is None:
+        assert estimate is None
+    else:
+        assert estimate.kind is kind
+        assert estimate.rows == [_row(known_norms, component) for component in components]
+
+
+def test_options_turn_off_kinds_of_estimate(known_norms):
+    assert VectorImputer(known_norms, use_stems=False).estimate("berries") is None
+    assert VectorImputer(known_norms, use_components=False).estimate("ice-cream") is None
+    assert VectorImputer(known_norms, use_variants=False, use_edit_distance=True).estimate("elephnat") is None
+
+
+def test_edit_distance_is_only_used_when_enabled(known_norms, monkeypatch):
+    assert VectorImputer(known_norms, use_edit_distance=True).estimate("elephnat").rows == [
+        _row(known_norms, "elephant")]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Edit distance candidates were computed")
+    monkeypatch.setattr(VariantIndex, "edit_distance_candidates", fail)
+    # Nothing found for any of the candidate stems or components either
+    assert VectorImputer(known_norms).estimate("elephnats") is None
+
+
+def test_vectors(known_norms):
+    imputer = VectorImputer(known_norms, subspace=Subspace.motor)
+    motor = known_norms.matrix()[:, Subspace.motor.dims]
+    assert_allclose(imputer.vector_for_word("berry"), motor[_row(known_norms, "berry")])
+    assert_allclose(imputer.vector_for_word("ice-cream"),
+                    (motor[_row(known_norms, "ice")] + motor[_row(known_norms, "cream")]) / 2)
+    assert imputer.vector_for_word("zzzzzz") is None
+
+
+def test_matrix_for_words(known_norms):
+    imputer = VectorImputer(known_norms)
+    words = ["berry", "berries", "zzzzzz", "berries", "run"]
+
+    matrix, found, estimated = imputer.matrix_for_words(iter(words))
+
+    assert_array_equal(found, [True, False, False, False, True])
+    assert_array_equal(estimated, [False, True, False, True, False])
+    assert_allclose(matrix[[0, 1, 3]], known_norms.matrix()[[_row(known_norms, "berry")] * 3])
+    assert isnan(matrix[2]).all()
+    assert_allclose(matrix[4], known_norms.sensorimotor_vector_for_word("run"))
+    # Each distinct missing word was estimated once
+    assert imputer.cache.stats()["misses"] == 2
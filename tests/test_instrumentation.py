@@ -0,0 +1,80 @@
+"""
+===========================
+Tests for instrumentation of loading and lookups.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+
+from sensorimotor_norms.exceptions import WordNotInNormsError
+from sensorimotor_norms.instrumentation import Instrumentation, PrometheusFileSink
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames
+
+
+@pytest.fixture(params=[False, True], ids=["uninstrumented", "instrumented"])
+def maybe_instrumented(request, norms):
+    norms.instrumentation = Instrumentation() if request.param else None
+    return norms
+
+
+def test_stat_for_word(maybe_instrumented):
+    norms = maybe_instrumented
+    word = next(iter(norms.iter_words()))
+    assert norms.stat_for_word(word, DataColNames.dominant_perceptual) == norms.data[
+        DataColNames.dominant_perceptual].iloc[0]
+
+
+@pytest.mark.parametrize("word, stat_col, error", [
+    ("not a word", DataColNames.dominant_perceptual, WordNotInNormsError),
+    # A missing word is reported before a missing column
+    ("not a word", "Not a column", WordNotInNormsError),
+    (None, "Not a column", KeyError),
+])
+def test_stat_for_word_errors(maybe_instrumented, word, stat_col, error):
+    norms = maybe_instrumented
+    if word is None:
+        word = next(iter(norms.iter_words()))
+    with pytest.raises(error):
+        norms.stat_for_word(word, stat_col)
+    if norms.instrumentation is not None:
+        assert norms.instrumentation.snapshot()["latencies"]["stat_for_word"]["errors"] == 1
+
+
+def test_loading_phases_and_lookups_are_recorded(norms_path):
+    instrumentation = Instrumentation()
+    norms = SensorimotorNorms(norms_path=norms_path, use_cache=False, share_data=False,
+                              instrumentation=instrumentation)
+    words = list(norms.iter_words())[:3]
+    norms.sensorimotor_vector_for_word(words[0])
+    norms.lookup_words(words + ["not a word"])
+
+    snapshot = instrumentation.snapshot()
+    assert "read_csv" in snapshot["phase_seconds"]
+    assert snapshot["latencies"]["sensorimotor_vector_for_word"]["count"] == 1
+    assert snapshot["counters"]["lookup_words.found"] == 3
+    assert snapshot["counters"]["lookup_words.missing"] == 1
+    assert "sensorimotor_vector_for_word" in instrumentation.prometheus_text()
+
+
+def test_prometheus_file_sink(tmp_path):
+    file_path = tmp_path / "norms.prom"
+    instrumentation = Instrumentation(sinks=[PrometheusFileSink(str(file_path))])
+    instrumentation.observe("stat_for_word", 1e-6)
+    instrumentation.flush()
+    instrumentation.observe("stat_for_word", 1e-6)
+    instrumentation.flush()
+
+    assert file_path.read_text(encoding="utf-8") == instrumentation.prometheus_text()
+    assert 'sensorimotor_norms_latency_seconds_count{method="stat_for_word"} 2' in file_path.read_text(encoding="utf-8")
+    assert [p.name for p in tmp_path.iterdir()] == ["norms.prom"]
@@ -0,0 +1,58 @@
+"""
+===========================
+Tests for lazy importing, configuration and loading.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import subprocess
+import sys
+from logging import INFO
+
+from numpy.testing import assert_array_equal
+
+from sensorimotor_norms.config.config import Config
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms
+
+
+def test_importing_doesnt_load_heavy_dependencies(tmp_path):
+    # In a fresh interpreter, so nothing's been imported yet.  (And away from the repository, where
+    # sensorimotor_norms.py would shadow the package.)
+    loaded = subprocess.run(
+        [sys.executable, "-c",
+         "import sys; import sensorimotor_norms.sensorimotor_norms; "
+         "print(' '.join(m for m in ['numpy', 'pandas', 'yaml'] if m in sys.modules))"],
+        cwd=str(tmp_path), capture_output=True, text=True, check=True).stdout.split()
+    assert loaded == []
+
+
+def test_config_logs_rather_than_prints(capsys, caplog):
+    with caplog.at_level(INFO, logger="sensorimotor_norms.config.config"):
+        with Config(use_particular_overrides=dict()):
+            pass
+    assert capsys.readouterr().out == ""
+    assert "with specific overrides set" in caplog.text
+
+
+def test_lazy_norms_load_only_what_is_needed(norms_path, norms):
+    lazy = SensorimotorNorms(norms_path=norms_path, use_cache=False, lazy=True, share_data=False)
+    assert lazy._loaded_groups == set()
+
+    word = next(iter(norms.iter_words()))
+    assert lazy.has_word(word)
+    assert {group.value for group in lazy._loaded_groups} == {"words"}
+
+    assert_array_equal(lazy.sensorimotor_vector_for_word(word), norms.sensorimotor_vector_for_word(word))
+    assert {group.value for group in lazy._loaded_groups} == {"words", "vectors"}
+
+    assert lazy.fraction_known(word) == norms.fraction_known(word)
@@ -0,0 +1,62 @@
+"""
+===========================
+Tests for column-selective load profiles and compact dtypes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import float32, float64
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, LoadProfile
+
+
+def _load(norms_path, **kwargs) -> SensorimotorNorms:
+    return SensorimotorNorms(norms_path=norms_path, use_cache=False, share_data=False, **kwargs)
+
+
+def test_vectors_profile_has_only_vectors(norms_path, norms):
+    vectors_only = _load(norms_path, profile=LoadProfile.vectors)
+    word = next(iter(norms.iter_words()))
+
+    assert_array_equal(vectors_only.sensorimotor_vector_for_word(word), norms.sensorimotor_vector_for_word(word))
+    assert set(vectors_only.data.columns) == {DataColNames.word, *SensorimotorNorms.VectorColNames}
+    with pytest.raises(KeyError):
+        vectors_only.stat_for_word(word, SensorimotorNorms.SDColNames[0])
+    with pytest.raises(KeyError):
+        vectors_only.stat_for_word(word, DataColNames.dominant_perceptual)
+
+
+def test_vectors_sd_profile_has_sds(norms_path, norms):
+    with_sds = _load(norms_path, profile=LoadProfile.vectors_sd)
+    word = next(iter(norms.iter_words()))
+    sd_col = SensorimotorNorms.SDColNames[0]
+    assert with_sds.stat_for_word(word, sd_col) == norms.stat_for_word(word, sd_col)
+    with pytest.raises(KeyError):
+        with_sds.stat_for_word(word, DataColNames.dominant_perceptual)
+
+
+def test_compact_dtypes(norms_path, norms):
+    compact = _load(norms_path, compact=True)
+    word = list(norms.iter_words())[11]
+
+    # Stored compactly, but looked up as before
+    assert compact._vectors.dtype == float32
+    assert compact.sensorimotor_vector_for_word(word).dtype == float64
+    assert compact.matrix_for_words([word]).dtype == float64
+    assert_allclose(compact.matrix(), norms.matrix(), rtol=1e-6)
+    assert str(compact.data[DataColNames.dominant_perceptual].dtype) == "category"
+    assert compact.stat_for_word(word, DataColNames.dominant_perceptual) == norms.stat_for_word(
+        word, DataColNames.dominant_perceptual)
+    assert compact.memory_footprint()["data"] < norms.memory_footprint()["data"]
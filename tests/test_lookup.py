@@ -0,0 +1,69 @@
+"""
+===========================
+Tests for per-word lookups.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy.testing import assert_array_equal
+
+from sensorimotor_norms.exceptions import WordNotInNormsError
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, ComputedColNames
+
+
+def _row_of(norms, word):
+    return norms.data[norms.data[DataColNames.word] == word].iloc[0]
+
+
+def test_vectors_match_data(norms):
+    word = list(norms.iter_words())[17]
+    row = _row_of(norms, word)
+    assert_array_equal(norms.sensorimotor_vector_for_word(word), row[SensorimotorNorms.VectorColNames].astype(float))
+    assert_array_equal(norms.sensory_vector_for_word(word), row[SensorimotorNorms.SensoryColNames].astype(float))
+    assert_array_equal(norms.motor_vector_for_word(word), row[SensorimotorNorms.MotorColNames].astype(float))
+    assert norms.fraction_known(word) == row[ComputedColNames.fraction_known]
+    assert norms.stat_for_word(word, DataColNames.dominant_perceptual) == row[DataColNames.dominant_perceptual]
+
+
+@pytest.mark.parametrize("lookup", [
+    lambda norms, word: norms.sensorimotor_vector_for_word(word),
+    lambda norms, word: norms.sensory_vector_for_word(word),
+    lambda norms, word: norms.motor_vector_for_word(word),
+    lambda norms, word: norms.matrix_for_words([word])[0],
+])
+def test_vectors_are_copies(norms, lookup):
+    word = next(iter(norms.iter_words()))
+    vector = lookup(norms, word)
+    original = vector.copy()
+    vector[0] = -1
+    # The norms are unchanged
+    assert_array_equal(lookup(norms, word), original)
+
+
+def test_matrix_for_words_is_in_order(norms):
+    words = list(norms.iter_words())[:5][::-1]
+    assert_array_equal(norms.matrix_for_words(words),
+                       [norms.sensorimotor_vector_for_word(word) for word in words])
+
+
+@pytest.mark.parametrize("lookup", [
+    lambda norms: norms.sensorimotor_vector_for_word("not a word"),
+    lambda norms: norms.sensory_vector_for_word("not a word"),
+    lambda norms: norms.motor_vector_for_word("not a word"),
+    lambda norms: norms.fraction_known("not a word"),
+    lambda norms: norms.matrix_for_words([next(iter(norms.iter_words())), "not a word"]),
+])
+def test_missing_word_raises(norms, lookup):
+    with pytest.raises(WordNotInNormsError):
+        lookup(norms)
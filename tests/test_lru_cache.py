@@ -0,0 +1,76 @@
+"""
+===========================
+Tests for the LRU cache of derived per-word results.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+
+from sensorimotor_norms.distances import DistanceType
+from sensorimotor_norms.lru_cache import LRUCache
+from sensorimotor_norms.neighbours import NeighbourIndex
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    # Using "a" makes "b" the least recently used
+    assert cache.get_or_compute("a", lambda: pytest.fail("a should be cached")) == 1
+    cache.get_or_compute("c", lambda: 3)
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 1, "misses": 3, "evictions": 1, "hit_rate": 0.25}
+
+
+def test_failed_computations_arent_cached():
+    cache = LRUCache(2)
+
+    def fail():
+        raise ValueError()
+    with pytest.raises(ValueError):
+        cache.get_or_compute("a", fail)
+    assert "a" not in cache
+    assert cache.get_or_compute("a", lambda: 1) == 1
+
+
+def test_clear_keeps_counters():
+    cache = LRUCache(2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_norms_result_cache(norms):
+    norms.enable_result_cache(max_size=10)
+    word = next(iter(norms.iter_words()))
+    index = NeighbourIndex(norms, DistanceType.euclidean)
+
+    first = index.nearest_to_word(word, k=3)
+    # Modifying a result doesn't change what's cached
+    first.clear()
+    assert index.nearest_to_word(word, k=3) == index._nearest_to_word(word, 3, include_self=False)
+    norms.match_word(word.upper())
+    norms.match_word(word.upper())
+    assert norms.result_cache.stats()["hits"] == 2
+
+    norms.disable_result_cache()
+    assert norms.result_cache is None
+    assert norms.match_word(word.upper()).word == word
@@ -0,0 +1,101 @@
+"""
+===========================
+Tests for nearest-neighbour search.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import abs as np_abs, argsort, corrcoef, inf, ndarray, sqrt
+from numpy.linalg import norm
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.distances import DistanceType
+from sensorimotor_norms.exceptions import WordNotInNormsError
+from sensorimotor_norms.neighbours import NeighbourIndex
+from sensorimotor_norms.sensorimotor_norms import Subspace
+from sensorimotor_norms.shared import SharedNorms, export_shared_norms
+
+
+def brute_force_distances(queries: ndarray, vectors: ndarray, distance_type: DistanceType) -> ndarray:
+    """Distances computed directly from their definitions, one pair at a time."""
+    def distance(u, v):
+        if distance_type is DistanceType.cosine:
+            return 1 - u @ v / (norm(u) * norm(v))
+        if distance_type is DistanceType.euclidean:
+            return sqrt(((u - v) ** 2).sum())
+        if distance_type is DistanceType.minkowski3:
+            return (np_abs(u - v) ** 3).sum() ** (1 / 3)
+        if distance_type is DistanceType.correlation:
+            return 1 - corrcoef(u, v)[0, 1]
+        raise NotImplementedError(distance_type)
+    return [[distance(u, v) for v in vectors] for u in queries]
+
+
+@pytest.mark.parametrize("distance_type", list(DistanceType))
+def test_nearest_match_brute_force(norms, distance_type):
+    # Small blocks, so queries span several
+    index = NeighbourIndex(norms, distance_type, max_block_bytes=8 * norms.n_items * 3)
+    queries = norms.matrix()[:10] + 0.25
+
+    rows, distances = index.nearest_to_vectors(queries, k=5)
+
+    expected = brute_force_distances(queries, norms.matrix(), distance_type)
+    for query_rows, query_distances, query_expected in zip(rows, distances, expected):
+        assert_allclose(query_distances, sorted(query_expected)[:5], atol=1e-9)
+        assert_allclose([query_expected[row] for row in query_rows], query_distances, atol=1e-9)
+
+
+def test_nearest_to_words_excludes_self(norms):
+    index = NeighbourIndex(norms, DistanceType.euclidean)
+    words = list(norms.iter_words())[:4]
+
+    rows, distances = index.nearest_to_words(words, k=3)
+
+    expected = brute_force_distances(norms.matrix_for_words(words), norms.matrix(), DistanceType.euclidean)
+    for i, query_expected in enumerate(expected):
+        query_expected[i] = inf
+        assert i not in rows[i]
+        assert_array_equal(rows[i], argsort(query_expected, kind="stable")[:3])
+
+    with_self, _ = index.nearest_to_words(words, k=1, include_self=True)
+    assert_array_equal(with_self[:, 0], range(4))
+
+
+def test_subspace_neighbours(norms):
+    index = NeighbourIndex(norms, DistanceType.euclidean, subspace=Subspace.motor)
+    word = next(iter(norms.iter_words()))
+    neighbours = index.nearest_to_word(word, k=3)
+
+    expected = brute_force_distances([norms.motor_vector_for_word(word)],
+                                     norms.matrix()[:, Subspace.motor.dims], DistanceType.euclidean)[0]
+    expected[0] = inf
+    assert_allclose([distance for _word, distance in neighbours], sorted(expected)[:3])
+
+
+def test_nearest_to_missing_word_raises(norms):
+    with pytest.raises(WordNotInNormsError):
+        NeighbourIndex(norms).nearest_to_word("not a word", k=3)
+
+
+@pytest.mark.parametrize("distance_type", list(DistanceType))
+def test_index_over_shared_norms(tmp_path, norms, distance_type):
+    export_shared_norms(norms, str(tmp_path))
+    shared = SharedNorms(str(tmp_path))
+    words = list(norms.iter_words())[:5]
+
+    rows, distances = NeighbourIndex(shared, distance_type).nearest_to_words(words, k=3)
+
+    expected_rows, expected_distances = NeighbourIndex(norms, distance_type).nearest_to_words(words, k=3)
+    assert_array_equal(rows, expected_rows)
+    assert_allclose(distances, expected_distances, atol=1e-12)
@@ -0,0 +1,77 @@
+"""
+===========================
+Tests for parallel annotation across processes.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from random import Random
+
+import pytest
+
+from sensorimotor_norms.annotation import CorpusAnnotator
+from sensorimotor_norms.parallel import ParallelAnnotator
+
+from test_annotation import _assert_same_profile
+
+
+@pytest.fixture
+def lines(norms):
+    """Lines of words from the norms, with some multi-word items split across line breaks."""
+    rng = Random(0)
+    words = list(norms.iter_words()) + ["notaword"]
+    lines = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(300)]
+    multiword = next(word for word in words if " " in word)
+    first, second = multiword.split(" ")
+    lines[10] += " " + first
+    lines[11] = second + " " + lines[11]
+    return lines
+
+
+def _one_line_at_a_time(annotator, lines):
+    accumulator = annotator.new_accumulator()
+    for line in lines:
+        annotator.accumulate(line, accumulator)
+    return accumulator.profile(0)
+
+
+@pytest.mark.parametrize("chunk_size", [4, 50, 100_000])
+def test_accumulate_lines_matches_one_line_at_a_time(norms, lines, chunk_size):
+    annotator = CorpusAnnotator(norms, chunk_size=chunk_size)
+    _assert_same_profile(annotator.accumulate_lines(lines).profile(0), _one_line_at_a_time(annotator, lines))
+
+
+def test_annotate_files_matches_single_process(tmp_path, norms, lines):
+    file_paths = [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    for file_path, file_lines in zip(file_paths, [lines[:200], lines[200:]]):
+        with open(file_path, mode="w", encoding="utf-8") as f:
+            f.write("\n".join(file_lines) + "\n")
+
+    # Small shards, so each file is split between workers
+    annotator = ParallelAnnotator.from_norms(norms, str(tmp_path / "shared"), n_processes=2, shard_bytes=500)
+    file_profiles, total = annotator.annotate_files(file_paths)
+
+    single = CorpusAnnotator(norms)
+    _assert_same_profile(file_profiles[0], _one_line_at_a_time(single, lines[:200]))
+    _assert_same_profile(file_profiles[1], _one_line_at_a_time(single, lines[200:]))
+    _assert_same_profile(total, _one_line_at_a_time(single, lines))
+
+
+def test_annotate_documents_in_order(tmp_path, norms, lines):
+    annotator = ParallelAnnotator.from_norms(norms, str(tmp_path), n_processes=2, documents_per_task=7)
+    profiles = list(annotator.annotate(lines))
+
+    single = CorpusAnnotator(norms)
+    assert [profile.document_id for profile in profiles] == list(range(len(lines)))
+    for line, profile in zip(lines, profiles):
+        _assert_same_profile(profile, single.annotate_document(line))
@@ -0,0 +1,53 @@
+"""
+===========================
+Tests for the multi-word item trie.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from sensorimotor_norms.phrases import PhraseTrie
+
+_ITEMS = [("ice", 0), ("ice cream", 1), ("ice cream van", 2), ("cream", 3), ("van", 4), ("hot dog", 5)]
+
+
+def test_lookup():
+    trie = PhraseTrie(_ITEMS)
+    assert len(trie) == 6
+    assert trie.max_length == 3
+    assert trie.row_for("ice cream") == 1
+    assert "ice cream van" in trie
+    # A prefix of an item, but not an item itself
+    assert "hot" not in trie
+    assert "ice lolly" not in trie
+
+
+def test_scan_is_leftmost_longest():
+    trie = PhraseTrie(_ITEMS)
+    tokens = "the ice cream van sold ice cream and a hot dog and ice".split(" ")
+    assert trie.find_all(tokens) == [(1, 4, 2), (5, 7, 1), (9, 11, 5), (12, 13, 0)]
+
+
+def test_scan_stop_only_limits_starts():
+    trie = PhraseTrie(_ITEMS)
+    tokens = "an ice cream van".split(" ")
+    assert list(trie.scan(tokens, stop=2)) == [(1, 4, 2)]
+    assert list(trie.scan(tokens, stop=1)) == []
+
+
+def test_from_norms(norms):
+    trie = PhraseTrie.from_norms(norms, multiword_only=True)
+    multiwords = [(row, word) for row, word in enumerate(norms.iter_words()) if " " in word]
+    assert len(trie) == len(multiwords) > 0
+    for row, word in multiwords:
+        assert trie.row_for(word) == row
+    assert PhraseTrie.from_norms(norms).n_items == norms.n_items
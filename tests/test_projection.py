@@ -0,0 +1,95 @@
+"""
+===========================
+Tests for projections of the sensorimotor vectors.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import cov, diag, eye, ones
+from numpy.testing import assert_allclose
+
+from sensorimotor_norms.projection import Projection, ProjectionKind
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, Subspace
+
+
+@pytest.mark.parametrize("subspace", list(Subspace))
+def test_pca(norms, subspace):
+    projection = norms.projection(ProjectionKind.pca, subspace)
+    n_dims = len(range(norms.n_dims)[subspace.dims])
+
+    assert projection.basis.shape == (norms.n_dims, n_dims)
+    assert_allclose(projection.basis.T @ projection.basis, eye(n_dims), atol=1e-10)
+    coordinates = projection.project(norms.matrix())
+    assert_allclose(coordinates.mean(axis=0), 0, atol=1e-10)
+    # Uncorrelated, with decreasing variance
+    assert_allclose(cov(coordinates, rowvar=False), diag(projection.explained_variance), atol=1e-10)
+    assert (projection.explained_variance[:-1] >= projection.explained_variance[1:]).all()
+    assert projection.explained_variance_ratio.sum() == pytest.approx(1)
+
+
+def test_whitened_components_have_unit_variance(norms):
+    coordinates = norms.projection(ProjectionKind.whitened).project(norms.matrix())
+    assert_allclose(cov(coordinates, rowvar=False), eye(norms.n_dims), atol=1e-8)
+
+
+@pytest.mark.parametrize("subspace", [Subspace.sensory, Subspace.motor])
+def test_subspace_projections_ignore_other_dimensions(norms, subspace):
+    other_dims = [dim for dim in range(norms.n_dims) if dim not in set(range(norms.n_dims)[subspace.dims])]
+    for kind in ProjectionKind:
+        projection = norms.projection(kind, subspace)
+        assert (projection.basis[other_dims] == 0).all()
+
+    words = list(norms.iter_words())[:5]
+    assert_allclose(norms.project_words(words, ProjectionKind.subspace, subspace),
+                    norms.matrix_for_words(words)[:, subspace.dims])
+
+
+def test_truncated(norms):
+    projection = norms.projection()
+    truncated = projection.truncated(3)
+    vectors = norms.matrix()[:10]
+    assert truncated.n_components == 3
+    assert_allclose(truncated.project(vectors), projection.project(vectors)[:, :3])
+    words = list(norms.iter_words())[:10]
+    assert_allclose(norms.project_words(words, n_components=3), truncated.project(vectors))
+
+
+def test_fitting_is_deterministic(norms):
+    # Including the sign of each component
+    refitted = Projection.fit(norms.matrix(), ProjectionKind.pca)
+    assert_allclose(refitted.basis, norms.projection().basis)
+    assert_allclose(Projection.fit(-norms.matrix(), ProjectionKind.pca).basis, refitted.basis, atol=1e-10)
+
+
+def test_projections_are_fitted_once(norms_path, tmp_path, monkeypatch):
+    norms = SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False)
+    projection = norms.projection()
+    assert norms.projection() is projection
+    assert not projection.basis.flags.writeable
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Projection was refitted")
+    monkeypatch.setattr(Projection, "fit", fail)
+
+    # From the on-disk cache
+    cached = SensorimotorNorms(norms_path=norms_path, cache_dir=str(tmp_path), share_data=False)
+    assert_allclose(cached.projection().basis, projection.basis)
+
+
+def test_single_vector(norms):
+    projection = norms.projection(ProjectionKind.whitened)
+    word = next(iter(norms.iter_words()))
+    vector = norms.sensorimotor_vector_for_word(word)
+    assert_allclose(projection.project(vector), projection.project(vector[None, :])[0])
+    assert projection.project(ones(norms.n_dims)).shape == (norms.n_dims,)
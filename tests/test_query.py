@@ -0,0 +1,93 @@
+"""
+===========================
+Tests for vectorised queries over the norms stats.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pandas
+import pytest
+from numpy import nan
+
+from sensorimotor_norms.query import col
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, ComputedColNames
+
+_VISUAL = SensorimotorNorms.VectorColNames[5]
+_AUDITORY = SensorimotorNorms.VectorColNames[0]
+
+
+def _queries_and_masks(data):
+    """Queries, each with the equivalent pandas mask."""
+    return [
+        ((col(_VISUAL) > 2.5,),
+         data[_VISUAL] > 2.5),
+        ((col(_VISUAL) <= 1, col(_AUDITORY) >= 3),
+         (data[_VISUAL] <= 1) & (data[_AUDITORY] >= 3)),
+        ((col(_VISUAL).between(1, 2) | (col(DataColNames.dominant_perceptual) == "Haptic"),),
+         data[_VISUAL].between(1, 2) | (data[DataColNames.dominant_perceptual] == "Haptic")),
+        ((~col(DataColNames.dominant_action).isin(["Mouth", "Head"]), col(ComputedColNames.fraction_known) < 0.9),
+         ~data[DataColNames.dominant_action].isin(["Mouth", "Head"]) & (data[ComputedColNames.fraction_known] < 0.9)),
+        ((col(_AUDITORY) == float(data[_AUDITORY].iloc[3]),),
+         data[_AUDITORY] == data[_AUDITORY].iloc[3]),
+        ((col(_AUDITORY) != float(data[_AUDITORY].iloc[3]), col(_VISUAL) < 4),
+         (data[_AUDITORY] != data[_AUDITORY].iloc[3]) & (data[_VISUAL] < 4)),
+    ]
+
+
+@pytest.mark.parametrize("case", range(6))
+@pytest.mark.parametrize("indexed", [False, True])
+def test_queries_match_pandas(norms, case, indexed):
+    if indexed:
+        norms.create_sorted_index(_VISUAL)
+        norms.create_sorted_index(_AUDITORY)
+    predicates, mask = _queries_and_masks(norms.data)[case]
+
+    query = norms.query(*predicates)
+
+    expected = list(norms.data[DataColNames.word][mask.values])
+    assert query.words() == expected
+    assert query.count() == len(expected)
+
+
+def test_sorted_index_requires_numeric_column(norms):
+    with pytest.raises(ValueError):
+        norms.create_sorted_index(DataColNames.dominant_perceptual)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_missing_values_are_never_selected(norms_path, compact):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    frame[_VISUAL] = frame[_VISUAL].astype(float)
+    frame.loc[[0, 1], _VISUAL] = nan
+    frame[DataColNames.dominant_perceptual] = frame[DataColNames.dominant_perceptual].astype(object)
+    frame.loc[[1, 2], DataColNames.dominant_perceptual] = None
+    norms = SensorimotorNorms(frame=frame, share_data=False, compact=compact)
+    present_visual = frame[_VISUAL].notna()
+    present_dominant = frame[DataColNames.dominant_perceptual].notna()
+
+    def words(*predicates):
+        return norms.query(*predicates).words()
+
+    def expected(mask):
+        return list(frame[DataColNames.word][mask])
+
+    assert words(col(_VISUAL) != 2.5) == expected(present_visual & (frame[_VISUAL] != 2.5))
+    assert words(~(col(_VISUAL) > 2.5)) == expected(frame[_VISUAL] <= 2.5)
+    assert words(col(DataColNames.dominant_perceptual) != "Visual") == expected(
+        present_dominant & (frame[DataColNames.dominant_perceptual] != "Visual"))
+    assert words(~col(DataColNames.dominant_perceptual).isin(["Visual"])) == expected(
+        present_dominant & ~frame[DataColNames.dominant_perceptual].isin(["Visual"]))
+    # Missing either value
+    assert words(~((col(_VISUAL) > 2.5) | (col(DataColNames.dominant_perceptual) == "Visual"))) == expected(
+        present_visual & present_dominant
+        & ~((frame[_VISUAL] > 2.5) | (frame[DataColNames.dominant_perceptual] == "Visual")))
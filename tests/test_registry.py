@@ -0,0 +1,103 @@
+"""
+===========================
+Tests for norms sources and sharing loaded data between norms objects.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import gc
+import shutil
+
+import pandas
+import pytest
+from numpy.testing import assert_array_equal
+
+from sensorimotor_norms.registry import NormsRegistry, file_source_key
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, _ColumnGroup
+
+
+class _Data(object):
+    """Something which can be weakly referenced."""
+    pass
+
+
+def test_registry_keeps_the_first_registration():
+    registry = NormsRegistry()
+    first, second = _Data(), _Data()
+    assert registry.register("source", "name", first) is first
+    assert registry.register("source", "name", second) is first
+    assert registry.register("other source", "name", second) is second
+    assert registry.get("source", "name") is first
+    assert ("source", "name") in registry
+
+    registry.clear()
+    assert len(registry) == 0
+    assert registry.get("source", "name") is None
+
+
+def test_registry_entries_are_dropped_when_unused():
+    registry = NormsRegistry()
+    data = _Data()
+    registry.register("source", "name", data)
+    assert len(registry) == 1
+    del data
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_norms_over_the_same_file_share_data(norms_path):
+    a = SensorimotorNorms(norms_path=norms_path, use_cache=False)
+    b = SensorimotorNorms(norms_path=norms_path, use_cache=False)
+    assert a._vectors is b._vectors
+    assert all(a._frames[group] is b._frames[group] for group in _ColumnGroup)
+
+    unshared = SensorimotorNorms(norms_path=norms_path, use_cache=False, share_data=False)
+    assert unshared._vectors is not a._vectors
+    assert_array_equal(unshared._vectors, a._vectors)
+
+
+def test_rewritten_file_is_a_new_source(norms_path, tmp_path):
+    file_path = str(tmp_path / "norms.csv")
+    shutil.copyfile(norms_path, file_path)
+    key = file_source_key(file_path)
+    with open(file_path, mode="a", encoding="utf-8") as norms_file:
+        norms_file.write("\n")
+    assert file_source_key(file_path) != key
+
+
+def test_norms_from_a_frame(norms_path, norms):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    from_frame = SensorimotorNorms(frame=frame)
+    assert from_frame.norms_path is None
+    assert list(from_frame.iter_words()) == list(norms.iter_words())
+    assert_array_equal(from_frame.matrix(), norms.matrix())
+
+    # Shared with norms over the same frame object, but not with those over the file or an equal frame
+    assert SensorimotorNorms(frame=frame)._vectors is from_frame._vectors
+    assert from_frame._vectors is not norms._vectors
+    assert SensorimotorNorms(frame=frame.copy())._vectors is not from_frame._vectors
+
+
+def test_frame_is_not_modified(norms_path):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    word = frame[DataColNames.word].iloc[0]
+    frame.loc[0, DataColNames.word] = f" {word.upper()} "
+    original = frame.copy()
+    norms = SensorimotorNorms(frame=frame, share_data=False)
+    assert norms.has_word(word)
+    pandas.testing.assert_frame_equal(frame, original)
+
+
+def test_at_most_one_source(norms_path):
+    with pytest.raises(ValueError):
+        SensorimotorNorms(norms_path=norms_path, frame=pandas.read_csv(norms_path, keep_default_na=False))
@@ -0,0 +1,92 @@
+"""
+===========================
+Tests for stimulus sampling and matching.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pytest
+from numpy import arange
+from numpy.testing import assert_allclose, assert_array_equal
+
+from sensorimotor_norms.query import col
+from sensorimotor_norms.sampling import StimulusSampler
+from sensorimotor_norms.sensorimotor_norms import DataColNames, ComputedColNames
+
+_MATCH_COLS = [ComputedColNames.fraction_known, DataColNames.minkowski3_sensorimotor]
+
+
+def test_samples_are_reproducible(norms):
+    assert_array_equal(StimulusSampler(norms, seed=1).sample(10), StimulusSampler(norms, seed=1).sample(10))
+
+
+def test_sample_without_replacement(norms):
+    candidates = norms.query(col(DataColNames.dominant_perceptual) == "Visual").rows()
+    rows = StimulusSampler(norms, seed=0).sample(len(candidates), rows=candidates)
+    assert sorted(rows) == list(candidates)
+    with pytest.raises(ValueError):
+        StimulusSampler(norms, seed=0).sample(len(candidates) + 1, rows=candidates)
+
+
+def test_stratified_samples_come_from_their_strata(norms):
+    samples = StimulusSampler(norms, seed=0).sample_stratified({"Visual": 3, "Haptic": 2},
+                                                               by=DataColNames.dominant_perceptual)
+    assert {stratum: len(rows) for stratum, rows in samples.items()} == {"Visual": 3, "Haptic": 2}
+    for stratum, rows in samples.items():
+        assert all(norms.data[DataColNames.dominant_perceptual].iloc[rows] == stratum)
+    with pytest.raises(ValueError):
+        StimulusSampler(norms, seed=0).sample_stratified({"Visual": norms.n_items}, by=DataColNames.dominant_perceptual)
+
+
+def test_matching_a_set_with_itself_pairs_each_row_with_itself(norms):
+    rows = arange(0, 60, 3)
+    rows_a, rows_b, distances = StimulusSampler(norms).match(rows, rows, _MATCH_COLS)
+    assert_array_equal(rows_a, rows)
+    assert_array_equal(rows_b, rows)
+    assert_allclose(distances, 0, atol=1e-6)
+
+
+def test_matching_without_replacement(norms):
+    rows_a, rows_b = arange(0, 40), arange(100, 300)
+    paired_a, paired_b, distances = StimulusSampler(norms).match(rows_a, rows_b, _MATCH_COLS,
+                                                                 exact_cols=[DataColNames.dominant_action])
+    assert len(set(paired_b)) == len(paired_b)
+    assert set(paired_b) <= set(rows_b)
+    dominant = norms.data[DataColNames.dominant_action].values
+    assert (dominant[paired_a] == dominant[paired_b]).all()
+
+    close_a, _close_b, close_distances = StimulusSampler(norms).match(rows_a, rows_b, _MATCH_COLS,
+                                                                      max_distance=0.1)
+    assert (close_distances <= 0.1).all()
+    assert len(close_a) < len(rows_a)
+
+
+def test_matching_with_replacement_finds_nearest(norms):
+    rows_a, rows_b = arange(0, 40), arange(100, 110)
+    _paired_a, paired_b, distances = StimulusSampler(norms).match(rows_a, rows_b, _MATCH_COLS, replace=True)
+    assert len(paired_b) == len(rows_a)
+    # With only 10 rows of b to go round, some are used more than once
+    assert len(set(paired_b)) < len(paired_b)
+
+
+@pytest.mark.parametrize("replace", [False, True])
+def test_empty_strata(norms, replace):
+    visual = norms.query(col(DataColNames.dominant_perceptual) == "Visual").rows()
+    sampler = StimulusSampler(norms, seed=0)
+    with pytest.raises(ValueError, match="stratum Haptic"):
+        sampler.sample_stratified({"Visual": 2, "Haptic": 1}, by=DataColNames.dominant_perceptual, rows=visual,
+                                  replace=replace)
+    # Nothing to draw from, but nothing asked for
+    samples = sampler.sample_stratified({"Visual": 2, "Haptic": 0}, by=DataColNames.dominant_perceptual, rows=visual,
+                                        replace=replace)
+    assert len(samples["Haptic"]) == 0
@@ -0,0 +1,132 @@
+"""
+===========================
+Tests for the local lookup server and its client.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas
+import pytest
+from numpy import nan
+from numpy.testing import assert_allclose
+
+from sensorimotor_norms.distances import DistanceType
+from sensorimotor_norms.exceptions import NormsServerError
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames, Subspace
+from sensorimotor_norms.server import NormsClient, NormsServer
+
+
+@pytest.fixture
+def server(norms) -> NormsServer:
+    return NormsServer(norms)
+
+
+def test_lookups(server, norms):
+    word = next(iter(norms.iter_words()))
+
+    response = server.handle({"id": 1, "op": "vectors", "words": [word, "not a word"], "subspace": "motor"})
+    assert response["id"] == 1
+    vector, missing = response["result"]["vectors"]
+    assert_allclose(vector, norms.motor_vector_for_word(word))
+    assert missing is None
+
+    stats = server.handle({"id": 2, "op": "stats", "words": [word], "cols": [DataColNames.dominant_perceptual]})
+    assert stats["result"]["stats"] == {
+        DataColNames.dominant_perceptual: [norms.stat_for_word(word, DataColNames.dominant_perceptual)]}
+
+    assert server.handle({"op": "has_words", "words": [word, "not a word"]})["result"] == {
+        "has_words": [True, False]}
+    assert server.handle({"op": "info"})["result"]["n_items"] == norms.n_items
+
+
+@pytest.mark.parametrize("request_", [
+    {"id": 1, "op": "nonsense"},
+    {"id": 1},
+    {"id": 1, "op": "vectors"},
+    {"id": 1, "op": "vectors", "words": 3},
+    {"id": 1, "op": "vectors", "words": ["a"], "subspace": "nonsense"},
+    {"id": 1, "op": "stats", "words": ["a"], "cols": ["Not a column"]},
+    {"id": 1, "op": "neighbours", "words": ["a"], "k": "many"},
+    {"id": 1, "op": "neighbours", "words": [["a"]]},
+    {"id": 1, "op": "neighbours", "words": ["a"], "k": 0},
+    {"id": 1, "op": "neighbours", "words": ["a"], "k": -3},
+])
+def test_malformed_requests_get_errors(server, request_):
+    response = server.handle(request_)
+    assert response["id"] == 1
+    assert "error" in response
+
+
+def test_missing_vector_values_are_null(norms_path):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    frame[SensorimotorNorms.VectorColNames[0]] = frame[SensorimotorNorms.VectorColNames[0]].astype(float)
+    frame.loc[0, SensorimotorNorms.VectorColNames[0]] = nan
+    server = NormsServer(SensorimotorNorms(frame=frame, share_data=False))
+
+    response = server.handle({"id": 1, "op": "vectors", "words": [frame[DataColNames.word].iloc[0]]})
+
+    vector = response["result"]["vectors"][0]
+    assert vector[0] is None
+    assert vector[1:] == list(frame[SensorimotorNorms.VectorColNames[1:]].iloc[0])
+    # Valid, strict JSON
+    json.dumps(response, allow_nan=False)
+
+
+@pytest.mark.parametrize("request_", [[1, 2], "x", 3, None])
+def test_non_object_requests_get_errors(server, request_):
+    response = server.handle(request_)
+    assert response["id"] is None
+    assert "JSON object" in response["error"]
+
+
+def test_neighbour_indexes_are_built_once(server):
+    with ThreadPoolExecutor(8) as pool:
+        indexes = list(pool.map(lambda _: server._neighbour_index(DistanceType.cosine, Subspace.sensorimotor),
+                                range(8)))
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_bad_requests_dont_drop_the_connection(tmp_path, server, norms):
+    socket_path = str(tmp_path / "norms.sock")
+    words = list(norms.iter_words())[:3]
+
+    async def session():
+        serving = asyncio.get_running_loop().create_task(server.serve_unix(socket_path))
+        while not (tmp_path / "norms.sock").exists():
+            await asyncio.sleep(0.01)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            for line in [b"{not json\n", b"[1, 2]\n", b"\"x\"\n", b'{"id": 7, "op": "neighbours", "words": 5}\n']:
+                writer.write(line)
+                assert "error" in json.loads(await reader.readline())
+            writer.close()
+
+            client = await NormsClient.connect(path=socket_path)
+            # Concurrent calls are coalesced into one request
+            vectors = await asyncio.gather(*[client.vector(word) for word in words + ["not a word"]])
+            neighbours = await client.neighbours(words[0], k=2)
+            with pytest.raises(NormsServerError):
+                await client.request("nonsense")
+            await client.close()
+            return vectors, neighbours
+        finally:
+            serving.cancel()
+
+    vectors, neighbours = asyncio.run(session())
+    assert_allclose(vectors[:3], norms.matrix_for_words(words))
+    assert vectors[3] is None
+    assert len(neighbours) == 2
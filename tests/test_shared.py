@@ -0,0 +1,68 @@
+"""
+===========================
+Tests for norms shared between processes by exporting and attaching.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import pandas
+import pytest
+from numpy.testing import assert_array_equal
+
+from sensorimotor_norms.exceptions import WordNotInNormsError
+from sensorimotor_norms.sensorimotor_norms import SensorimotorNorms, DataColNames
+from sensorimotor_norms.shared import SharedNorms, export_shared_norms
+
+
+def test_attached_norms_match_exported(tmp_path, norms):
+    export_shared_norms(norms, str(tmp_path), include_sd=True, include_stats=True)
+    shared = SharedNorms(str(tmp_path))
+
+    assert list(shared.iter_words()) == list(norms.iter_words())
+    assert_array_equal(shared.matrix(), norms.matrix())
+    word = next(iter(norms.iter_words()))
+    assert shared.stat_for_word(word, DataColNames.dominant_perceptual) == norms.stat_for_word(
+        word, DataColNames.dominant_perceptual)
+    with pytest.raises(WordNotInNormsError):
+        shared.sensorimotor_vector_for_word("not a word")
+
+
+def test_reexport_replaces_previous(tmp_path, norms):
+    directory = str(tmp_path)
+    export_shared_norms(norms, directory)
+    attached_before = SharedNorms(directory)
+    files_before = set(tmp_path.iterdir())
+
+    export_shared_norms(norms, directory, include_stats=True)
+    attached_after = SharedNorms(directory)
+
+    # The previous export's arrays are removed, but those already attached to them still work
+    assert not files_before & (set(tmp_path.iterdir()) - {tmp_path / "meta.json"})
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+    assert_array_equal(attached_before.matrix(), attached_after.matrix())
+    word = next(iter(norms.iter_words()))
+    assert attached_after.fraction_known(word) == norms.fraction_known(word)
+
+
+def test_missing_categorical_value_is_none(tmp_path, norms_path):
+    frame = pandas.read_csv(norms_path, keep_default_na=False)
+    frame.loc[0, DataColNames.dominant_perceptual] = None
+    norms = SensorimotorNorms(frame=frame, share_data=False)
+
+    export_shared_norms(norms, str(tmp_path / "shared"), include_stats=True)
+    shared = SharedNorms(str(tmp_path / "shared"))
+
+    first_word, second_word = list(norms.iter_words())[:2]
+    assert shared.stat_for_word(first_word, DataColNames.dominant_perceptual) is None
+    assert shared.stat_for_word(second_word, DataColNames.dominant_perceptual) == norms.stat_for_word(
+        second_word, DataColNames.dominant_perceptual)
@@ -0,0 +1,136 @@
+"""
+===========================
+Tests that BrEng translation selection gives the same results as the original (quadratic) implementation.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import importlib
+from collections import Counter, defaultdict
+from random import Random
+from typing import Dict, Iterable, List, Set
+
+import pytest
+
+from conftest import DEFAULT_TRANSLATIONS, FakeDialectDictionary, install_fake_dictionary
+
+
+# region The original implementation, parameterised on the dictionary
+
+def _reference_select_best_translation(dictionary: FakeDialectDictionary, word: str, other_words: Set[str]) -> str:
+    available_translations = [t for t in dictionary.translations_for(word) if t not in other_words]
+    if len(available_translations) == 0:
+        return word
+    for t in available_translations:
+        if t in other_words:
+            continue
+        return t
+    return word
+
+
+def _reference_select_best_translations(words: Iterable[str], dictionary: FakeDialectDictionary,
+                                        ameng_counter: Counter, breng_counter: Counter) -> Dict[str, str]:
+    words = set(words)
+    translations: Dict[str, str] = dict()
+    for word in sorted(words):
+        if word in dictionary.source_vocab:
+            translations[word] = _reference_select_best_translation(dictionary, word, other_words=words - {word})
+        elif " " in word:
+            translated_multiword = " ".join(_reference_select_best_translation(dictionary, token, set())
+                                            for token in word.split(" "))
+            translations[word] = translated_multiword if translated_multiword not in words else word
+        else:
+            translations[word] = word
+
+    collision_avoidance = dict()
+    for target, sources in _reference_find_collisions(translations).items():
+        sources = sorted(sources, key=lambda w: ameng_counter[w], reverse=True)
+        for source in sources:
+            available_translations = [
+                t
+                for s in sources
+                for t in dictionary.translations_for(s)
+                if (t not in words) and (t not in collision_avoidance.values())
+            ]
+            available_translations = sorted(available_translations, key=lambda w: breng_counter[w], reverse=True)
+            for t in available_translations:
+                collision_avoidance[source] = t
+                break
+            if source not in collision_avoidance:
+                collision_avoidance[source] = source
+
+    for s, t in collision_avoidance.items():
+        translations[s] = t
+
+    assert len(_reference_find_collisions(translations)) == 0
+    return translations
+
+
+def _reference_find_collisions(translations: Dict[str, str]) -> Dict[str, List[str]]:
+    collisions = defaultdict(list)
+    for k, v in translations.items():
+        collisions[v].append(k)
+    return {k: v for k, v in collisions.items() if len(v) > 1}
+
+# endregion
+
+
+def _outcome(select, *args):
+    """The translations, or the type of error raised."""
+    try:
+        return select(*args)
+    except AssertionError as er:
+        return type(er)
+
+
+def _random_case(seed: int):
+    """Words, a dictionary and counts, small enough for lots of collisions and clashes with the words themselves."""
+    rng = Random(seed)
+    vocab = [f"w{i}" for i in range(30)]
+    targets = [f"t{i}" for i in range(10)]
+    words = set(rng.sample(vocab, 20))
+    words |= {" ".join(rng.sample(vocab, 2)) for _ in range(5)}
+    translations = {
+        source: rng.sample(targets + vocab, rng.randint(1, 3))
+        for source in rng.sample(vocab, 15)
+    }
+    ameng_counts = {word: rng.randint(0, 5) for word in vocab}
+    breng_counts = {word: rng.randint(0, 5) for word in targets + vocab}
+    return words, translations, ameng_counts, breng_counts
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_original_on_random_dictionaries(monkeypatch, seed):
+    words, translations, ameng_counts, breng_counts = _random_case(seed)
+    dictionary = install_fake_dictionary(monkeypatch, translations, ameng_counts, breng_counts)
+    translation_logic = importlib.import_module("sensorimotor_norms.breng_translation.translation_logic")
+
+    expected = _outcome(_reference_select_best_translations,
+                        words, dictionary, Counter(ameng_counts), Counter(breng_counts))
+    assert _outcome(translation_logic.select_best_translations, words) == expected
+
+
+def test_matches_original_on_fixed_words(fake_dictionary):
+    from sensorimotor_norms.breng_translation.translation_logic import select_best_translations, ameng_counter, \
+        breng_counter
+
+    words = ["color", "colour", "center", "gray", "labor", "anesthetize", "anaesthetize", "gray color", "table"]
+    translations = select_best_translations(words)
+
+    assert translations == _reference_select_best_translations(words, fake_dictionary, ameng_counter, breng_counter)
+    assert translations["center"] == "centre"
+    # "colour" is already in the words
+    assert translations["color"] == "color"
+    assert translations["gray color"] == "grey colour"
+    assert set(translations) == set(words)
+    assert DEFAULT_TRANSLATIONS["anesthetize"][0] in translations.values()
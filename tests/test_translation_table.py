@@ -0,0 +1,79 @@
+"""
+===========================
+Tests for the persisted BrEng translation table.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import json
+
+import pytest
+
+from sensorimotor_norms.breng_translation import translation_table
+from sensorimotor_norms.breng_translation.translation_table import load_translation_table, save_translation_table, \
+    translations_for_words
+
+_WORDS = ["color", "center", "table"]
+
+
+def test_saved_table_is_loaded(tmp_path):
+    file_path = str(tmp_path / "tables" / "table.json")
+    save_translation_table(_WORDS, {"color": "colour"}, file_path)
+
+    assert load_translation_table(_WORDS, file_path) == {"color": "colour"}
+    # Built for other words
+    assert load_translation_table(_WORDS + ["gray"], file_path) is None
+    assert [p.name for p in (tmp_path / "tables").iterdir()] == ["table.json"]
+
+
+def test_failed_save_keeps_previous_table(tmp_path):
+    file_path = str(tmp_path / "table.json")
+    save_translation_table(_WORDS, {"color": "colour"}, file_path)
+
+    with pytest.raises(TypeError):
+        save_translation_table(_WORDS, {"color": object()}, file_path)
+
+    assert load_translation_table(_WORDS, file_path) == {"color": "colour"}
+    assert [p.name for p in tmp_path.iterdir()] == ["table.json"]
+
+
+def test_corrupt_table_is_ignored(tmp_path):
+    file_path = tmp_path / "table.json"
+    file_path.write_text("{not json", encoding="utf-8")
+    assert load_translation_table(_WORDS, str(file_path)) is None
+
+
+def test_translations_are_selected_once(tmp_path, fake_dictionary, monkeypatch):
+    file_path = str(tmp_path / "table.json")
+    translations = translations_for_words(_WORDS, file_path=file_path)
+    assert translations == {"color": "colour", "center": "centre", "table": "table"}
+    with open(file_path, mode="r", encoding="utf-8") as table_file:
+        assert json.load(table_file)["translations"] == translations
+
+    # The second time, they come from the table
+    def fail(*args, **kwargs):
+        raise AssertionError("Translations were selected again")
+    monkeypatch.setattr(translation_table, "save_translation_table", fail)
+    assert translations_for_words(_WORDS, file_path=file_path) == translations
+
+
+def test_table_paths(tmp_path, fake_dictionary, monkeypatch):
+    # A bare file name, in the working directory
+    monkeypatch.chdir(tmp_path)
+    save_translation_table(_WORDS, {"color": "colour"}, "table.json")
+    assert load_translation_table(_WORDS, str(tmp_path / "table.json")) == {"color": "colour"}
+
+    # A path under the home directory
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    translations_for_words(_WORDS, file_path="~/tables/table.json")
+    assert (tmp_path / "home" / "tables" / "table.json").is_file()
@@ -0,0 +1,90 @@
+"""
+===========================
+Tests for matching variant spellings of words in the norms.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+from logging import WARNING
+
+import pytest
+
+from sensorimotor_norms.variants import MatchKind, VariantIndex, damerau_levenshtein
+
+_WORDS = ["ice cream", "colour", "center", "elephant", "table"]
+
+
+@pytest.mark.parametrize("query, word, kind", [
+    ("table", "table", MatchKind.exact),
+    ("  Ice  Cream ", "ice cream", MatchKind.normalised),
+    ("ice-cream", "ice cream", MatchKind.hyphenation),
+    ("icecream", "ice cream", MatchKind.hyphenation),
+    ("elephnat", "elephant", MatchKind.edit_distance),
+    ("elefant", None, None),
+    # Too short to match by edit distance
+    ("tabe", None, None),
+])
+def test_lookup(missing_dictionary, query, word, kind):
+    match = VariantIndex(_WORDS, min_length_for_edits=5).lookup(query)
+    if word is None:
+        assert match is None
+    else:
+        assert (match.word, match.row, match.kind) == (word, _WORDS.index(word), kind)
+
+
+def test_dialect_variants(fake_dictionary):
+    index = VariantIndex(_WORDS)
+    # AmEng item, BrEng query, and the other way round
+    assert (index.lookup("centre").word, index.lookup("centre").kind) == ("center", MatchKind.dialect)
+    assert (index.lookup("color").word, index.lookup("color").kind) == ("colour", MatchKind.dialect)
+
+
+def test_missing_dictionary_skips_dialect_variants(missing_dictionary, caplog):
+    with caplog.at_level(WARNING, logger="sensorimotor_norms.variants"):
+        index = VariantIndex(_WORDS)
+    assert "dictionary not available" in caplog.text
+    # Only close enough to be a misspelling
+    assert index.lookup("centre").kind is MatchKind.edit_distance
+    assert index.lookup("ice-cream").word == "ice cream"
+
+
+def test_match_word_without_dictionary(missing_dictionary, norms):
+    word = next(iter(norms.iter_words()))
+    assert norms.match_word(word.upper()).kind is MatchKind.normalised
+    assert norms.match_word("not a word at all") is None
+
+
+def test_edit_distance_candidates_are_closest_first():
+    index = VariantIndex(["cart", "card", "care", "carts"], use_dialect_dictionary=False, max_edit_distance=2)
+    candidates = index.edit_distance_candidates("carts")
+    assert [c.word for c in candidates] == ["carts", "cart", "card", "care"]
+    assert [c.distance for c in candidates] == [0, 1, 2, 2]
+    assert index.edit_distance_candidates("carts", max_distance=1)[-1].word == "cart"
+
+
+def test_damerau_levenshtein():
+    assert damerau_levenshtein("table", "table") == 0
+    assert damerau_levenshtein("table", "tabel") == 1
+    assert damerau_levenshtein("table", "able") == 1
+    assert damerau_levenshtein("kitten", "sitting") == 3
+
+
+def test_lookup_without_edit_distance(missing_dictionary, monkeypatch):
+    index = VariantIndex(_WORDS, min_length_for_edits=5)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Edit distance candidates were computed")
+    monkeypatch.setattr(index, "edit_distance_candidates", fail)
+
+    assert index.lookup("elephnat", allow_edit_distance=False) is None
+    assert index.lookup("ice-cream", allow_edit_distance=False).kind is MatchKind.hyphenation
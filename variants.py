@@ -0,0 +1,249 @@
+"""
+===========================
+Finding norms items from variant spellings.
+===========================
+
+Dr. Cai Wingfield
+---------------------------
+Embodied Cognition Lab
+Department of Psychology
+University of Lancaster
+c.wingfield@lancaster.ac.uk
+caiwingfield.net
+---------------------------
+2019
+---------------------------
+"""
+
+import re
+from enum import Enum, auto
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = getLogger(__name__)
+
+_whitespace = re.compile(r"\s+")
+
+
+class MatchKind(Enum):
+    """How a query was matched to a norms item."""
+    # The query is a norms item
+    exact = auto()
+    # The query differs only in case or whitespace
+    normalised = auto()
+    # The query differs in hyphenation, e.g. "ice-cream" or "icecream" for "ice cream"
+    hyphenation = auto()
+    # The query is an AmEng or BrEng spelling of the item, according to the translation dictionary
+    dialect = auto()
+    # The query is within a small edit distance of the item
+    edit_distance = auto()
+
+
+class VariantMatch(object):
+    """A norms item matched from a query."""
+
+    def __init__(self, word: str, row: int, kind: MatchKind, distance: int = 0):
+        self.word: str = word
+        self.row: int = row
+        self.kind: MatchKind = kind
+        # Edit distance between the (normalised) query and the item, for edit-distance matches
+        self.distance: int = distance
+
+    def __repr__(self) -> str:
+        return f"VariantMatch({self.word!r}, row={self.row}, kind={self.kind.name}, distance={self.distance})"
+
+
+def normalise(word: str) -> str:
+    """Lower-cases and strips a word, and collapses internal whitespace to single spaces."""
+    return _whitespace.sub(" ", word.strip().lower())
+
+
+def _hyphenation_variants(word: str) -> List[str]:
+    """Forms of a word with hyphens replaced by spaces, and with hyphens and spaces removed."""
+    return [word.replace("-", " "), word.replace("-", "").replace(" ", "")]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings obtainable from `word` by deleting up to `max_distance` characters, including `word` itself."""
+    deletes = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {
+            w[:i] + w[i + 1:]
+            for w in frontier
+            for i in range(len(w))
+        }
+        deletes |= frontier
+    return deletes
+
+
+def damerau_levenshtein(a: str, b: str) -> int:
+    """Edit distance between two strings, counting insertions, deletions, substitutions and adjacent transpositions."""
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1,          # deletion
+                             current[j - 1] + 1,       # insertion
+                             previous[j - 1] + cost)   # substitution
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)  # transposition
+        previous_previous, previous = previous, current
+    return previous[len(b)]
+
+
+class VariantIndex(object):
+    """
+    Precomputed index of variant forms of the norms items, so that lookups which miss the exact form can be retried
+    cheaply.
+
+    Queries are tried, in order, as:
+        the exact item;
+        the item up to case and whitespace;
+        hyphen/space variants;
+        AmEng/BrEng spellings (both directions) from the translation dictionary;
+        items within `max_edit_distance` edits, found with a symmetric-deletion index.
+    """
+
+    def __init__(self,
+                 words: Iterable[str],
+                 use_dialect_dictionary: bool = True,
+                 max_edit_distance: int = 1,
+                 min_length_for_edits: int = 4,
+                 ):
+        """
+        :param words:
+            The norms items, in row order.
+        :param use_dialect_dictionary:
+            Index AmEng and BrEng spellings.  Requires the translation dictionary, and is skipped (with a warning) when
+            it's not available.
+        :param max_edit_distance:
+            Set to 0 to disable edit-distance matching.  The index grows quickly with this.
+        :param min_length_for_edits:
+            Queries shorter than this aren't matched by edit distance, as short words have too many close neighbours
+            for a match to mean much.
+        """
+        self.words: List[str] = list(words)
+        self.max_edit_distance: int = max_edit_distance
+        self.min_length_for_edits: int = min_length_for_edits
+
+        self._row_for_word: Dict[str, int] = {word: row for row, word in enumerate(self.words)}
+
+        # variant form -> (row, kind).  Where a form is a variant of more than one item, the first one indexed wins.
+        self._variants: Dict[str, Tuple[int, MatchKind]] = dict()
+        for row, word in enumerate(self.words):
+            for variant in _hyphenation_variants(word):
+                self._add_variant(variant, row, MatchKind.hyphenation)
+        if use_dialect_dictionary:
+            self._add_dialect_variants()
+
+        # deletion form -> rows of items it can be obtained from
+        self._deletes: Dict[str, List[int]] = dict()
+        if max_edit_distance > 0:
+            for row, word in enumerate(self.words):
+                for delete in _deletes(word, max_edit_distance):
+                    self._deletes.setdefault(delete, []).append(row)
+
+        logger.info(f"Indexed {len(self._variants):,} variant forms and {len(self._deletes):,} deletion forms "
+                    f"for {len(self.words):,} words")
+
+    @classmethod
+    def from_norms(cls, norms, **kwargs) -> "VariantIndex":
+        """
+        Index the words in the norms (`SensorimotorNorms` or `shared.SharedNorms`).
+        :param norms:
+        :param kwargs:
+            Passed to the constructor.
+        """
+        return cls(norms.iter_words(), **kwargs)
+
+    def _add_variant(self, variant: str, row: int, kind: MatchKind):
+        # Never shadow an actual item
+        if variant in self._row_for_word or variant in self._variants:
+            return
+        self._variants[variant] = (row, kind)
+
+    def _add_dialect_variants(self):
+        try:
+            from .breng_translation.dictionary.dialect_dictionary import ameng_to_breng
+        except ImportError:
+            logger.warning("BrEng translation dictionary not available, so AmEng/BrEng spellings won't be matched")
+            return
+
+        # AmEng items -> BrEng spellings
+        for row, word in enumerate(self.words):
+            if word in ameng_to_breng.source_vocab:
+                for translation in ameng_to_breng.translations_for(word):
+                    self._add_variant(translation, row, MatchKind.dialect)
+        # BrEng items (e.g. when the norms have been translated) -> AmEng spellings
+        for source in sorted(ameng_to_breng.source_vocab):
+            for translation in ameng_to_breng.translations_for(source):
+                row = self._row_for_word.get(translation)
+                if row is not None:
+                    self._add_variant(source, row, MatchKind.dialect)
+
+    def lookup(self, query: str, allow_edit_distance: bool = True) -> Optional[VariantMatch]:
+        """
+        The best match for a query.
+        :param query:
+        :param allow_edit_distance:
+            Fall back to items within edit distance of the query.  Turn off when edit-distance matches won't be used,
+            as finding them is the slowest part of a lookup.
+        :return:
+            The match, or None if nothing matched.
+        """
+        row = self._row_for_word.get(query)
+        if row is not None:
+            return VariantMatch(query, row, MatchKind.exact)
+
+        normalised = normalise(query)
+        row = self._row_for_word.get(normalised)
+        if row is not None:
+            return VariantMatch(normalised, row, MatchKind.normalised)
+
+        for variant in [normalised] + _hyphenation_variants(normalised):
+            row = self._row_for_word.get(variant)
+            if row is not None:
+                return VariantMatch(self.words[row], row, MatchKind.hyphenation)
+            match = self._variants.get(variant)
+            if match is not None:
+                row, kind = match
+                # A query which is itself a hyphenation variant of a dialect variant is still a dialect match
+                return VariantMatch(self.words[row], row, kind)
+
+        if not allow_edit_distance:
+            return None
+        candidates = self.edit_distance_candidates(normalised)
+        if candidates:
+            return candidates[0]
+        return None
+
+    def edit_distance_candidates(self, query: str, max_distance: Optional[int] = None) -> List[VariantMatch]:
+        """
+        Items within `max_distance` edits of a query, closest first (ties in row order).
+        :param query:
+        :param max_distance:
+            Defaults to, and can't exceed, the `max_edit_distance` the index was built with.
+        """
+        if max_distance is None or max_distance > self.max_edit_distance:
+            max_distance = self.max_edit_distance
+        if max_distance <= 0 or len(query) < self.min_length_for_edits:
+            return []
+
+        # Any item within d edits of the query shares a form with it after at most d deletions from each
+        candidate_rows = set()
+        for delete in _deletes(query, max_distance):
+            candidate_rows.update(self._deletes.get(delete, ()))
+
+        candidates = []
+        for row in sorted(candidate_rows):
+            word = self.words[row]
+            if abs(len(word) - len(query)) > max_distance:
+                continue
+            distance = damerau_levenshtein(query, word)
+            if distance <= max_distance:
+                candidates.append(VariantMatch(word, row, MatchKind.edit_distance, distance))
+        candidates.sort(key=lambda match: match.distance)
+        return candidates